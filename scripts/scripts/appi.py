@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Unified APPI command line: `appi <command> [script options]`.
+Each command runs one of the existing scripts as __main__ (runpy), so its own
+argparse options and outputs are unchanged. Only the chosen script is
+imported; `appi --help` and `appi <command> --help` never load numpy,
+pandas, scipy or matplotlib beyond what that script needs itself.
+
+Usage:
+  python appi.py --help
+  python appi.py generate --lambda 2.0 --duration 60 --pw-min 50 --pw-max 1000 --out data/fig1_pulse_train.csv
+  python appi.py isi --in data/fig1_pulse_train.csv --outdir figures --no-figures
+  python appi.py logger --port COM5 --csv logs/events.csv --lambda 2.0 --pwmin 50 --pwmax 1000 --start
+Startup cost per command: python bench_startup.py --outdir tables
+"""
+import os, sys, runpy
+
+# command -> (module, one-line help)
+COMMANDS = {
+    "generate":   ("mk_reference_dataset", "reference dataset (Poisson ISI, uniform PW)"),
+    "nhpp":       ("nhpp", "time-varying λ(t) dataset by thinning"),
+    "lfsr":       ("lfsr16", "dataset from the 16-bit LFSR firmware source"),
+    "isi":        ("isi_analysis1", "Tables 7/8, Figures 13-15"),
+    "fano":       ("count_stats", "Fano factor vs window size, ISI CV (Table 7b, Figure 13b)"),
+    "dists":      ("isi_distributions", "ISI / PW distribution registry (sample + MLE round trip)"),
+    "gof":        ("discrete_gof", "discrete-uniform PW goodness of fit (Table 8c)"),
+    "spectrum":   ("mk_periodogram_acf", "periodogram + ACF (Figures 16/17, Tables 9/10)"),
+    "bootstrap":  ("bootstrap_ci", "bootstrap CIs for rate / spectral / ACF summaries (Tables 7, 9b, 10b)"),
+    "pp-spectrum": ("point_process_spectrum", "exact pulse/point-train spectrum without binning (Figure 16b, Table 9c)"),
+    "timing":     ("firmware_timing_sim", "firmware timing model (Table 9, Figures 9/10)"),
+    "bench":      ("bench_rc_load_sim1", "CCS on R||C bench simulation (Figures 19/20)"),
+    "load":       ("load_models", "electrode load models (impedance / CPE fit check)"),
+    "metrics":    ("pulse_metrics", "per-pulse waveform metrics + percentiles (Table 12)"),
+    "compliance": ("compliance_curve1", "compliance curve (Figure 21, Table 14)"),
+    "compliance-surface": ("compliance_surface", "transient compliance over (R, C, PW) (Figure 21b/c, Table 14b/c)"),
+    "psd":        ("psd_on_load", "PSD of load voltage (Figure 22, Table 15)"),
+    "env-map":    ("env_map_vpeak", "v_peak operational envelope (Figure 23)"),
+    "safe":       ("safe_envelope_solver", "max safe λ / PW for v_peak (or p99) under a limit (Table 25)"),
+    "robustness": ("robustness_by_seed", "KS p-values by seed (Figure 24, Table 21)"),
+    "ks-batch":   ("ks_batch", "many-seed KS robustness (Table 23)"),
+    "biphasic":   ("neuro_biphasic_waveform", "biphasic waveform (Figures 25/26)"),
+    "charge":     ("charge_accounting", "analytic per-pulse charge / energy accounting"),
+    "raster":     ("raster_compare_periodic_vs_appi", "raster periodic vs APPI (Figure 27)"),
+    "decimate":   ("plot_decimate", "envelope plotting equivalence check"),
+    "preflight":  ("preflight_safety", "pre-flight safety check of a planned session (Table 19 targets)"),
+    "logger":     ("pc_serial_logger", "serial logger (SET/START, EV/BIP to CSV)"),
+    "gui":        ("pc_tk_gui", "Tk control GUI"),
+    "stream":     ("stream_server", "localhost live stream: serial/emulator events to many WebSocket clients, /stats"),
+    "latency":    ("protocol_client", "pipelined SET round trips: command latency histogram (p50/p95/p99)"),
+    "journal":    ("event_journal", "check / recover / export a crash-safe logger journal"),
+    "logs":       ("logstore", "list / extract a time window from a rotating log store"),
+    "startup":    ("bench_startup", "import-time benchmark of these commands"),
+    "cache":      ("simcache", "simulation result cache (--stats / --clear)"),
+}
+
+def usage():
+    w = max(map(len, COMMANDS))
+    lines = ["usage: appi <command> [options]   (appi <command> --help for options)", "", "commands:"]
+    lines += [f"  {k:<{w}}  {h}" for k, (_, h) in COMMANDS.items()]
+    return "\n".join(lines)
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv or argv[0] in ("-h", "--help"):
+        print(usage())
+        return 0
+    cmd, rest = argv[0], argv[1:]
+    if cmd not in COMMANDS:
+        print(f"appi: unknown command {cmd!r}\n\n{usage()}", file=sys.stderr)
+        return 2
+    here = os.path.dirname(os.path.abspath(__file__))
+    if here not in sys.path:
+        sys.path.insert(0, here)
+    sys.argv = [cmd] + rest  # runpy replaces argv[0] with the script path
+    runpy.run_module(COMMANDS[cmd][0], run_name="__main__", alter_sys=True)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -10,9 +10,23 @@ Usage examples:
 
   python bench_rc_load_sim.py --lambda 2 --duration 0.5 --pw-min 50 --pw-max 1000 \
       --I-limit 0.01 --V-comp 10 --R 1000 --C 1e-7 --dt-us 10 --outdir figures --seed 1
+
+  --overlap-policy drop|defer|truncate|firmware --dead-us D resolves overlapping
+  pulses first (see dead_time.py) and writes dead_time_report.csv; the default
+  'none' superimposes overlapping currents as before.
+  --no-figures writes bench_waveform.csv only (see figrender.py).
+  Per-pulse v_max / rise time / droop / energy and their percentiles go to
+  table12_waveform_metrics_per_pulse.csv and _summary.csv (pulse_metrics.py).
+  --load randles|cpe --Rs RS [--cpe-Q Q --cpe-alpha A] replaces R||C by an
+  electrode model (see load_models.py): R is then Rct, C the double layer,
+  and the per-pulse energy is the energy delivered to the load, sum v*i dt
+  (energy_in_mJ), instead of v^2/R in R (energy_pulse_mJ).
 """
 import argparse, os, numpy as np, pandas as pd
-import matplotlib.pyplot as plt
+from dead_time import POLICIES, apply_dead_time
+from plot_decimate import fig_waveform
+import pulse_metrics
+import figrender, load_models, simcache
 
 def load_or_generate(args):
     if args.in_csv:
@@ -29,7 +43,7 @@ def load_or_generate(args):
         T.append(t)
     return np.column_stack([np.array(T), np.array(W)])
 
-def simulate_waveform(events, I_limit, V_comp, R, C, dt_us, duration_s):
+def injected_current(events, I_limit, dt_us, duration_s):
     dt = dt_us*1e-6
     N = int(np.ceil(duration_s/dt))+1
     t = np.arange(N)*dt
@@ -38,6 +52,12 @@ def simulate_waveform(events, I_limit, V_comp, R, C, dt_us, duration_s):
         start = int(np.floor(te/dt))
         n = int(np.maximum(1, np.round(w_us*1e-6/dt)))
         i[start:start+n] += I_limit
+    return t, i
+
+@simcache.memoize("1")
+def simulate_waveform(events, I_limit, V_comp, R, C, dt_us, duration_s):
+    t, i = injected_current(events, I_limit, dt_us, duration_s)
+    N = len(t); dt = dt_us*1e-6
     v = np.zeros(N, dtype=float)
     a = np.exp(-dt/(R*C)); b = R*(1.0 - a)
     for n in range(1, N):
@@ -46,6 +66,12 @@ def simulate_waveform(events, I_limit, V_comp, R, C, dt_us, duration_s):
             v[n] = V_comp
     return t, i, v
 
+@simcache.memoize("1")
+def simulate_waveform_load(events, I_limit, V_comp, load, dt_us, duration_s):
+    """As simulate_waveform for a load_models spec dict (exact per-step propagators)."""
+    t, i = injected_current(events, I_limit, dt_us, duration_s)
+    return t, i, load_models.build(load).simulate_grid(i, dt_us*1e-6, V_comp)
+
 def main():
     ap = argparse.ArgumentParser()
     ap.add_argument("--in", dest="in_csv", type=str, default=None)
@@ -60,24 +86,38 @@ def main():
     ap.add_argument("--dt-us", dest="dt_us", type=float, default=10.0)
     ap.add_argument("--outdir", dest="outdir", required=True)
     ap.add_argument("--seed", dest="seed", type=int, default=1)
+    ap.add_argument("--overlap-policy", dest="overlap_policy", choices=POLICIES, default="none")
+    ap.add_argument("--dead-us", dest="dead_us", type=float, default=0.0)
+    load_models.add_load_args(ap)
+    figrender.add_figure_args(ap)
     args = ap.parse_args()
 
     os.makedirs(args.outdir, exist_ok=True)
     events = load_or_generate(args)
-    t, i, v = simulate_waveform(events, args.I_limit, args.V_comp, args.R, args.C, args.dt_us, args.duration)
+    if args.overlap_policy != "none":
+        T, W, _, rep = apply_dead_time(events[:, 0], events[:, 1], args.dead_us, args.overlap_policy,
+                                       args.duration)
+        events = np.column_stack([T, W])
+        pd.DataFrame([rep]).to_csv(os.path.join(args.outdir, "dead_time_report.csv"), index=False)
+        print(rep)
+    if args.load == "rc":
+        t, i, v = simulate_waveform(events, args.I_limit, args.V_comp, args.R, args.C, args.dt_us, args.duration)
+    else:
+        t, i, v = simulate_waveform_load(events, args.I_limit, args.V_comp, load_models.spec_from_args(args),
+                                         args.dt_us, args.duration)
     pd.DataFrame({"time_s": t, "v_V": v, "i_A": i}).to_csv(os.path.join(args.outdir, "bench_waveform.csv"), index=False)
+    s, n = pulse_metrics.grid_indices(events[:, 0], events[:, 1], args.dt_us*1e-6)
+    if args.load == "rc":
+        per = pulse_metrics.pulse_metrics(v, args.dt_us*1e-6, s, n, args.R)
+    else:
+        per = pulse_metrics.pulse_metrics(v, args.dt_us*1e-6, s, n, i=i)
+    pulse_metrics.write_tables(per, args.outdir)
 
-    plt.figure(figsize=(7,3)); plt.plot(t, v, lw=1)
-    plt.xlabel("Time [s]"); plt.ylabel("Voltage [V]")
-    plt.title("Figure 19. Load voltage v(t) under APPI")
-    plt.grid(True, alpha=0.3); plt.tight_layout()
-    plt.savefig(os.path.join(args.outdir, "fig19_load_voltage.png"), dpi=300); plt.close()
-
-    plt.figure(figsize=(7,2.5)); plt.step(t, i, where="post", lw=1)
-    plt.xlabel("Time [s]"); plt.ylabel("Current [A]")
-    plt.title("Figure 20. Injected current I_in(t)")
-    plt.grid(True, alpha=0.3); plt.tight_layout()
-    plt.savefig(os.path.join(args.outdir, "fig20_injected_current.png"), dpi=300); plt.close()
+    with figrender.from_args(args) as fr:
+        fr.submit(fig_waveform, os.path.join(args.outdir, "fig19_load_voltage.png"),
+                  t, v, "Voltage [V]", "Figure 19. Load voltage v(t) under APPI", figsize=(7,3))
+        fr.submit(fig_waveform, os.path.join(args.outdir, "fig20_injected_current.png"),
+                  t, i, "Current [A]", "Figure 20. Injected current I_in(t)", step=True, figsize=(7,2.5))
 
     print("Done. Outputs in:", args.outdir)
 
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+CLI startup benchmark: import cost of every `appi` command.
+For each command the module is imported in a fresh interpreter with
+`python -X importtime`; the top-level entries of the report are summed
+(total import time) and the heaviest packages the module pulls in directly
+are listed. Wall time of `appi <command> --help` is measured too (median of
+--repeat runs). `gui` is left out of the default list: it has no --help and
+would open the Tk window; name it in --commands to time its import anyway
+(its --help wall time is then not measured). Every subprocess is bounded by
+--timeout seconds.
+Outputs: startup_importtime.csv
+Usage:
+  python bench_startup.py --outdir tables --repeat 5
+  python bench_startup.py --outdir tables --commands isi logger
+"""
+import argparse, os, re, statistics, subprocess, sys, time
+from appi import COMMANDS
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+_LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+NO_HELP = {"gui"}  # starts Tk immediately, no argparse
+
+def importtime(module, timeout=60.0):
+    """(total_ms, [(package, cumulative_ms), ...] direct imports of module, heaviest first)."""
+    r = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                       cwd=HERE, capture_output=True, text=True, timeout=timeout)
+    if r.returncode != 0:
+        raise RuntimeError(r.stderr.strip().splitlines()[-1])
+    top, direct = [], []
+    for m in _LINE.finditer(r.stderr):
+        depth = (len(m.group(3)) - 1) // 2  # report indents two spaces per nesting level
+        ms = int(m.group(2)) / 1000.0
+        if depth == 0:
+            top.append(ms)
+        elif depth == 1:
+            direct.append((m.group(4), ms))
+    return sum(top), sorted(direct, key=lambda x: -x[1])
+
+def help_wall_ms(cmd, repeat, timeout=60.0):
+    if cmd in NO_HELP:
+        return float("nan")
+    ts = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        try:
+            subprocess.run([sys.executable, os.path.join(HERE, "appi.py"), cmd, "--help"],
+                           cwd=HERE, capture_output=True, timeout=timeout)
+        except subprocess.TimeoutExpired:
+            return float("nan")
+        ts.append((time.perf_counter() - t0) * 1000.0)
+    return statistics.median(ts)
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--commands", dest="commands", nargs="+", default=None)
+    ap.add_argument("--repeat", dest="repeat", type=int, default=3)
+    ap.add_argument("--top", dest="top", type=int, default=3)
+    ap.add_argument("--timeout", dest="timeout", type=float, default=60.0, help="seconds per subprocess")
+    ap.add_argument("--outdir", dest="outdir", required=True)
+    args = ap.parse_args()
+
+    rows = []
+    for cmd in args.commands or [c for c in COMMANDS if c != "startup" and c not in NO_HELP]:
+        mod = COMMANDS[cmd][0]
+        try:
+            total, top = importtime(mod, args.timeout)
+        except subprocess.TimeoutExpired:
+            e = f"timed out after {args.timeout:g} s"
+            print(f"{cmd}: import {e}")
+            rows.append({"command": cmd, "module": mod, "import_ms": float("nan"),
+                         "help_wall_ms": float("nan"), "heaviest": f"error: {e}"})
+            continue
+        except RuntimeError as e:
+            print(f"{cmd}: import failed ({e})")
+            rows.append({"command": cmd, "module": mod, "import_ms": float("nan"),
+                         "help_wall_ms": float("nan"), "heaviest": f"error: {e}"})
+            continue
+        heavy = "; ".join(f"{p} {ms:.0f}ms" for p, ms in top[:args.top])
+        rows.append({"command": cmd, "module": mod, "import_ms": round(total, 1),
+                     "help_wall_ms": round(help_wall_ms(cmd, args.repeat, args.timeout), 1), "heaviest": heavy})
+        print(f"{cmd:<11} import {total:7.1f} ms   --help {rows[-1]['help_wall_ms']:7.1f} ms   {heavy}")
+
+    os.makedirs(args.outdir, exist_ok=True)
+    import csv
+    with open(os.path.join(args.outdir, "startup_importtime.csv"), "w", newline="", encoding="utf-8") as f:
+        w = csv.DictWriter(f, fieldnames=list(rows[0]))
+        w.writeheader(); w.writerows(rows)
+    print("Done. Outputs in:", args.outdir)
+
+if __name__ == "__main__":
+    main()
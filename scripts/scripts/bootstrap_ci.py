@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Bootstrap confidence intervals for the summary statistics of a pulse train.
+  iid    ISIs and PWs resampled with replacement (renewal assumption):
+         lambda_mle_Hz = 1/mean ISI, isi_mean_s, isi_std_s, pw_mean_us, pw_std_us
+  block  moving-block bootstrap of the binned train (blocks of --block-s keep
+         the short-range dependence): dominant_freq_Hz, max_to_mean_power_ratio
+         (mk_periodogram_acf.psd_summary) and decorrelation_lag_ms(<0.05),
+         mean_abs_acf_first_2s (acf_summary)
+Replicates are drawn in vectorized batches (one (b, n) index array per batch,
+b chosen so a batch stays under --boot-mem bytes) and the batches are spread
+over a process pool for large B. Batch k uses SeedSequence(seed).spawn()[k],
+so the result does not depend on the number of workers. Intervals are
+percentile intervals at level --ci. Two block statistics are not
+bootstrappable this way and get no interval (NOT_BOOTSTRAPPABLE): the
+decorrelation lag is a threshold crossing on the bin grid, so the replicates
+collapse onto one bin, and mean |ACF| is a mean of absolute values that block
+junctions bias upward, so the replicates sit above the estimate. With the
+point estimates given (ci_columns(est=...)), any interval that is degenerate
+or excludes its own estimate is dropped the same way and the reason goes in
+<stat>_ci_note.
+Outputs: bootstrap_replicates.csv (with --outdir; the CIs themselves go into
+table7 / table9b / table10b via isi_analysis1.py and mk_periodogram_acf.py --bootstrap)
+Usage:
+  python bootstrap_ci.py --in data/fig1_pulse_train.csv --B 10000 --kind iid --outdir tables
+"""
+import argparse, os, warnings, numpy as np, pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+
+ISI_STATS = ["lambda_mle_Hz", "isi_mean_s", "isi_std_s", "pw_mean_us", "pw_std_us"]
+PSD_STATS = ["dominant_freq_Hz", "max_to_mean_power_ratio"]
+ACF_STATS = ["decorrelation_lag_ms(<0.05)", "mean_abs_acf_first_2s"]
+NOT_BOOTSTRAPPABLE = {
+    "decorrelation_lag_ms(<0.05)": "not bootstrappable: threshold lag on the bin grid, replicates collapse",
+    "mean_abs_acf_first_2s": "not bootstrappable: block junctions bias mean |ACF| upward",
+}
+
+_DATA = None
+
+def _init(data):
+    global _DATA
+    _DATA = data
+
+def _run_batch(fn, seed, b):
+    return fn(_DATA, np.random.default_rng(seed), b)
+
+def run(fn, data, B, batch, seed=0, workers=None):
+    """(B, k) replicates of fn(data, rng, b) -> (b, k), in batches of at most `batch`."""
+    sizes = [min(batch, B - i) for i in range(0, B, batch)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    workers = workers if workers is not None else min(4, os.cpu_count() or 1)
+    if workers <= 1 or len(sizes) <= 1:
+        _init(data)
+        out = [_run_batch(fn, s, b) for s, b in zip(seeds, sizes)]
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(sizes)), initializer=_init, initargs=(data,)) as ex:
+            out = list(ex.map(_run_batch, [fn] * len(sizes), seeds, sizes, chunksize=max(1, len(sizes) // (8 * workers))))
+    return np.vstack(out)
+
+def _mean_std(x, idx):
+    v = x[idx]
+    return v.mean(axis=1), v.std(axis=1, ddof=1)
+
+def iid_batch(data, rng, b):
+    isi, pw = data["isi"], data["pw"]
+    m, s = _mean_std(isi, rng.integers(0, len(isi), size=(b, len(isi))))
+    pm, ps = _mean_std(pw, rng.integers(0, len(pw), size=(b, len(pw))))
+    return np.column_stack([1.0 / m, m, s, pm, ps])
+
+def block_batch(data, rng, b):
+    from mk_periodogram_acf import periodogram, acf, psd_summary, acf_summary
+    x, L, fs, max_lag = data["x"], data["L"], data["fs"], data["max_lag"]
+    N = len(x); k = -(-N // L)
+    starts = rng.integers(0, N - L + 1, size=(b, k))
+    xb = x[(starts[:, :, None] + np.arange(L)).reshape(b, -1)[:, :N]]
+    f, P = periodogram(xb, fs)
+    f_dom, ratio = psd_summary(f, P)
+    del P
+    lags, r = acf(xb, max_lag)
+    decor, mean_abs = acf_summary(lags * (1000.0 / fs), r)
+    return np.column_stack([f_dom, ratio, decor, mean_abs])
+
+def iid_replicates(isi, pw_us, B, seed=0, workers=None, mem=256e6):
+    n = max(len(isi), len(pw_us), 1)
+    batch = max(1, int(mem // (24 * n)))  # int64 index + gathered values + temporaries
+    data = {"isi": np.asarray(isi, dtype=float), "pw": np.asarray(pw_us, dtype=float)}
+    return run(iid_batch, data, B, batch, seed, workers)
+
+def block_replicates(x, fs, B, block_s=2.0, max_lag=None, seed=0, workers=None, mem=256e6):
+    N = len(x)
+    L = int(min(N, max(1, round(block_s * fs))))
+    nfft = 1 << (N + min(N, (max_lag if max_lag is not None else N) + 1) - 2).bit_length()
+    batch = max(1, int(mem // (24 * nfft)))  # zero-padded complex spectrum dominates
+    data = {"x": np.asarray(x, dtype=float), "L": L, "fs": fs, "max_lag": max_lag}
+    return run(block_batch, data, B, batch, seed, workers)
+
+def percentile_ci(reps, level=0.95):
+    """(lo, hi) per column, ignoring replicates where the statistic is undefined (nan)."""
+    a = (1.0 - level) / 2.0
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)  # all-nan column -> nan interval
+        lo, hi = np.nanquantile(reps, [a, 1.0 - a], axis=0)
+    return lo, hi
+
+def ci_note(name, est, lo, hi):
+    """Why the interval of `name` is withheld, or "" if it is usable."""
+    if name in NOT_BOOTSTRAPPABLE:
+        return NOT_BOOTSTRAPPABLE[name]
+    if est is None or not np.isfinite(lo):
+        return ""
+    if lo == hi:
+        return "degenerate interval"
+    if not lo <= est <= hi:
+        return "interval excludes the estimate"
+    return ""
+
+def ci_columns(names, reps, level=0.95, est=None):
+    """{name_ci_lo: .., name_ci_hi: ..} for the table rows; NaN where the interval is not valid.
+    With est (point estimates, same order as names) also name_ci_note."""
+    lo, hi = percentile_ci(reps, level)
+    out = {}
+    for i, (m, l, h) in enumerate(zip(names, lo, hi)):
+        note = ci_note(m, None if est is None else float(est[i]), l, h)
+        out[f"{m}_ci_lo"], out[f"{m}_ci_hi"] = (np.nan, np.nan) if note else (float(l), float(h))
+        if est is not None:
+            out[f"{m}_ci_note"] = note
+    return out
+
+def add_bootstrap_args(ap, block=False):
+    ap.add_argument("--bootstrap", dest="bootstrap", type=int, default=0,
+                    help="bootstrap replicates B for confidence intervals (0: point estimates only)")
+    ap.add_argument("--ci", dest="ci", type=float, default=0.95, help="CI level")
+    ap.add_argument("--boot-seed", dest="boot_seed", type=int, default=0)
+    ap.add_argument("--boot-workers", dest="boot_workers", type=int, default=None,
+                    help="bootstrap processes (default: min(4, CPUs))")
+    ap.add_argument("--boot-mem", dest="boot_mem", type=float, default=256e6, help="bytes per batch")
+    if block:
+        ap.add_argument("--block-s", dest="block_s", type=float, default=2.0, help="block length [s]")
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--in", dest="in_csv", required=True)
+    ap.add_argument("--kind", dest="kind", choices=["iid", "block"], default="iid")
+    ap.add_argument("--B", dest="B", type=int, default=1000)
+    ap.add_argument("--ci", dest="ci", type=float, default=0.95)
+    ap.add_argument("--bin-ms", dest="bin_ms", type=float, default=1.0)
+    ap.add_argument("--block-s", dest="block_s", type=float, default=2.0)
+    ap.add_argument("--seed", dest="seed", type=int, default=0)
+    ap.add_argument("--workers", dest="workers", type=int, default=None)
+    ap.add_argument("--mem", dest="mem", type=float, default=256e6)
+    ap.add_argument("--outdir", dest="outdir", default=None)
+    args = ap.parse_args()
+
+    df = pd.read_csv(args.in_csv)
+    if args.kind == "iid":
+        from isi_analysis1 import compute_stats
+        isi, w_us, _ = compute_stats(df)
+        names, reps = ISI_STATS, iid_replicates(isi, w_us, args.B, args.seed, args.workers, args.mem)
+    else:
+        from mk_periodogram_acf import build_binned_signal
+        x, fs = build_binned_signal(df, args.bin_ms)
+        names = PSD_STATS + ACF_STATS
+        reps = block_replicates(x, fs, args.B, args.block_s, int(2 * fs), args.seed, args.workers, args.mem)
+    lo, hi = percentile_ci(reps, args.ci)
+    note = [ci_note(m, None, l, h) for m, l, h in zip(names, lo, hi)]
+    print(pd.DataFrame({"statistic": names, "ci_lo": lo, "ci_hi": hi, "note": note}).to_string(index=False))
+    if args.outdir:
+        os.makedirs(args.outdir, exist_ok=True)
+        pd.DataFrame(reps, columns=names).to_csv(os.path.join(args.outdir, "bootstrap_replicates.csv"), index=False)
+        print("Done. Outputs in:", args.outdir)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+Event-level charge / charge-balance / energy accounting for biphasic APPI trains.
+No dense waveform: every event contributes four current edges
+(cathodic +I_c for pw_c, gap, anodic -I_a for pw_a), the edges are merged
+into piecewise-constant segments (overlapping pulses superimpose, as in
+neuro_biphasic_waveform.simulate), and R||C is advanced exactly per segment:
+  v_end = a v0 + (1-a) i R,  a = exp(-tau/RC)
+The segment maps are composed with a prefix scan (affine_scan), so a chunk
+of events costs a few NumPy passes; chunks carry (v, current, pending edges),
+so sessions of any length are streamed. Per segment, analytically:
+  charge  q = i tau
+  energy  E = i (i R tau + (v0 - i R) RC (1 - a))   delivered by the source
+Per-pulse rows attribute segments to the event window [t_k, t_k+1).
+Outputs: <prefix>_per_pulse.csv, <prefix>_summary.csv
+Usage:
+  python charge_accounting.py --in data/events.csv --I-phase 0.003 --pw-us 200 --gap-us 50 \
+      --R 1000 --C 1e-7 --outdir figures [--I-anodic 0.003 --pw-anodic-us 200] [--grid-us 10]
+"""
+import argparse, os, numpy as np, pandas as pd
+
+def affine_scan(a, b):
+    """Prefix composition of x -> a_k x + b_k along axis 0: returns (A, B) with x_k = A_k x_0 + B_k
+    after k+1 maps. O(n): the n maps are cut into ~sqrt(n) chunks of m; the recurrence runs over the
+    m positions for all chunks at once, then over the chunk carries. Only products of |a| <= 1, so it
+    is stable for any length; trailing axes are independent recurrences."""
+    a, b = np.broadcast_arrays(np.asarray(a, dtype=float), np.asarray(b, dtype=float))
+    n, rest = len(a), a.shape[1:]
+    if n == 0:
+        return a.copy(), b.copy()
+    m = max(1, int(np.sqrt(n)))
+    rows = -(-n // m)
+    pad = np.zeros((rows * m - n,) + rest)
+    A = np.concatenate([a, pad + 1.0]).reshape((rows, m) + rest).swapaxes(0, 1).copy()  # A[j, i] = a[i*m + j]
+    B = np.concatenate([b, pad]).reshape((rows, m) + rest).swapaxes(0, 1).copy()
+    for j in range(1, m):
+        B[j] += A[j] * B[j - 1]
+        A[j] *= A[j - 1]
+    PA, PB = np.ones((rows,) + rest), np.zeros((rows,) + rest)  # maps of all chunks before chunk i
+    for i in range(1, rows):
+        PA[i] = A[-1, i - 1] * PA[i - 1]
+        PB[i] = A[-1, i - 1] * PB[i - 1] + B[-1, i - 1]
+    B += A * PB
+    A *= PA
+    return (A.swapaxes(0, 1).reshape((rows * m,) + rest)[:n],
+            B.swapaxes(0, 1).reshape((rows * m,) + rest)[:n])
+
+class BiphasicAccounting:
+    def __init__(self, R, C, I_phase, pw_us, gap_us, I_anodic=None, pw_anodic_us=None, grid_us=None):
+        self.R, self.RC = float(R), float(R) * float(C)
+        self.I_c, self.I_a = float(I_phase), float(I_phase if I_anodic is None else I_anodic)
+        self.grid = None if grid_us is None else grid_us * 1e-6
+        q = (lambda us: us * 1e-6) if self.grid is None else \
+            (lambda us: int(np.round(us * 1e-6 / self.grid)) * self.grid)  # as simulate() on its dt grid
+        self.pw_c, self.gap = q(pw_us), q(gap_us)
+        self.pw_a = q(pw_us if pw_anodic_us is None else pw_anodic_us)
+        self.v, self.i, self.t = 0.0, 0.0, 0.0
+        self.pend_t, self.pend_d = np.zeros(0), np.zeros(0)
+        self.last_event = None
+        self.q_cum = 0.0
+        self.rows = []
+        self.v_peak = 0.0
+
+    def _edges(self, t):
+        t1 = t + self.pw_c; t2 = t1 + self.gap; t3 = t2 + self.pw_a
+        T = np.concatenate([t, t1, t2, t3])
+        D = np.concatenate([np.full(len(t), self.I_c), np.full(len(t), -self.I_c),
+                            np.full(len(t), -self.I_a), np.full(len(t), self.I_a)])
+        return T, D
+
+    def _advance(self, T, D, t_cut, ev_t):
+        """Segments from self.t to t_cut with edges (T, D) < t_cut; attribute to event windows ev_t."""
+        starts = np.concatenate([[self.t], T])
+        tau = np.diff(np.append(starts, t_cut))
+        cur = self.i + np.concatenate([[0.0], np.cumsum(D)])
+        a = np.exp(-tau / self.RC)
+        A, B = affine_scan(a, (1.0 - a) * cur * self.R)
+        v_end = A * self.v + B
+        v0 = np.concatenate([[self.v], v_end[:-1]])
+        E = cur * (cur * self.R * tau + (v0 - cur * self.R) * self.RC * (1.0 - a))
+        Q = cur * tau
+        k = np.searchsorted(ev_t, starts, side="right") - 1  # owning event window (-1: before first event)
+        ok = k >= 0
+        n = len(ev_t)
+        E_k = np.bincount(k[ok], E[ok], minlength=n)
+        peak = np.zeros(n)
+        np.maximum.at(peak, k[ok], np.maximum(np.abs(v0[ok]), np.abs(v_end[ok])))
+        v_at = np.append(v0, v_end[-1])[np.searchsorted(starts, ev_t, side="left")]
+        peak = np.maximum(peak, np.abs(v_at))  # also covers empty windows (coincident events)
+        self.v_peak = max(self.v_peak, float(np.max(np.abs(v_end))) if len(v_end) else 0.0)
+        self.v, self.i, self.t = float(v_end[-1]), float(cur[-1]), float(t_cut)
+        return E_k, peak, v_at, float(Q.sum())
+
+    def _emit(self, ev_t, E_k, peak, v_at, first_is_carry):
+        if first_is_carry:
+            # window of the previous chunk's last event continues here
+            r = self.rows[-1]
+            r["E_J"][-1] += E_k[0]; r["v_peak_V"][-1] = max(r["v_peak_V"][-1], peak[0])
+            ev_t, E_k, peak, v_at = ev_t[1:], E_k[1:], peak[1:], v_at[1:]
+        n = len(ev_t)
+        if not n:
+            return
+        q_c, q_a = self.I_c * self.pw_c, self.I_a * self.pw_a
+        q_cum = self.q_cum + (q_c - q_a) * np.arange(1, n + 1)
+        self.q_cum = float(q_cum[-1])
+        self.rows.append({"t_s": ev_t, "Q_cath_C": np.full(n, q_c), "Q_anod_C": np.full(n, q_a),
+                          "Q_net_C": np.full(n, q_c - q_a), "Q_net_cum_C": q_cum,
+                          "E_J": np.array(E_k, dtype=float), "v_start_V": v_at, "v_peak_V": np.array(peak, dtype=float)})
+
+    def update(self, t_events):
+        t = np.sort(np.asarray(t_events, dtype=float))
+        if not len(t):
+            return self
+        if self.grid is not None:
+            t = np.floor(t / self.grid) * self.grid
+        T, D = self._edges(t)
+        T = np.concatenate([self.pend_t, T]); D = np.concatenate([self.pend_d, D])
+        o = np.argsort(T, kind="stable"); T, D = T[o], D[o]
+        t_cut = t[-1]  # later chunks only add edges >= t_cut
+        m = np.searchsorted(T, t_cut, side="left")
+        carry = self.last_event is not None
+        ev_t = np.concatenate([[self.last_event], t]) if carry else t
+        E_k, peak, v_at = self._advance(T[:m], D[:m], t_cut, ev_t)[:3]
+        self.pend_t, self.pend_d = T[m:], D[m:]
+        # the last event's window stays open; later segments are added to its row
+        self._emit(ev_t, E_k, peak, v_at, carry)
+        self.last_event = t[-1]
+        return self
+
+    def finish(self, t_end=None):
+        """Flush pending edges (and decay to t_end if later); returns (per_pulse, summary) frames."""
+        if self.last_event is not None:
+            T, D = self.pend_t, self.pend_d
+            t_cut = max(float(T[-1]) if len(T) else self.t, t_end or 0.0)
+            ev = np.array([self.last_event])
+            E_k, peak, v_at = self._advance(T, D, t_cut, ev)[:3]
+            self._emit(ev, E_k, peak, v_at, True)
+            self.last_event, self.pend_t, self.pend_d = None, np.zeros(0), np.zeros(0)
+        cols = ["t_s", "Q_cath_C", "Q_anod_C", "Q_net_C", "Q_net_cum_C", "E_J", "v_start_V", "v_peak_V"]
+        per = pd.DataFrame({c: np.concatenate([r[c] for r in self.rows]) if self.rows else np.zeros(0)
+                            for c in cols})
+        per.index.name = "pulse"
+        n = len(per)
+        summary = pd.DataFrame([{
+            "n_pulses": n, "R_ohm": self.R, "C_F": self.RC / self.R,
+            "I_cath_A": self.I_c, "I_anod_A": self.I_a,
+            "pw_cath_us": round(self.pw_c * 1e6, 6), "pw_anod_us": round(self.pw_a * 1e6, 6),
+            "gap_us": round(self.gap * 1e6, 6),
+            "Q_cath_total_C": float(per["Q_cath_C"].sum()), "Q_anod_total_C": float(per["Q_anod_C"].sum()),
+            "Q_net_drift_C": float(self.q_cum),
+            "Q_net_max_abs_cum_C": float(per["Q_net_cum_C"].abs().max()) if n else 0.0,
+            "Q_residual_on_C_C": self.v * self.RC / self.R,
+            "E_total_J": float(per["E_J"].sum()), "E_per_pulse_mean_J": float(per["E_J"].mean()) if n else np.nan,
+            "v_peak_V": float(max(self.v_peak, per["v_peak_V"].max() if n else 0.0)),
+            "v_end_V": self.v, "t_end_s": self.t,
+        }])
+        return per, summary
+
+def account(t_events, R, C, I_phase, pw_us, gap_us, **kw):
+    return BiphasicAccounting(R, C, I_phase, pw_us, gap_us, **kw).update(t_events).finish()
+
+def write_tables(per, summary, outdir, prefix="ns_charge"):
+    os.makedirs(outdir, exist_ok=True)
+    per.to_csv(os.path.join(outdir, f"{prefix}_per_pulse.csv"))
+    summary.to_csv(os.path.join(outdir, f"{prefix}_summary.csv"), index=False)
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--in", dest="in_csv", required=True, help="CSV with column time_s")
+    ap.add_argument("--I-phase", dest="I_phase", type=float, required=True)
+    ap.add_argument("--pw-us", dest="pw_us", type=float, required=True)
+    ap.add_argument("--gap-us", dest="gap_us", type=float, required=True)
+    ap.add_argument("--I-anodic", dest="I_anodic", type=float, default=None)
+    ap.add_argument("--pw-anodic-us", dest="pw_anodic_us", type=float, default=None)
+    ap.add_argument("--R", dest="R", type=float, required=True)
+    ap.add_argument("--C", dest="C", type=float, required=True)
+    ap.add_argument("--grid-us", dest="grid_us", type=float, default=None,
+                    help="quantize to the simulator's dt grid (compare with neuro_biphasic_waveform)")
+    ap.add_argument("--chunksize", dest="chunksize", type=int, default=1_000_000)
+    ap.add_argument("--outdir", dest="outdir", required=True)
+    args = ap.parse_args()
+
+    acc = BiphasicAccounting(args.R, args.C, args.I_phase, args.pw_us, args.gap_us,
+                             args.I_anodic, args.pw_anodic_us, args.grid_us)
+    for chunk in pd.read_csv(args.in_csv, usecols=["time_s"], chunksize=args.chunksize):
+        acc.update(chunk["time_s"].to_numpy())
+    per, summary = acc.finish()
+    write_tables(per, summary, args.outdir)
+    print(summary.T.to_string(header=False))
+    print("Done. Outputs in:", args.outdir)
+
+if __name__ == "__main__":
+    main()
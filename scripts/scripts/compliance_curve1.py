@@ -2,12 +2,22 @@
 """
 Compliance curve (Figure 21 + Table 14): delivered current vs load resistance.
 Model: I_delivered = min(I_limit, V_comp / R_load).
+(DC limit; the transient first-pulse surface over C and PW is compliance_surface.py.)
+--no-figures writes the table only (see figrender.py).
 Usage:
   python compliance_curve.py --I-limit 0.01 --V-comp 10.0 --Rmin 100 --Rmax 100000 \
       --points 200 --outdir figures
 """
 import argparse, os, numpy as np, pandas as pd
-import matplotlib.pyplot as plt
+import figrender
+
+def fig_compliance(fig, R, I, I_limit):
+    ax = fig.add_subplot()
+    ax.semilogx(R, I, lw=2)
+    ax.axhline(I_limit, color="k", ls="--", lw=1, label="I_limit")
+    ax.set_xlabel("R_load [Ω]"); ax.set_ylabel("I_delivered [A]")
+    ax.set_title("Figure 21. Compliance curve")
+    ax.grid(True, which="both", alpha=0.3); ax.legend(); fig.tight_layout()
 
 def main():
     ap = argparse.ArgumentParser()
@@ -17,19 +27,15 @@ def main():
     ap.add_argument("--Rmax", dest="Rmax", type=float, default=1e5)
     ap.add_argument("--points", dest="points", type=int, default=200)
     ap.add_argument("--outdir", dest="outdir", required=True)
+    figrender.add_figure_args(ap)
     args = ap.parse_args()
 
     R = np.logspace(np.log10(args.Rmin), np.log10(args.Rmax), args.points)
     I = np.minimum(args.I_limit, args.V_comp / R)
 
     os.makedirs(args.outdir, exist_ok=True)
-    plt.figure(figsize=(6,4))
-    plt.semilogx(R, I, lw=2)
-    plt.axhline(args.I_limit, color="k", ls="--", lw=1, label="I_limit")
-    plt.xlabel("R_load [Ω]"); plt.ylabel("I_delivered [A]")
-    plt.title("Figure 21. Compliance curve")
-    plt.grid(True, which="both", alpha=0.3); plt.legend(); plt.tight_layout()
-    plt.savefig(os.path.join(args.outdir, "fig21_compliance_curve.png"), dpi=300); plt.close()
+    with figrender.from_args(args) as fr:
+        fr.submit(fig_compliance, os.path.join(args.outdir, "fig21_compliance_curve.png"), R, I, args.I_limit)
 
     pd.DataFrame({"R_load_ohm": R, "I_delivered_A": I}).to_csv(os.path.join(args.outdir, "table14_compliance_curve.csv"), index=False)
     print("Done. Outputs in:", args.outdir)
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Transient compliance surface over (R, C, PW) for the first pulse on R||C.
+From v(0) = 0 with the CCS at I_limit:  v(t) = I R (1 - exp(-t/RC)).
+Compliance is reached only if I R > V_comp, at
+  t_c = -RC ln(1 - V_comp/(I R))          (independent of PW)
+after which v is held at V_comp and the source delivers V_comp/R, so
+  Q(PW) = I min(PW, t_c) + V_comp/R max(0, PW - t_c)
+  fraction = Q / (I PW)                   (1 = full charge delivered)
+The DC curve of compliance_curve1.py is the PW -> inf limit.
+The grid is evaluated by broadcasting in chunks of R rows (--max-points);
+each chunk is streamed into the .npz and reduced to the --slice-C tables as
+it is produced, so the full fraction array is never held in memory.
+Outputs:
+  - compliance_surface.npz (R, C, PW, t_c_s[R,C], fraction[R,C,PW])
+  - table14b_time_to_compliance.csv (R x C, t_c in µs, empty = never)
+  - table14c_charge_fraction_C<C>.csv (R x PW) per --slice-C
+  - fig21b_time_to_compliance.png, fig21c_charge_fraction_C<C>.png
+Usage:
+  python compliance_surface.py --I-limit 0.01 --V-comp 10 --Rmin 100 --Rmax 1e5 --R-points 200 \
+      --Cmin 1e-9 --Cmax 1e-5 --C-points 100 --pw-min 50 --pw-max 1000 --pw-points 200 \
+      --slice-C 1e-8 1e-7 1e-6 --outdir figures
+"""
+import argparse, os, zipfile, numpy as np, pandas as pd
+import figrender
+
+def time_to_compliance(I, Vc, R, C):
+    """t_c [s] broadcast over R, C; inf where I R <= V_comp."""
+    R, C = np.asarray(R, dtype=float), np.asarray(C, dtype=float)
+    x = Vc / (I * R)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        tc = -R * C * np.log1p(-np.minimum(x, 1.0))
+    return np.where(x < 1.0, tc, np.inf)
+
+def charge_fraction(I, Vc, R, tc, PW):
+    """Delivered / requested charge for pulses of width PW [s]; R, tc, PW broadcastable."""
+    on = np.minimum(PW, tc)
+    return (I * on + Vc / R * (PW - on)) / (I * PW)
+
+def surface(I, Vc, R, C, PW, max_points=2_000_000):
+    """(t_c[R,C], blocks): blocks yields (lo, fraction[lo:hi,C,PW]) with at most max_points each."""
+    R, C, PW = (np.asarray(a, dtype=float) for a in (R, C, PW))
+    tc = time_to_compliance(I, Vc, R[:, None], C[None, :])
+    rows = max(1, max_points // (len(C) * len(PW)))
+    blocks = ((lo, charge_fraction(I, Vc, R[lo:lo+rows, None, None], tc[lo:lo+rows, :, None], PW[None, None, :]))
+              for lo in range(0, len(R), rows))
+    return tc, blocks
+
+def stream_npz(path, arrays, name, shape, blocks):
+    """Compressed .npz of arrays plus float64 name[shape], written block by block (C order, first axis).
+    Yields each (lo, block) after writing it; the file is complete once blocks is exhausted."""
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED, allowZip64=True) as zf:
+        for k, a in arrays.items():
+            with zf.open(k + ".npy", "w") as f:
+                np.lib.format.write_array(f, np.asarray(a))
+        with zf.open(name + ".npy", "w", force_zip64=True) as f:
+            np.lib.format.write_array_header_1_0(f, {"descr": "<f8", "fortran_order": False, "shape": tuple(shape)})
+            for lo, block in blocks:
+                f.write(np.ascontiguousarray(block, dtype="<f8").tobytes())
+                yield lo, block
+
+def fig_tc(fig, R, C, tc_us, pw_max):
+    ax = fig.add_subplot()
+    Z = np.ma.masked_invalid(np.log10(tc_us.T))
+    im = ax.pcolormesh(R, C, Z, shading="auto", cmap="viridis")
+    fig.colorbar(im, ax=ax, label="log10 t_c [µs]")
+    ax.contour(R, C, tc_us.T, levels=[pw_max], colors="w", linewidths=1.0, linestyles="--")
+    ax.set_xscale("log"); ax.set_yscale("log")
+    ax.set_xlabel("R_load [Ω]"); ax.set_ylabel("C_load [F]")
+    ax.set_title(f"Figure 21b. Time to compliance (dashed: PW = {pw_max:g} µs)")
+    fig.tight_layout()
+
+def fig_fraction(fig, R, PW_us, frac, C):
+    ax = fig.add_subplot()
+    im = ax.pcolormesh(R, PW_us, frac.T, shading="auto", cmap="magma", vmin=0, vmax=1)
+    fig.colorbar(im, ax=ax, label="delivered charge fraction")
+    ax.contour(R, PW_us, frac.T, levels=[0.5, 0.9, 0.99], colors="w", linewidths=0.8)
+    ax.set_xscale("log")
+    ax.set_xlabel("R_load [Ω]"); ax.set_ylabel("PW [µs]")
+    ax.set_title(f"Figure 21c. Delivered charge fraction, C = {C:.3g} F")
+    fig.tight_layout()
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--I-limit", dest="I_limit", type=float, required=True)
+    ap.add_argument("--V-comp", dest="V_comp", type=float, required=True)
+    ap.add_argument("--Rmin", dest="Rmin", type=float, default=100.0)
+    ap.add_argument("--Rmax", dest="Rmax", type=float, default=1e5)
+    ap.add_argument("--R-points", dest="R_points", type=int, default=200)
+    ap.add_argument("--Cmin", dest="Cmin", type=float, default=1e-9)
+    ap.add_argument("--Cmax", dest="Cmax", type=float, default=1e-5)
+    ap.add_argument("--C-points", dest="C_points", type=int, default=100)
+    ap.add_argument("--pw-min", dest="pw_min", type=float, default=50.0)
+    ap.add_argument("--pw-max", dest="pw_max", type=float, default=1000.0)
+    ap.add_argument("--pw-points", dest="pw_points", type=int, default=200)
+    ap.add_argument("--slice-C", dest="slice_C", type=float, nargs="+", default=[1e-8, 1e-7, 1e-6],
+                    help="C values for fraction tables/plots (nearest grid C)")
+    ap.add_argument("--max-points", dest="max_points", type=int, default=2_000_000)
+    ap.add_argument("--outdir", dest="outdir", required=True)
+    figrender.add_figure_args(ap)
+    args = ap.parse_args()
+
+    R = np.logspace(np.log10(args.Rmin), np.log10(args.Rmax), args.R_points)
+    C = np.logspace(np.log10(args.Cmin), np.log10(args.Cmax), args.C_points)
+    PW_us = np.linspace(args.pw_min, args.pw_max, args.pw_points)
+    tc, blocks = surface(args.I_limit, args.V_comp, R, C, PW_us * 1e-6, args.max_points)
+    tc_us = np.where(np.isfinite(tc), tc * 1e6, np.nan)
+    ks = sorted({int(np.argmin(np.abs(np.log(C) - np.log(c)))) for c in args.slice_C})
+    slices = np.empty((len(R), len(ks), len(PW_us)))
+    n_below = 0
+
+    os.makedirs(args.outdir, exist_ok=True)
+    shape = (len(R), len(C), len(PW_us))
+    for lo, block in stream_npz(os.path.join(args.outdir, "compliance_surface.npz"),
+                                {"R_ohm": R, "C_F": C, "PW_us": PW_us, "t_c_s": tc}, "fraction", shape, blocks):
+        slices[lo:lo+len(block)] = block[:, ks, :]
+        n_below += int(np.count_nonzero(block < 1.0))
+    df = pd.DataFrame(tc_us, index=pd.Index(R, name="R_load_ohm"), columns=[f"{c:.4g}" for c in C])
+    df.columns.name = "C_F"
+    df.to_csv(os.path.join(args.outdir, "table14b_time_to_compliance.csv"))
+
+    with figrender.from_args(args) as fr:
+        fr.submit(fig_tc, os.path.join(args.outdir, "fig21b_time_to_compliance.png"),
+                  R, C, tc_us, args.pw_max, figsize=(7,4.8))
+        for j, k in enumerate(ks):
+            tag = f"{C[k]:.3g}"
+            df = pd.DataFrame(slices[:, j, :], index=pd.Index(R, name="R_load_ohm"), columns=[f"{p:g}" for p in PW_us])
+            df.columns.name = "PW_us"
+            df.to_csv(os.path.join(args.outdir, f"table14c_charge_fraction_C{tag}.csv"))
+            fr.submit(fig_fraction, os.path.join(args.outdir, f"fig21c_charge_fraction_C{tag}.png"),
+                      R, PW_us, slices[:, j, :], C[k], figsize=(7,4.8))
+    n = int(np.prod(shape))
+    print(f"{n} grid points; compliance reached within PW at {n_below / n:.1%}")
+    print("Done. Outputs in:", args.outdir)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Multi-scale count statistics of a pulse train (Poisson verification).
+The cumulative count N(t) is read off the sorted event times with one
+searchsorted per window size over all window edges, so counts in the
+back-to-back windows [k w, (k+1) w) of [0, T) are diff(N(edges)):
+  fano(w)   = var(counts) / mean(counts)   (1 for Poisson at every w)
+  fano_lo/hi  95% band for a Poisson train with K windows:
+              (K-1) fano ~ chi2(K-1)
+For a renewal train fano(w) -> CV^2 of the ISIs for large w, so the firmware
+dead time (ISI = pw_max + Exp) shows as fano < 1 at every scale. Window
+sizes are log-spaced from --w-min to --w-max (at least --min-windows windows).
+Outputs:
+  - table7b_count_statistics.csv (window_s, n_windows, mean/var count, fano, band)
+  - fig13b_fano_vs_window.png
+Usage:
+  python count_stats.py --in data/fig1_pulse_train.csv --outdir figures
+"""
+import argparse, os, numpy as np, pandas as pd
+import figrender
+
+def window_sizes(w_min=1e-3, w_max=300.0, per_decade=10):
+    n = max(2, int(round(per_decade * np.log10(w_max / w_min))) + 1)
+    return np.logspace(np.log10(w_min), np.log10(w_max), n)
+
+def isi_cv(t):
+    isi = np.diff(np.sort(np.asarray(t, dtype=float)))
+    return float(np.std(isi, ddof=1) / np.mean(isi)) if len(isi) > 1 else np.nan
+
+def count_table(t, T, windows, min_windows=10, level=0.95):
+    """Per window size: n_windows, mean/var of the counts, Fano factor and its Poisson band."""
+    from scipy import stats
+    t = np.sort(np.asarray(t, dtype=float))
+    windows = np.asarray(windows, dtype=float)
+    windows = windows[np.floor(T / windows) >= min_windows]
+    rows = []
+    for w in windows:
+        K = int(np.floor(T / w))
+        c = np.diff(np.searchsorted(t, w * np.arange(K + 1), side="left"))
+        m, v = float(c.mean()), float(c.var(ddof=1))
+        rows.append((w, K, m, v, v / m if m > 0 else np.nan))
+    df = pd.DataFrame(rows, columns=["window_s", "n_windows", "mean_count", "var_count", "fano"])
+    a = (1.0 - level) / 2.0
+    dof = df["n_windows"].to_numpy() - 1
+    df["fano_poisson_lo"] = stats.chi2.ppf(a, dof) / dof
+    df["fano_poisson_hi"] = stats.chi2.ppf(1.0 - a, dof) / dof
+    return df
+
+def fig_fano(fig, w, fano, lo, hi, cv):
+    ax = fig.add_subplot()
+    ax.fill_between(w, lo, hi, color="0.85", label="Poisson 95% band")
+    ax.semilogx(w, fano, "o-", ms=3, label="Fano factor")
+    ax.axhline(1.0, color="k", lw=0.8, ls="--")
+    if np.isfinite(cv):
+        ax.axhline(cv**2, color="C3", lw=0.8, ls=":", label=f"ISI CV² = {cv**2:.3f}")
+    ax.set_xlabel("Window [s]"); ax.set_ylabel("var / mean of counts")
+    ax.set_title("Figure 13b. Fano factor vs. window size")
+    ax.grid(True, which="both", alpha=0.3); ax.legend(); fig.tight_layout()
+
+def write_outputs(t, T, outdir, fr, w_min=1e-3, w_max=300.0, per_decade=10, min_windows=10):
+    df = count_table(t, T, window_sizes(w_min, w_max, per_decade), min_windows)
+    os.makedirs(outdir, exist_ok=True)
+    df.to_csv(os.path.join(outdir, "table7b_count_statistics.csv"), index=False)
+    if len(df):
+        fr.submit(fig_fano, os.path.join(outdir, "fig13b_fano_vs_window.png"), df["window_s"].to_numpy(),
+                  df["fano"].to_numpy(), df["fano_poisson_lo"].to_numpy(), df["fano_poisson_hi"].to_numpy(),
+                  isi_cv(t), figsize=(6,4))
+    return df
+
+def add_count_args(ap):
+    ap.add_argument("--w-min", dest="w_min", type=float, default=1e-3, help="smallest window [s]")
+    ap.add_argument("--w-max", dest="w_max", type=float, default=300.0, help="largest window [s]")
+    ap.add_argument("--per-decade", dest="per_decade", type=int, default=10)
+    ap.add_argument("--min-windows", dest="min_windows", type=int, default=10)
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--in", dest="in_csv", required=True)
+    ap.add_argument("--outdir", dest="outdir", required=True)
+    ap.add_argument("--duration", dest="duration", type=float, default=None,
+                    help="observation length [s] (default: last event time)")
+    add_count_args(ap)
+    figrender.add_figure_args(ap)
+    args = ap.parse_args()
+
+    t = np.sort(pd.read_csv(args.in_csv, usecols=["time_s"])["time_s"].to_numpy())
+    T = args.duration if args.duration is not None else float(t[-1])
+    with figrender.from_args(args) as fr:
+        df = write_outputs(t, T, args.outdir, fr, args.w_min, args.w_max, args.per_decade, args.min_windows)
+    print(f"ISI CV = {isi_cv(t):.4f}; Fano outside the Poisson band at "
+          f"{int(((df['fano'] < df['fano_poisson_lo']) | (df['fano'] > df['fano_poisson_hi'])).sum())}/{len(df)} window sizes")
+    print("Done. Outputs in:", args.outdir)
+
+if __name__ == "__main__":
+    main()
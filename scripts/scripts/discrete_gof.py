@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Discrete-uniform goodness-of-fit for integer pulse widths (O(n), streaming).
+Firmware draws PW as a + random(0, b-a+1), i.e. DiscreteUniform{a..b}, so the
+test works on counts per integer µs value built with np.bincount; chunks of a
+long log can be fed one at a time and nothing is sorted.
+  - chi^2 vs equal expected counts (df = b-a)
+  - discrete KS: max |F_emp(k) - F_model(k)| over the support; the asymptotic
+    Kolmogorov p-value is conservative for discrete models.
+Inputs: CSV with column pulse_width_us (read in chunks).
+Outputs: table8c_pw_discrete_gof.csv (test, statistic, D, p_value, n, ...):
+  statistic is the test's own statistic (chi^2 or KS D); D only holds KS D.
+Usage:
+  python discrete_gof.py --in data/fig1_pulse_train.csv --pw-min 50 --pw-max 1000 \
+      --chunksize 1000000 --outdir figures
+"""
+import argparse, os, numpy as np, pandas as pd
+from ks_batch import kolmogorov_sf
+
+class DiscreteUniformGOF:
+    def __init__(self, pw_min_us, pw_max_us):
+        self.a, self.b = int(pw_min_us), int(pw_max_us)
+        self.counts = np.zeros(self.b - self.a + 1, dtype=np.int64)
+        self.n_out_of_range = 0
+
+    def update(self, w_us):
+        k = np.asarray(w_us).astype(np.int64, copy=False) - self.a
+        ok = (k >= 0) & (k < len(self.counts))
+        self.n_out_of_range += int(len(k) - np.count_nonzero(ok))
+        self.counts += np.bincount(k[ok], minlength=len(self.counts))
+        return self
+
+    def result(self):
+        from scipy import stats
+        c = self.counts
+        n, K = int(c.sum()), len(c)
+        if n == 0:
+            return {"n": 0, "chi2": np.nan, "chi2_df": K - 1, "chi2_p": np.nan,
+                    "KS_D": np.nan, "KS_p": np.nan, "n_out_of_range": self.n_out_of_range}
+        e = n / K
+        chi2 = float(np.sum((c - e)**2) / e)
+        F_emp = np.cumsum(c) / n
+        F_mod = np.arange(1, K + 1) / K
+        D = float(np.max(np.abs(F_emp - F_mod)))
+        sn = np.sqrt(n)
+        return {"n": n, "chi2": chi2, "chi2_df": K - 1,
+                "chi2_p": float(stats.chi2.sf(chi2, K - 1)) if K > 1 else np.nan,
+                "KS_D": D, "KS_p": float(kolmogorov_sf((sn + 0.12 + 0.11/sn) * D)),
+                "n_out_of_range": self.n_out_of_range}
+
+def gof_rows(res, a, b):
+    """Rows in the table8 (test, D, p_value, n) layout plus statistic; D is NaN for the chi^2 row."""
+    return [
+        {"test": f"Chi2 PW vs DiscreteUniform[{a},{b}] (df={res['chi2_df']})", "D": np.nan,
+         "p_value": res["chi2_p"], "n": res["n"], "statistic": res["chi2"]},
+        {"test": f"KS PW vs DiscreteUniform[{a},{b}]", "D": res["KS_D"], "p_value": res["KS_p"], "n": res["n"],
+         "statistic": res["KS_D"]},
+    ]
+
+def gof_from_csv(path, pw_min_us, pw_max_us, col="pulse_width_us", chunksize=1_000_000):
+    g = DiscreteUniformGOF(pw_min_us, pw_max_us)
+    for chunk in pd.read_csv(path, usecols=[col], chunksize=chunksize):
+        g.update(chunk[col].to_numpy())
+    return g
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--in", dest="in_csv", required=True)
+    ap.add_argument("--pw-min", dest="pw_min_us", type=int, required=True)
+    ap.add_argument("--pw-max", dest="pw_max_us", type=int, required=True)
+    ap.add_argument("--col", dest="col", default="pulse_width_us")
+    ap.add_argument("--chunksize", dest="chunksize", type=int, default=1_000_000)
+    ap.add_argument("--outdir", dest="outdir", required=True)
+    args = ap.parse_args()
+
+    g = gof_from_csv(args.in_csv, args.pw_min_us, args.pw_max_us, args.col, args.chunksize)
+    res = g.result()
+    df = pd.DataFrame(gof_rows(res, g.a, g.b))[["test", "statistic", "D", "p_value", "n"]]
+    df["n_out_of_range"] = res["n_out_of_range"]
+    os.makedirs(args.outdir, exist_ok=True)
+    df.to_csv(os.path.join(args.outdir, "table8c_pw_discrete_gof.csv"), index=False)
+    print("Done. Outputs in:", args.outdir)
+
+if __name__ == "__main__":
+    main()
@@ -3,6 +3,13 @@
 Operational envelope: v_peak(λ, PW) heatmap for R||C driven by CCS (periodic, conservative).
 We simulate period T=1/λ with ON=PW (I=I_limit), OFF=T-PW, sa tačnim RC rekurentnim ažuriranjem.
 Compliance clamp: v capped to V_comp in ON.
+--no-figures writes the table only (see figrender.py).
+Grid cells are memoized by simcache (APPI_CACHE=off to recompute), so
+re-running with an extended grid only simulates the new cells.
+--load randles|cpe maps an electrode model instead (see load_models.py);
+ON steps and the OFF interval reuse cached propagators.
+For R||C the exact steady-state boundary v_peak = 0.95 V_comp
+(safe_envelope_solver.py) is overlaid in red.
 
 Usage:
   python env_map_vpeak.py --I-limit 0.01 --V-comp 10 --R 1000 --C 1e-7 \
@@ -11,8 +18,10 @@ Usage:
       --dt-us 50 --periods 200 --outdir figures
 """
 import argparse, os, numpy as np, pandas as pd
-import matplotlib.pyplot as plt
+import figrender, load_models, simcache
+from safe_envelope_solver import max_lambda_periodic
 
+@simcache.memoize("1")
 def simulate_vpeak(I, Vc, R, C, lam, PW_us, dt_us=50, periods=200):
     T = 1.0/lam; PW = PW_us * 1e-6; off = max(0.0, T - PW)
     v = 0.0; vmax = 0.0
@@ -30,6 +39,36 @@ def simulate_vpeak(I, Vc, R, C, lam, PW_us, dt_us=50, periods=200):
             a = a_dt(dt); v = v*a; t += dt
     return vmax
 
+@simcache.memoize("1")
+def simulate_vpeak_load(I, Vc, load, lam, PW_us, dt_us=50, periods=200):
+    """simulate_vpeak for a load_models spec dict; terminal voltage incl. the series drop."""
+    L = load_models.build(load)
+    T = 1.0/lam; PW = PW_us * 1e-6; off = max(0.0, T - PW); h = dt_us*1e-6
+    n_full = int(PW // h); rest = PW - n_full*h
+    steps = [h]*n_full + ([rest] if rest > 1e-12 else [])
+    x = np.zeros(L.n_states); vmax = 0.0
+    for _ in range(periods):
+        for dt in steps:
+            x, v, _ = L.step(x, I, dt, Vc)
+            vmax = max(vmax, v)
+        if off > 0:
+            x, _, _ = L.step(x, 0.0, off)
+    return vmax
+
+def fig_env_map(fig, Z, lambdas, pws, Vc, safe_lam=None):
+    ax = fig.add_subplot()
+    im = ax.imshow(Z, origin="lower", aspect="auto",
+                   extent=[lambdas.min(), lambdas.max(), pws.min(), pws.max()],
+                   cmap="viridis")
+    fig.colorbar(im, ax=ax, label="v_peak [V]")
+    ax.contour(lambdas, pws, Z, levels=[0.95*Vc], colors="w", linewidths=1.0, linestyles="--")
+    if safe_lam is not None:
+        ax.plot(safe_lam, pws, color="r", lw=1.2, label="steady state 0.95·V_comp")
+        ax.set_xlim(lambdas.min(), lambdas.max()); ax.legend(loc="upper right", fontsize=8)
+    ax.set_xlabel("λ [Hz]"); ax.set_ylabel("PW [μs]")
+    ax.set_title("Figure 23. Operational envelope: v_peak on R||C (CCS)")
+    fig.tight_layout()
+
 def main():
     ap = argparse.ArgumentParser()
     ap.add_argument("--I-limit", dest="I", type=float, required=True)
@@ -45,25 +84,27 @@ def main():
     ap.add_argument("--dt-us", dest="dt_us", type=float, default=50.0)
     ap.add_argument("--periods", dest="periods", type=int, default=200)
     ap.add_argument("--outdir", dest="outdir", required=True)
+    load_models.add_load_args(ap)
+    figrender.add_figure_args(ap)
     args = ap.parse_args()
+    load = None if args.load == "rc" else load_models.spec_from_args(args)
 
     lambdas = np.linspace(args.lambda_min, args.lambda_max, args.lambda_steps)
     pws = np.linspace(args.pw_min, args.pw_max, args.pw_steps)
     Z = np.zeros((len(pws), len(lambdas)))
     for i, pw in enumerate(pws):
         for j, lam in enumerate(lambdas):
-            Z[i, j] = simulate_vpeak(args.I, args.Vc, args.R, args.C, lam, pw, dt_us=args.dt_us, periods=args.periods)
+            if load is None:
+                Z[i, j] = simulate_vpeak(args.I, args.Vc, args.R, args.C, lam, pw, dt_us=args.dt_us, periods=args.periods)
+            else:
+                Z[i, j] = simulate_vpeak_load(args.I, args.Vc, load, lam, pw, dt_us=args.dt_us, periods=args.periods)
 
     os.makedirs(args.outdir, exist_ok=True)
-    plt.figure(figsize=(7,4.8))
-    im = plt.imshow(Z, origin="lower", aspect="auto",
-                    extent=[lambdas.min(), lambdas.max(), pws.min(), pws.max()],
-                    cmap="viridis")
-    plt.colorbar(im, label="v_peak [V]")
-    plt.contour(lambdas, pws, Z, levels=[0.95*args.Vc], colors="w", linewidths=1.0, linestyles="--")
-    plt.xlabel("λ [Hz]"); plt.ylabel("PW [μs]")
-    plt.title("Figure 23. Operational envelope: v_peak on R||C (CCS)")
-    plt.tight_layout(); plt.savefig(os.path.join(args.outdir, "fig23_env_map_vpeak.png"), dpi=300); plt.close()
+    with figrender.from_args(args) as fr:
+        fr.submit(fig_env_map, os.path.join(args.outdir, "fig23_env_map_vpeak.png"),
+                  Z, lambdas, pws, args.Vc,
+                  None if load else max_lambda_periodic(args.I, args.R, args.C, pws, 0.95*args.Vc)[0],
+                  figsize=(7,4.8))
 
     df = pd.DataFrame(Z, index=[f"{int(p)}" for p in pws], columns=[f"{l:.3f}" for l in lambdas])
     df.index.name = "PW_us"; df.columns.name = "lambda_Hz"
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+Crash-safe, append-only session journal for the serial logger.
+One text record per line, each with its own checksum:
+  <seq>,<utc_iso>,<kind>,<payload>*<crc32 of everything before '*', 8 hex>
+  kind  H  header    {"format": 1, "session": <id>, "created": <iso>}
+        C  command   sent to the device (SET,..., SEED,..., START, STOP)
+        E  event     EV/BIP line from the device
+        R  resume    the session was reopened (payload: reason)
+        L  link lost
+Records are flushed on every append and fsync'ed every fsync_s seconds or
+fsync_n records, whichever comes first, so a crash loses at most that window.
+A Journal is shared by the reader thread (events) and the main thread
+(commands, link lost, resume): seq assignment, the write and the state update
+happen under one lock, so records never interleave or reuse a seq.
+Opening an existing journal runs recover(): records are checked in order
+(checksum, seq = previous + 1) and the file is truncated after the last valid
+one (a half-written row from a dead process or USB link). The recovered state
+(last SET per parameter, seed, whether START is in effect) is what
+pc_serial_logger --resume reapplies before appending to the same file.
+Usage:
+  python event_journal.py --journal logs/session1.jnl               (check / recover, print state)
+  python event_journal.py --journal logs/session1.jnl --export logs/session1.csv
+"""
+import argparse, csv, json, os, threading, time, uuid, zlib
+from datetime import datetime, timezone
+
+FORMAT = 1
+
+def _utc():
+    return datetime.now(timezone.utc).replace(tzinfo=None).isoformat()  # naive UTC, as before
+
+def encode(seq, ts, kind, payload):
+    body = f"{seq},{ts},{kind},{payload.replace(chr(13), ' ').replace(chr(10), ' ')}".encode("utf-8")
+    return body + b"*" + f"{zlib.crc32(body):08x}".encode("ascii") + b"\n"
+
+def decode(line):
+    """(seq, ts, kind, payload) of a complete, checksummed record, else None."""
+    if not line.endswith(b"\n"):
+        return None
+    body, sep, crc = line[:-1].rpartition(b"*")
+    if not sep or len(crc) != 8:
+        return None
+    try:
+        if int(crc, 16) != zlib.crc32(body):
+            return None
+        seq, ts, kind, payload = body.decode("utf-8").split(",", 3)
+        return int(seq), ts, kind, payload
+    except ValueError:
+        return None
+
+def new_state():
+    return {"session": None, "records": 0, "last_seq": 0, "last_ts": "", "events": 0,
+            "params": {}, "seed": None, "running": False, "resumes": 0}
+
+def apply_record(state, seq, ts, kind, payload):
+    state["records"] += 1; state["last_seq"] = seq; state["last_ts"] = ts
+    if kind == "H":
+        state["session"] = json.loads(payload)["session"]
+    elif kind == "E":
+        state["events"] += 1
+    elif kind == "R":
+        state["resumes"] += 1
+    elif kind == "C":
+        f = payload.split(",")
+        if f[0] == "SET" and len(f) >= 3:
+            state["params"][f[1]] = f[2]
+        elif f[0] == "SEED":
+            state["seed"] = payload
+        elif f[0] == "START":
+            state["running"] = True
+        elif f[0] == "STOP":
+            state["running"] = False
+
+def recover(path, truncate=True):
+    """Scan the journal; returns (state, truncated_bytes). Truncates after the last valid record."""
+    state = new_state(); good = 0
+    with open(path, "rb") as f:
+        for line in f:
+            rec = decode(line)
+            if rec is None or rec[0] != state["last_seq"] + 1:
+                break
+            apply_record(state, *rec)
+            good += len(line)
+    size = os.path.getsize(path)
+    if truncate and size > good:
+        with open(path, "r+b") as f:
+            f.truncate(good)
+            os.fsync(f.fileno())
+    return state, size - good
+
+def resume_commands(state):
+    """Commands that put the device back into the journaled configuration (seed is kept, not re-sent)."""
+    cmds = [f"SET,{k},{v}" for k, v in state["params"].items()]
+    if state["running"]:
+        cmds.append("START")
+    return cmds
+
+class Journal:
+    """Append-only journal; has csv.writer's writerow([utc_iso, line]) for pc_serial_logger.reader_thread."""
+    def __init__(self, path, fsync_s=1.0, fsync_n=1000):
+        self.path, self.fsync_s, self.fsync_n = path, fsync_s, fsync_n
+        d = os.path.dirname(path)
+        if d:
+            os.makedirs(d, exist_ok=True)
+        if os.path.exists(path) and os.path.getsize(path) > 0:
+            self.state, self.truncated = recover(path)
+        else:
+            self.state, self.truncated = new_state(), 0
+        self._f = open(path, "ab")
+        self._lock = threading.RLock()  # append() may sync() while holding it
+        self._pending = 0; self._last_sync = time.monotonic()
+        if self.state["session"] is None:
+            self.append("H", json.dumps({"format": FORMAT, "session": uuid.uuid4().hex, "created": _utc()}))
+            self.sync()
+
+    @property
+    def resumed(self):
+        return self.state["records"] > 1
+
+    def append(self, kind, payload, ts=None):
+        with self._lock:
+            seq = self.state["last_seq"] + 1
+            ts = ts or _utc()
+            self._f.write(encode(seq, ts, kind, payload))
+            self._f.flush()
+            apply_record(self.state, seq, ts, kind, payload)
+            self._pending += 1
+            if self._pending >= self.fsync_n or time.monotonic() - self._last_sync >= self.fsync_s:
+                self.sync()
+
+    def sync(self):
+        with self._lock:
+            self._f.flush()
+            os.fsync(self._f.fileno())
+            self._pending = 0; self._last_sync = time.monotonic()
+
+    def command(self, cmd):
+        self.append("C", cmd)
+
+    def writerow(self, row):
+        self.append("E", row[1], ts=row[0])
+
+    def close(self):
+        with self._lock:
+            if not self._f.closed:
+                self.sync()
+                self._f.close()
+
+def iter_records(path):
+    """Valid records in order (stops at the first damaged one, without truncating)."""
+    last = 0
+    with open(path, "rb") as f:
+        for line in f:
+            rec = decode(line)
+            if rec is None or rec[0] != last + 1:
+                return
+            last = rec[0]
+            yield rec
+
+def export_csv(path, out_csv):
+    """Events as the logger's plain CSV (utc_iso, line)."""
+    n = 0
+    with open(out_csv, "w", newline="", encoding="utf-8") as f:
+        w = csv.writer(f)
+        w.writerow(["utc_iso", "line"])
+        for _, ts, kind, payload in iter_records(path):
+            if kind == "E":
+                w.writerow([ts, payload]); n += 1
+    return n
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--journal", dest="journal", required=True)
+    ap.add_argument("--export", dest="export", default=None, help="write the events as utc_iso,line CSV")
+    ap.add_argument("--no-truncate", dest="no_truncate", action="store_true", help="report damage only")
+    args = ap.parse_args()
+
+    state, cut = recover(args.journal, truncate=not args.no_truncate)
+    print(f"session {state['session']}: {state['records']} records, {state['events']} events, "
+          f"{state['resumes']} resume(s), last {state['last_ts'] or '-'}")
+    print(f"params {state['params']}  seed {state['seed'] or '-'}  running {state['running']}")
+    if cut:
+        print(f"{'damaged tail' if args.no_truncate else 'truncated'}: {cut} bytes after record {state['last_seq']}")
+    if args.export:
+        print(f"{export_csv(args.journal, args.export)} events -> {args.export}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Headless figure rendering service.
+Figures are built with the object-oriented API on an Agg canvas
+(matplotlib.figure.Figure, no pyplot state), so independent figures can be
+drawn in worker processes. A draw function takes (fig, *args, **kwargs) and
+fills the figure; the service creates the figure, calls it, saves it (via
+plot_decimate.savefig, so envelope lines are re-binned for the final layout)
+and lets it go out of scope.
+
+  with figrender.from_args(args) as fr:
+      fr.submit(draw_isi_cdf, "figures/fig13_isi_cdf.png", isi, lam, figsize=(5,4))
+
+Jobs are queued and rendered when the block exits: inline for a single job or
+--fig-workers 1, otherwise on a process pool. --no-figures drops every job,
+so scripts can regenerate only the tables.
+
+A job goes to the pool only if the worker can import its draw function by
+name: functions defined in __main__ (or nested/lambda) are rendered in-process
+unless the pool forks, since a spawned worker cannot see a script run directly
+or through appi/runpy. Arrays of SPILL_BYTES or more are not pickled: they are
+written once to a temporary .npy file and memory-mapped by the worker.
+"""
+import os, sys, shutil, tempfile
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor
+
+SPILL_BYTES = 1 << 20
+
+def new_figure(figsize=(6, 4)):
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    fig = Figure(figsize=figsize)
+    FigureCanvasAgg(fig)
+    return fig
+
+def render(fn, path, args=(), kwargs=None, figsize=(6, 4), dpi=300):
+    from plot_decimate import savefig
+    fig = new_figure(figsize)
+    fn(fig, *args, **(kwargs or {}))
+    savefig(path, dpi, fig=fig)
+    return path
+
+class Spilled:
+    """Reference to an array saved as .npy; the worker maps it copy-on-write."""
+    def __init__(self, path):
+        self.path = path
+
+def spill(x, tmpdir):
+    """Replace large arrays in x (nested tuples/lists/dicts) with Spilled files."""
+    import numpy as np
+    if isinstance(x, np.ndarray) and x.dtype != object and x.nbytes >= SPILL_BYTES:
+        fd, p = tempfile.mkstemp(suffix=".npy", dir=tmpdir)
+        with os.fdopen(fd, "wb") as f:
+            np.save(f, x)
+        return Spilled(p)
+    if isinstance(x, (tuple, list)):
+        return type(x)(spill(v, tmpdir) for v in x)
+    if isinstance(x, dict):
+        return {k: spill(v, tmpdir) for k, v in x.items()}
+    return x
+
+def unspill(x):
+    if isinstance(x, Spilled):
+        import numpy as np
+        return np.load(x.path, mmap_mode="c")
+    if isinstance(x, (tuple, list)):
+        return type(x)(unspill(v) for v in x)
+    if isinstance(x, dict):
+        return {k: unspill(v) for k, v in x.items()}
+    return x
+
+def render_spilled(fn, path, args, kwargs, figsize, dpi):
+    return render(fn, path, unspill(args), unspill(kwargs), figsize, dpi)
+
+def portable(fn):
+    """True if a pool worker can resolve fn by module and qualified name."""
+    mod, name = getattr(fn, "__module__", None), getattr(fn, "__qualname__", "")
+    if mod is None or "<" in name:
+        return False
+    if mod == "__main__" and mp.get_start_method() != "fork":
+        return False
+    obj = sys.modules.get(mod)
+    for part in name.split("."):
+        obj = getattr(obj, part, None)
+    return obj is fn
+
+class FigureRenderer:
+    def __init__(self, workers=None, enabled=True):
+        self.workers = workers if workers is not None else min(4, os.cpu_count() or 1)
+        self.enabled = enabled
+        self.jobs = []
+
+    def submit(self, fn, path, *args, figsize=(6, 4), dpi=300, **kwargs):
+        if self.enabled:
+            self.jobs.append((fn, path, args, kwargs, figsize, dpi))
+
+    def run(self):
+        """Render all queued jobs; returns the written paths in submit order."""
+        jobs, self.jobs = self.jobs, []
+        pool = [i for i, j in enumerate(jobs) if portable(j[0])]
+        if len(pool) <= 1 or self.workers <= 1:
+            return [render(*j) for j in jobs]
+        out = [None] * len(jobs)
+        tmpdir = tempfile.mkdtemp(prefix="figrender_")
+        try:
+            with ProcessPoolExecutor(max_workers=min(self.workers, len(pool))) as ex:
+                futs = {i: ex.submit(render_spilled, jobs[i][0], jobs[i][1], spill(jobs[i][2], tmpdir),
+                                     spill(jobs[i][3], tmpdir), *jobs[i][4:]) for i in pool}
+                for i, j in enumerate(jobs):
+                    if i not in futs:
+                        out[i] = render(*j)
+                for i, f in futs.items():
+                    out[i] = f.result()
+        finally:
+            shutil.rmtree(tmpdir, ignore_errors=True)
+        return out
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.run()
+        return False
+
+def add_figure_args(ap):
+    ap.add_argument("--no-figures", dest="no_figures", action="store_true", help="write tables only")
+    ap.add_argument("--fig-workers", dest="fig_workers", type=int, default=None,
+                    help="processes for figure rendering (1 = inline)")
+
+def from_args(args):
+    return FigureRenderer(args.fig_workers, not args.no_figures)
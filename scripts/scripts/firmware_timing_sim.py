@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+Discrete-event model of the firmware timing (predicts Table 9 before flashing).
+Both scheduling models are evaluated over whole event arrays with NumPy:
+
+  baseline   loop(): sample dt -> delayMicroseconds(dt) -> sample PW -> pulse
+             (delayMicroseconds(w)) -> sample dt for the log -> blocking Serial.print.
+             The UART/TX-buffer coupling is a 2x2 max-plus recursion, solved
+             exactly with a prefix scan.
+  timer_isr  Timer1 CTC tick; the ISR fires on the first tick with
+             tick_us >= next_fire_us and !pulse_active; loop() plans the next
+             event (noInterrupts() while sampling -> ticks can be lost) and then
+             prints the EV line. Serial blocking delays the next planning step
+             (3x3 max-plus recursion); tick quantisation is then applied exactly.
+
+AVR costs (sampling -log(u), random(), digitalWrite, print formatting) and the
+UART (baud, 10 bits/char, 64-byte TX buffer) are parameters.
+Jitter = actual ISI - planned ISI; p95/p99/max and the miss rate use |jitter|.
+
+Outputs:
+  - table9_timing_metrics_model.csv (Table 9 columns + model diagnostics)
+  - fig9_jitter_baseline_model.png, fig10_jitter_isr_model.png
+Usage:
+  python firmware_timing_sim.py --lambda 2.0 --pw-min 50 --pw-max 1000 \
+      --events 1000000 --tick-us 100 --baud 115200 --outdir figures --seed 1
+"""
+import argparse, os, numpy as np, pandas as pd
+import figrender
+
+AVR_DEFAULTS = {
+    "t_random_us": 45.0,      # random() on 16 MHz AVR
+    "t_log_us": 150.0,        # soft-float log() + divide/multiply in sample_dt_us
+    "t_mod_us": 40.0,         # 32-bit modulo in random(0, span)
+    "t_digitalwrite_us": 4.0,
+    "t_fmt_us_per_char": 6.0, # Serial.print number formatting / buffer copy
+    "t_loop_us": 12.0,        # one idle loop() pass (RX poll + flag check)
+    "isr_latency_us": 6.0,    # ISR entry + contention (uniform 0..value)
+    "tx_buffer_bytes": 64,
+    "bits_per_char": 10,
+}
+
+def sample_plans(lambda_hz, pw_min_us, pw_max_us, n, rng):
+    """Planned dt (µs) and PW (µs) exactly as sample_dt_us / sample_pw_us compute them."""
+    rv = rng.integers(0, 0x7FFFFFFF, n)
+    u = ((rv + 1) / np.float32(2147483648.0)).astype(np.float32)
+    dt = np.maximum((-np.log(u.astype(float)) / lambda_hz * 1e6).astype(np.int64), 1)
+    pw = pw_min_us + rng.integers(0, pw_max_us - pw_min_us + 1, n)
+    return dt, pw
+
+def n_digits(x):
+    x = np.asarray(x, dtype=float)
+    return np.where(x >= 1, np.floor(np.log10(np.maximum(x, 1))) + 1, 1).astype(np.int64)
+
+def ev_line_chars(t_ms, w_us, next_dt_ms):
+    # "EV,t_ms=<>,w_us=<>,next_dt_ms=<>\r\n"
+    return 8 + n_digits(t_ms) + 6 + n_digits(w_us) + 12 + n_digits(next_dt_ms) + 2
+
+def uart_finish(S, char_us, L):
+    """U_k = max(U_{k-1}, S_k) + L_k*c, vectorized via cumulative max."""
+    C = np.cumsum(L * char_us)
+    return C + np.maximum.accumulate(S - (C - L * char_us))
+
+def maxplus_prefix(M):
+    """Inclusive prefix products P_k = M_k (x) ... (x) M_0 of (n,d,d) max-plus matrices."""
+    P = M.copy()
+    s = 1
+    while s < len(P):
+        P[s:] = np.max(P[s:, :, :, None] + P[:-s, None, :, :], axis=2)
+        s *= 2
+    return P
+
+def maxplus_run(M, y0, chunk=1 << 15):
+    """States y_0..y_n of y_{k+1} = M_k (x) y_k, scanned chunk by chunk to bound memory."""
+    Y = np.empty((len(M) + 1, len(y0)))
+    Y[0] = y0
+    for i in range(0, len(M), chunk):
+        P = maxplus_prefix(M[i:i+chunk])
+        Y[i+1:i+1+len(P)] = np.max(P + Y[i][None, None, :], axis=2)
+    return Y
+
+def simulate_baseline(dt, pw, baud, rng, p=AVR_DEFAULTS, delay_wrap16=False):
+    n = len(dt)
+    c = p["bits_per_char"] * 1e6 / baud
+    Bc = p["tx_buffer_bytes"] * c
+    t_dt = p["t_random_us"] + p["t_log_us"]
+    t_pw = p["t_random_us"] + p["t_mod_us"]
+    dly = (dt & 0xFFFF) if delay_wrap16 else dt  # delayMicroseconds(unsigned int) on AVR
+    # gap from end of print k-1 to print start k
+    g = p["t_loop_us"] + t_dt + dly + t_pw + 2*p["t_digitalwrite_us"] + pw + t_dt
+    log_dt = rng.permutation(dt)  # the second sample_dt_us() only sets the printed digits
+    L = ev_line_chars(np.cumsum(g) / 1000.0, pw, log_dt // 1000)
+    f = p["t_fmt_us_per_char"] * L
+    l = L * c
+    # y_k = (S_k, U_{k-1}):  S_{k+1} = max(S_k + max(f, l-Bc), U_{k-1} + l - Bc) + g_{k+1}
+    #                        U_k     = max(S_k, U_{k-1}) + l
+    g_next = np.append(g[1:], 0.0)
+    M = np.empty((n, 2, 2))
+    M[:, 0, 0] = np.maximum(f, l - Bc) + g_next
+    M[:, 0, 1] = l - Bc + g_next
+    M[:, 1, 0] = l
+    M[:, 1, 1] = l
+    Y = maxplus_run(M, np.array([g[0], -np.inf]))
+    S, U = Y[:-1, 0], Y[1:, 1]
+    E = np.maximum(S + f, U - Bc)
+    block = E - S - f
+    edge = S - pw - p["t_digitalwrite_us"] - t_dt
+    return edge, dt, block, np.zeros(n)
+
+def simulate_timer_isr(dt, pw, baud, tick_us, rng, p=AVR_DEFAULTS):
+    n = len(dt)
+    T = float(tick_us)
+    c = p["bits_per_char"] * 1e6 / baud
+    Bc = p["tx_buffer_bytes"] * c
+    t_cs = 2*p["t_random_us"] + p["t_log_us"] + p["t_mod_us"]  # noInterrupts() section in loop()
+    lat = rng.uniform(0.0, p["isr_latency_us"], n) + p["t_digitalwrite_us"]
+    eps = lat + rng.uniform(0.0, p["t_loop_us"], n)            # fired_flag seen by loop()
+    # event k fires with armed pw[k] and plans (and prints) dt[k+1], pw[k+1]
+    dt_next = np.append(dt[1:], dt[0])
+    L = ev_line_chars(np.cumsum(dt) / 1000.0, np.append(pw[1:], pw[0]), dt_next // 1000)
+    f = p["t_fmt_us_per_char"] * L
+    l = L * c
+    # 1) serial coupling in continuous time, y_k = (A_k, E_{k-1}, U_{k-1}):
+    #    Q_k = max(A_k + eps_k, E_{k-1}); S_k = Q_k + t_cs; U_k = max(U_{k-1}, S_k) + l_k
+    #    E_k = max(S_k + f_k, U_k - Bc);  A_{k+1} = max(Q_k + max(dt_{k+1}, t_cs), A_k + pw_k)
+    h = np.maximum(dt_next, t_cs)
+    m1 = np.maximum(f, l - Bc)
+    M = np.full((n, 3, 3), -np.inf)
+    M[:, 0, 0] = np.maximum(eps + h, pw); M[:, 0, 1] = h
+    M[:, 1, 0] = eps + t_cs + m1;         M[:, 1, 1] = t_cs + m1;  M[:, 1, 2] = l - Bc
+    M[:, 2, 0] = eps + t_cs + l;          M[:, 2, 1] = t_cs + l;   M[:, 2, 2] = l
+    Y = maxplus_run(M, np.array([float(dt[0]), -np.inf, -np.inf]))
+    A, E_prev = Y[:-1, 0], Y[:-1, 1]
+    D = np.maximum(eps, E_prev - A)                  # planning delay after the fire tick
+    S = A + D + t_cs
+    block = np.maximum(S + f, Y[1:, 2] - Bc) - S - f
+    # 2) tick quantisation (exact given D): next_fire = tick_us + dt, lost ticks while
+    #    interrupts are off for t_cs, first tick with counter >= max(next_fire, pulse_end)
+    m = np.floor((D + t_cs) / T) - np.floor(D / T)
+    lost = np.maximum(m - 1, 0)
+    delta = np.maximum(np.floor(D / T) * T + dt_next, pw)
+    dF = np.maximum(np.ceil(delta / T) + lost, np.floor((D + t_cs) / T) + 1)
+    F = np.ceil(dt[0] / T) + np.concatenate([[0.0], np.cumsum(dF[:-1])])
+    return F*T + lat, dt, block, lost
+
+def timing_metrics(edge, dt, block, lost, miss_ms=5.0):
+    jit = (np.diff(edge) - dt[1:]) / 1000.0
+    a = np.abs(jit)
+    return {
+        "mean_jitter_ms": float(np.mean(jit)), "std_jitter_ms": float(np.std(jit, ddof=1)),
+        "p95_jitter_ms": float(np.percentile(a, 95)), "p99_jitter_ms": float(np.percentile(a, 99)),
+        "max_jitter_ms": float(np.max(a)), f"miss_rate_{miss_ms:g}ms": float(np.mean(a > miss_ms)),
+        "n_events": int(len(edge)), "serial_block_rate": float(np.mean(block > 1e-9)),
+        "mean_serial_block_ms": float(np.mean(block) / 1000.0),
+        "lost_ticks_per_event": float(np.mean(lost)),
+    }, jit
+
+def fig_jitter(fig, jit, title):
+    ax = fig.add_subplot()
+    ax.hist(jit, bins=200, density=True, alpha=0.8)
+    ax.set_yscale("log")
+    ax.set_xlabel("Jitter (actual - planned ISI) [ms]"); ax.set_ylabel("Density")
+    ax.set_title(title); ax.grid(True, alpha=0.3); fig.tight_layout()
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--lambda", dest="lambda_hz", type=float, default=2.0)
+    ap.add_argument("--pw-min", dest="pw_min_us", type=int, default=50)
+    ap.add_argument("--pw-max", dest="pw_max_us", type=int, default=1000)
+    ap.add_argument("--events", dest="events", type=int, default=100000)
+    ap.add_argument("--tick-us", dest="tick_us", type=float, default=100.0)
+    ap.add_argument("--baud", dest="baud", type=int, default=115200)
+    ap.add_argument("--miss-ms", dest="miss_ms", type=float, default=5.0)
+    ap.add_argument("--t-log-us", dest="t_log_us", type=float, default=AVR_DEFAULTS["t_log_us"])
+    ap.add_argument("--isr-latency-us", dest="isr_latency_us", type=float, default=AVR_DEFAULTS["isr_latency_us"])
+    ap.add_argument("--delay-wrap16", dest="delay_wrap16", action="store_true",
+                    help="model delayMicroseconds() truncating dt to 16 bits (AVR core)")
+    ap.add_argument("--outdir", dest="outdir", required=True)
+    ap.add_argument("--seed", dest="seed", type=int, default=1)
+    figrender.add_figure_args(ap)
+    args = ap.parse_args()
+
+    p = dict(AVR_DEFAULTS, t_log_us=args.t_log_us, isr_latency_us=args.isr_latency_us)
+    rng = np.random.default_rng(args.seed)
+    dt, pw = sample_plans(args.lambda_hz, args.pw_min_us, args.pw_max_us, args.events, rng)
+
+    rows = []
+    m_b, jit_b = timing_metrics(*simulate_baseline(dt, pw, args.baud, rng, p, args.delay_wrap16), args.miss_ms)
+    rows.append(dict(scenario="Baseline loop", **m_b))
+    m_i, jit_i = timing_metrics(*simulate_timer_isr(dt, pw, args.baud, args.tick_us, rng, p), args.miss_ms)
+    rows.append(dict(scenario="Timer ISR", **m_i))
+
+    os.makedirs(args.outdir, exist_ok=True)
+    pd.DataFrame(rows).to_csv(os.path.join(args.outdir, "table9_timing_metrics_model.csv"), index=False)
+    with figrender.from_args(args) as fr:
+        fr.submit(fig_jitter, os.path.join(args.outdir, "fig9_jitter_baseline_model.png"),
+                  jit_b, "Figure 9 (model). Jitter, baseline loop")
+        fr.submit(fig_jitter, os.path.join(args.outdir, "fig10_jitter_isr_model.png"),
+                  jit_i, "Figure 10 (model). Jitter, Timer ISR")
+    print("Done. Outputs in:", args.outdir)
+
+if __name__ == "__main__":
+    main()
@@ -7,6 +7,7 @@ import threading
 import time
 from collections import deque
 import csv
+from protocol_client import ProtocolClient
 
 APP_TITLE = "Aperiodic Pulse Generator - GUI Control"
 
@@ -15,6 +16,7 @@ class ArduinoApp:
         self.root = root
         self.root.title(APP_TITLE)
         self.ser = None
+        self.client = None
         self.running = False
 
         # ===== Connection frame =====
@@ -54,8 +56,17 @@ class ArduinoApp:
         self.max_width_entry = ttk.Entry(frame_params, textvariable=self.max_width_var, width=10)
         self.max_width_entry.grid(row=2, column=1, padx=5)
 
+        # opterećenje R||C za pre-flight proveru
+        ttk.Label(frame_params, text="R opterećenja (Ω):").grid(row=3, column=0, sticky="w")
+        self.load_r_var = tk.DoubleVar(value=1000.0)
+        ttk.Entry(frame_params, textvariable=self.load_r_var, width=10).grid(row=3, column=1, padx=5)
+
+        ttk.Label(frame_params, text="C opterećenja (F):").grid(row=4, column=0, sticky="w")
+        self.load_c_var = tk.DoubleVar(value=1e-7)
+        ttk.Entry(frame_params, textvariable=self.load_c_var, width=10).grid(row=4, column=1, padx=5)
+
         self.btn_send = ttk.Button(frame_params, text="Pošalji parametre", command=self.send_params, state="disabled")
-        self.btn_send.grid(row=3, column=0, columnspan=2, pady=5)
+        self.btn_send.grid(row=5, column=0, columnspan=2, pady=5)
 
         # ===== Log frame =====
         frame_log = ttk.LabelFrame(root, text="Log")
@@ -98,6 +109,8 @@ class ArduinoApp:
             return
         try:
             self.ser = serial.Serial(port, 9600, timeout=1)
+            # ova firmware verzija prima LAMBDA:..;MINW:..;MAXW:.. i ne odgovara (protocol_client.py)
+            self.client = ProtocolClient(self.ser, dialect="legacy")
             self.running = True
             self.thread = threading.Thread(target=self.read_serial, daemon=True)
             self.thread.start()
@@ -127,9 +140,17 @@ class ArduinoApp:
             if minw > maxw:
                 messagebox.showerror("Greška", "Min širina ne može biti veća od max širine")
                 return
-            cmd = f"LAMBDA:{lam};MINW:{minw};MAXW:{maxw}\n"
-            self.ser.write(cmd.encode('utf-8'))
-            self.log(f"Poslato: {cmd.strip()}")
+            # pre-flight provera plana (1 h, zadato R||C opterećenje) prema bezbednosnim ciljevima
+            R, C = self.load_r_var.get(), self.load_c_var.get()
+            from preflight_safety import check_params, format_report, load_targets
+            ok, rep = check_params(lam, minw, maxw, 3600.0, R, C, load_targets())
+            self.log(f"Pre-flight (1 h, R = {R:g} Ω, C = {C:g} F):\n" + format_report(rep))
+            if not ok:
+                messagebox.showerror("Bezbednost", "Parametri odbijeni (bezbednosni cilj bi bio prekoračen):\n"
+                                     + format_report(rep))
+                return
+            p, = self.client.set_params(lam, minw, maxw)
+            self.log(f"Poslato: {p.cmd}")
         except Exception as e:
             messagebox.showerror("Greška", f"Greška pri slanju parametara: {e}")
 
@@ -139,7 +160,8 @@ class ArduinoApp:
                 line = self.ser.readline().decode('utf-8', errors='ignore').strip()
                 if line:
                     self.log(f"Arduino: {line}")
-                    self.update_stats_from_line(line)
+                    if not self.client.feed(line):
+                        self.update_stats_from_line(line)
             except Exception as e:
                 self.log(f"Greška pri čitanju: {e}")
                 break
@@ -3,17 +3,25 @@
 ISI/PW analysis with MDPI-style outputs (expanded).
 Inputs: CSV with columns time_s, pulse_width_us.
 Outputs:
-  - Table 7: table7_descriptives.csv
-  - Table 8: table8_ks_results.csv
+  - Table 7: table7_descriptives.csv (+ <stat>_ci_lo/_ci_hi percentile bootstrap CIs
+    for λ_MLE, ISI and PW mean/std with --bootstrap B, see bootstrap_ci.py)
+  - Table 8: table8_ks_results.csv (+ chi^2 / discrete KS PW rows with --pw-discrete,
+    + time-rescaled ISI KS row with --rate-table for λ(t) sessions)
   - Figure 13: fig13_isi_cdf.png (Empirical vs Theoretical CDF)
   - Figure 14: fig14_isi_qq.png (ISI QQ vs Exponential)
   - Figure 15: fig15_pw_qq.png (PW QQ vs Uniform)
+  The hypotheses are --isi-dist exp / --pw-dist uniform unless another
+  registry entry is named (gamma, lognormal, shifted-exp, truncnorm, ...,
+  see isi_distributions.py); it is fitted by MLE and used for KS, CDF and Q-Q
+  (empirical:path=<csv> is not fitted: two-sample KS against that file).
+  - with --count-stats: table7b_count_statistics.csv + fig13b_fano_vs_window.png
+    (Fano factor vs window size, see count_stats.py)
+Figures are rendered in parallel by figrender (--no-figures: tables only).
 Usage:
   python isi_analysis.py --in data/fig1_pulse_train.csv --outdir figures --alpha 0.05
 """
 import argparse, os, numpy as np, pandas as pd
-import matplotlib.pyplot as plt
-from scipy import stats
+import figrender
 
 def compute_stats(df: pd.DataFrame):
     t = np.sort(df["time_s"].to_numpy())
@@ -31,58 +39,50 @@ def compute_stats(df: pd.DataFrame):
         "pw_std_us": float(np.std(w_us, ddof=1)) if len(w_us) > 1 else np.nan,
         "duration_s": float(t[-1]) if len(t) else 0.0,
         "num_events": int(len(t)),
+        "isi_cv": float(np.std(isi, ddof=1) / np.mean(isi)) if len(isi) > 1 else np.nan,
     }
     return isi, w_us, desc
 
-def fig_isi_cdf(isi, lambda_mle, out_png):
+def fig_isi_cdf(fig, isi, dist):
     x = np.sort(isi)
     y = np.arange(1, len(x)+1) / len(x)
     x_th = np.linspace(0, max(1e-9, x.max()*1.05), 400)
-    y_th = 1.0 - np.exp(-lambda_mle * x_th) if np.isfinite(lambda_mle) else np.zeros_like(x_th)
-    plt.figure(figsize=(5,4))
-    plt.step(x, y, where="post", label="Empirical CDF (ISI)")
-    plt.plot(x_th, y_th, label=f"Theoretical Exp CDF (λ={lambda_mle:.3f} Hz)")
-    plt.xlabel("ISI [s]"); plt.ylabel("CDF"); plt.title("Figure 13. ISI CDF: empirical vs. exponential")
-    plt.grid(True, alpha=0.3); plt.legend(); plt.tight_layout()
-    plt.savefig(out_png, dpi=300); plt.close()
+    ax = fig.add_subplot()
+    ax.step(x, y, where="post", label="Empirical CDF (ISI)")
+    ax.plot(x_th, dist.cdf(x_th), label=f"Theoretical CDF: {dist.describe()}")
+    ax.set_xlabel("ISI [s]"); ax.set_ylabel("CDF"); ax.set_title(f"Figure 13. ISI CDF: empirical vs. {dist.display}")
+    ax.grid(True, alpha=0.3); ax.legend(); fig.tight_layout()
 
-def qq_plot_empirical_vs_exponential(isi, lambda_mle, out_png):
-    p = (np.arange(1, len(isi)+1) - 0.5) / len(isi)
-    isi_sorted = np.sort(isi)
-    scale = 1.0 / lambda_mle if lambda_mle > 0 else np.inf
-    th = stats.expon.ppf(p, scale=scale)
-    plt.figure(figsize=(5,4))
-    plt.plot(th, isi_sorted, ".", ms=3)
-    lo = min(th.min(), isi_sorted.min()); hi = max(th.max(), isi_sorted.max())
-    plt.plot([lo, hi], [lo, hi], "k--", lw=1)
-    plt.xlabel("Theoretical quantiles: Exp(λ) [s]"); plt.ylabel("Empirical quantiles: ISI [s]")
-    plt.title("Figure 14. ISI Q–Q vs. Exponential"); plt.grid(True, alpha=0.3); plt.tight_layout()
-    plt.savefig(out_png, dpi=300); plt.close()
+def qq_plot(fig, x, dist, what="ISI", unit="s", title="Figure 14"):
+    p = (np.arange(1, len(x)+1) - 0.5) / len(x)
+    x_sorted = np.sort(x)
+    th = dist.ppf(p)
+    ax = fig.add_subplot()
+    ax.plot(th, x_sorted, ".", ms=3)
+    lo = min(th.min(), x_sorted.min()); hi = max(th.max(), x_sorted.max())
+    ax.plot([lo, hi], [lo, hi], "k--", lw=1)
+    ax.set_xlabel(f"Theoretical quantiles: {dist.display} [{unit}]"); ax.set_ylabel(f"Empirical quantiles: {what} [{unit}]")
+    ax.set_title(f"{title}. {what} Q–Q vs. {dist.display}"); ax.grid(True, alpha=0.3); fig.tight_layout()
 
-def qq_plot_pw_vs_uniform(w_us, out_png):
-    a = np.min(w_us); b = np.max(w_us)
-    p = (np.arange(1, len(w_us)+1) - 0.5) / len(w_us)
-    pw_sorted = np.sort(w_us)
-    th = stats.uniform.ppf(p, loc=a, scale=(b-a) if b>a else 1.0)
-    plt.figure(figsize=(5,4))
-    plt.plot(th, pw_sorted, ".", ms=3)
-    lo = min(th.min(), pw_sorted.min()); hi = max(th.max(), pw_sorted.max())
-    plt.plot([lo, hi], [lo, hi], "k--", lw=1)
-    plt.xlabel("Theoretical quantiles: Uniform[a,b] [μs]"); plt.ylabel("Empirical quantiles: PW [μs]")
-    plt.title("Figure 15. PW Q–Q vs. Uniform"); plt.grid(True, alpha=0.3); plt.tight_layout()
-    plt.savefig(out_png, dpi=300); plt.close()
-
-def ks_tests(isi, w_us, lambda_mle, out_csv, alpha=0.05):
-    from scipy import stats
+def ks_tests(isi, w_us, isi_dist, pw_dist, out_csv, alpha=0.05, pw_discrete=None, extra_rows=None):
     n_isi, n_pw = len(isi), len(w_us)
-    scale = 1.0 / lambda_mle if lambda_mle>0 else np.inf
-    D1, p1 = stats.kstest(isi, 'expon', args=(0, scale)) if n_isi>0 and np.isfinite(scale) else (np.nan, np.nan)
+    D1, p1 = isi_dist.kstest(isi) if n_isi>0 and np.isfinite(isi_dist.mean()) else (np.nan, np.nan)
     a, b = int(np.min(w_us)), int(np.max(w_us))
-    D2, p2 = stats.kstest(w_us, 'uniform', args=(a, (b-a) if b>a else 1)) if n_pw>0 else (np.nan, np.nan)
+    D2, p2 = pw_dist.kstest(w_us) if n_pw>0 else (np.nan, np.nan)
     df = pd.DataFrame([
-        {"test": "KS ISI vs Exp(λ_MLE)", "D": D1, "p_value": p1, "n": n_isi},
-        {"test": "KS PW vs Uniform[min,max]", "D": D2, "p_value": p2, "n": n_pw},
+        {"test": f"KS ISI vs {isi_dist.label if n_isi else '-'}", "D": D1, "p_value": p1, "n": n_isi},
+        {"test": f"KS PW vs {pw_dist.label if n_pw else '-'}", "D": D2, "p_value": p2, "n": n_pw},
     ])
+    if pw_discrete is not None:
+        # O(n) bincount path; pw_discrete = (a, b) nominal range, or None bounds -> observed min/max
+        from discrete_gof import DiscreteUniformGOF, gof_rows
+        da = pw_discrete[0] if pw_discrete[0] is not None else a
+        db = pw_discrete[1] if pw_discrete[1] is not None else b
+        res = DiscreteUniformGOF(da, db).update(w_us).result()
+        df = pd.concat([df, pd.DataFrame(gof_rows(res, da, db))], ignore_index=True)
+        df["statistic"] = df["statistic"].fillna(df["D"])  # chi^2 lives here, never in D
+    if extra_rows:
+        df = pd.concat([df, pd.DataFrame(extra_rows)], ignore_index=True)
     os.makedirs(os.path.dirname(out_csv), exist_ok=True)
     df.to_csv(out_csv, index=False)
     return df
@@ -92,6 +92,19 @@ def main():
     ap.add_argument("--in", dest="in_csv", type=str, required=True)
     ap.add_argument("--outdir", dest="outdir", type=str, required=True)
     ap.add_argument("--alpha", dest="alpha", type=float, default=0.05)
+    ap.add_argument("--pw-discrete", dest="pw_discrete", action="store_true",
+                    help="add chi^2 and discrete KS rows for integer PW vs DiscreteUniform[pw-min,pw-max]")
+    ap.add_argument("--pw-min", dest="pw_min_us", type=int, default=None)
+    ap.add_argument("--pw-max", dest="pw_max_us", type=int, default=None)
+    ap.add_argument("--rate-table", dest="rate_table", default=None,
+                    help="λ(t) table (t_s, rate_Hz[, kind]) for the time-rescaling KS test (see nhpp.py)")
+    ap.add_argument("--count-stats", dest="count_stats", action="store_true",
+                    help="also write the Fano-factor-vs-window table/figure (count_stats.py)")
+    from isi_distributions import add_dist_args
+    add_dist_args(ap, "exp", "uniform")
+    figrender.add_figure_args(ap)
+    from bootstrap_ci import add_bootstrap_args
+    add_bootstrap_args(ap)
     args = ap.parse_args()
 
     df = pd.read_csv(args.in_csv)
@@ -99,16 +112,34 @@ def main():
 
     # Tables
     t7 = pd.DataFrame([desc])
+    if args.bootstrap > 0 and len(isi) > 1 and len(w_us) > 1:
+        from bootstrap_ci import ISI_STATS, iid_replicates, ci_columns
+        reps = iid_replicates(isi, w_us, args.bootstrap, args.boot_seed, args.boot_workers, args.boot_mem)
+        for k, v in dict(ci_columns(ISI_STATS, reps, args.ci), bootstrap_B=args.bootstrap, ci_level=args.ci).items():
+            t7[k] = v
     os.makedirs(args.outdir, exist_ok=True)
     t7.to_csv(os.path.join(args.outdir, "table7_descriptives.csv"), index=False)
-    ks_tests(isi, w_us, desc["lambda_mle_Hz"], os.path.join(args.outdir, "table8_ks_results.csv"), args.alpha)
+    extra = []
+    if args.rate_table:
+        from nhpp import RateTable, time_rescaling_gof
+        extra.append(time_rescaling_gof(df["time_s"].to_numpy(), RateTable.from_csv(args.rate_table)))
+    from isi_distributions import fit
+    isi_dist = fit(args.isi_dist, isi) if len(isi) else None
+    pw_dist = fit(args.pw_dist, w_us) if len(w_us) else None
+    ks_tests(isi, w_us, isi_dist, pw_dist, os.path.join(args.outdir, "table8_ks_results.csv"), args.alpha,
+             pw_discrete=(args.pw_min_us, args.pw_max_us) if args.pw_discrete else None, extra_rows=extra)
 
     # Figures
-    if len(isi) > 0 and np.isfinite(desc["lambda_mle_Hz"]) and desc["lambda_mle_Hz"]>0:
-        fig_isi_cdf(isi, desc["lambda_mle_Hz"], os.path.join(args.outdir, "fig13_isi_cdf.png"))
-        qq_plot_empirical_vs_exponential(isi, desc["lambda_mle_Hz"], os.path.join(args.outdir, "fig14_isi_qq.png"))
-    if len(w_us) > 0:
-        qq_plot_pw_vs_uniform(w_us, os.path.join(args.outdir, "fig15_pw_qq.png"))
+    with figrender.from_args(args) as fr:
+        if len(isi) > 0 and np.isfinite(desc["lambda_mle_Hz"]) and desc["lambda_mle_Hz"]>0:
+            fr.submit(fig_isi_cdf, os.path.join(args.outdir, "fig13_isi_cdf.png"), isi, isi_dist, figsize=(5,4))
+            fr.submit(qq_plot, os.path.join(args.outdir, "fig14_isi_qq.png"), isi, isi_dist, figsize=(5,4))
+        if len(w_us) > 0:
+            fr.submit(qq_plot, os.path.join(args.outdir, "fig15_pw_qq.png"), w_us, pw_dist, "PW", "μs", "Figure 15",
+                      figsize=(5,4))
+        if args.count_stats and len(isi) > 1:
+            from count_stats import write_outputs
+            write_outputs(df["time_s"].to_numpy(), desc["duration_s"], args.outdir, fr)
 
     print("Done. Outputs in:", args.outdir)
 
@@ -0,0 +1,346 @@
+#!/usr/bin/env python3
+"""
+Registry of ISI and PW distributions for the generators and the GOF analyses.
+Every entry supplies
+  sample(rng, n)   n draws at once (no per-event Python)
+  fit(x)           MLE from data (classmethod)
+  cdf / ppf        for KS and Q-Q (scipy frozen distribution, imported lazily)
+  kstest(x)        (D, p) of the data against the distribution
+  label            how the analyses name the hypothesis in table8
+and is selected by a spec string "name[:key=value,...]":
+  ISI  exp[:lam=]                 Exp(λ)                          (the APPI default)
+       shifted-exp[:d=,lam=]      d + Exp(λ), refractory / firmware floor
+       gamma[:shape=,scale=]      Gamma(k, θ), CV = 1/sqrt(k)
+       lognormal[:mu=,sigma=]     LogNormal(μ, σ)
+       empirical:path=<csv>[,column=]  resampled recorded ISIs (column isi_s,
+                                  or diff of time_s); as an analysis hypothesis
+                                  nothing is fitted: the data are compared with
+                                  the reference file by a two-sample KS
+  PW   uniform[:lo=,hi=]          integer Uniform{lo..hi} µs     (the APPI default)
+       truncnorm[:mu=,sigma=,lo=,hi=]  Normal(μ, σ) truncated to [lo, hi], rounded to µs
+Parameters left out of an ISI spec are filled so the mean ISI is 1/λ
+(make(spec, mean=1/λ)); PW bounds default to --pw-min/--pw-max.
+Usage:
+  python isi_distributions.py --isi-dist gamma:shape=4 --lambda 2 --pw-dist truncnorm:mu=400,sigma=150 \
+      --pw-min 50 --pw-max 1000 --n 100000
+"""
+import argparse, os, numpy as np, pandas as pd
+
+class Dist:
+    name = ""
+    kind = "isi"
+    display = ""
+
+    def frozen(self):
+        raise NotImplementedError
+
+    def cdf(self, x):
+        return self.frozen().cdf(x)
+
+    def ppf(self, q):
+        return self.frozen().ppf(q)
+
+    def mean(self):
+        return float(self.frozen().mean())
+
+    def sample(self, rng, n):
+        return self.ppf(rng.random(n))
+
+    def kstest(self, x):
+        from scipy import stats
+        r = stats.kstest(x, self.cdf)
+        return r.statistic, r.pvalue
+
+    @property
+    def params(self):
+        return {k: v for k, v in vars(self).items() if not k.startswith("_")}
+
+    def describe(self):
+        return f"{self.display}(" + ", ".join(f"{k}={v:.4g}" for k, v in self.params.items()) + ")"
+
+    @property
+    def label(self):
+        return self.describe()
+
+class Exponential(Dist):
+    name, display = "exp", "Exp"
+
+    def __init__(self, lam):
+        self.lam = float(lam)
+
+    @classmethod
+    def from_mean(cls, mean, lam=None):
+        return cls(lam if lam is not None else 1.0 / mean)
+
+    @classmethod
+    def fit(cls, x):
+        return cls(1.0 / np.mean(x))
+
+    def frozen(self):
+        from scipy import stats
+        return stats.expon(scale=1.0 / self.lam)
+
+    def mean(self):
+        return 1.0 / self.lam
+
+    def sample(self, rng, n):
+        return rng.exponential(1.0 / self.lam, n)
+
+    def describe(self):
+        return f"Exp(λ={self.lam:.3f} Hz)"
+
+    @property
+    def label(self):
+        return "Exp(λ_MLE)"
+
+class ShiftedExponential(Dist):
+    name, display = "shifted-exp", "ShiftedExp"
+
+    def __init__(self, d, lam):
+        self.d, self.lam = float(d), float(lam)
+
+    @classmethod
+    def from_mean(cls, mean, d=0.001, lam=None):
+        if lam is None and mean <= float(d):
+            raise ValueError(f"shifted-exp: mean ISI {mean:g} s must exceed the shift d={float(d):g} s")
+        return cls(d, lam if lam is not None else 1.0 / (mean - float(d)))
+
+    @classmethod
+    def fit(cls, x):
+        d = float(np.min(x))
+        return cls(d, 1.0 / (np.mean(x) - d))
+
+    def frozen(self):
+        from scipy import stats
+        return stats.expon(loc=self.d, scale=1.0 / self.lam)
+
+    def mean(self):
+        return self.d + 1.0 / self.lam
+
+    def sample(self, rng, n):
+        return self.d + rng.exponential(1.0 / self.lam, n)
+
+class Gamma(Dist):
+    name, display = "gamma", "Gamma"
+
+    def __init__(self, shape, scale):
+        self.shape, self.scale = float(shape), float(scale)
+
+    @classmethod
+    def from_mean(cls, mean, shape=2.0, scale=None):
+        return cls(shape, scale if scale is not None else mean / float(shape))
+
+    @classmethod
+    def fit(cls, x):
+        from scipy import stats
+        k, _, theta = stats.gamma.fit(x, floc=0)
+        return cls(k, theta)
+
+    def frozen(self):
+        from scipy import stats
+        return stats.gamma(self.shape, scale=self.scale)
+
+    def mean(self):
+        return self.shape * self.scale
+
+    def sample(self, rng, n):
+        return rng.gamma(self.shape, self.scale, n)
+
+class LogNormal(Dist):
+    name, display = "lognormal", "LogNormal"
+
+    def __init__(self, mu, sigma):
+        self.mu, self.sigma = float(mu), float(sigma)
+
+    @classmethod
+    def from_mean(cls, mean, sigma=0.5, mu=None):
+        return cls(mu if mu is not None else np.log(mean) - float(sigma)**2 / 2, sigma)
+
+    @classmethod
+    def fit(cls, x):
+        lx = np.log(x)
+        return cls(np.mean(lx), np.std(lx))
+
+    def frozen(self):
+        from scipy import stats
+        return stats.lognorm(self.sigma, scale=np.exp(self.mu))
+
+    def mean(self):
+        return float(np.exp(self.mu + self.sigma**2 / 2))
+
+    def sample(self, rng, n):
+        return rng.lognormal(self.mu, self.sigma, n)
+
+class Empirical(Dist):
+    name, display = "empirical", "Empirical"
+
+    def __init__(self, data, path=None):
+        self._x = np.sort(np.asarray(data, dtype=float))
+        self._path = path
+
+    @classmethod
+    def from_mean(cls, mean=None, path=None, column=None):
+        if path is None:
+            raise ValueError("empirical needs path=<csv>")
+        df = pd.read_csv(path)
+        x = df[column].to_numpy() if column else (df["isi_s"].to_numpy() if "isi_s" in df
+                                                   else np.diff(np.sort(df["time_s"].to_numpy())))
+        x = x[x > 0]
+        return cls(x * (mean / np.mean(x)) if mean is not None else x, path)
+
+    @classmethod
+    def fit(cls, x):
+        raise ValueError("empirical has nothing to fit: name the reference sample with path=<csv>")
+
+    def kstest(self, x):
+        from scipy import stats
+        r = stats.ks_2samp(x, self._x)
+        return r.statistic, r.pvalue
+
+    def cdf(self, x):
+        return np.searchsorted(self._x, x, side="right") / len(self._x)
+
+    def ppf(self, q):
+        return np.quantile(self._x, q, method="inverted_cdf")
+
+    def mean(self):
+        return float(np.mean(self._x))
+
+    def sample(self, rng, n):
+        return self._x[rng.integers(0, len(self._x), n)]
+
+    def describe(self):
+        return f"Empirical(n={len(self._x)})"
+
+    @property
+    def label(self):
+        src = os.path.basename(self._path) if self._path else "reference"
+        return f"Empirical({src}, n={len(self._x)}), two-sample"
+
+class UniformInt(Dist):
+    """Integer PW on {lo..hi}; CDF/PPF are the continuous Uniform[lo, hi] of the legacy KS row."""
+    name, display, kind = "uniform", "Uniform", "pw"
+
+    def __init__(self, lo, hi):
+        self.lo, self.hi = int(lo), int(hi)
+
+    @classmethod
+    def from_bounds(cls, lo, hi):
+        return cls(lo, hi)
+
+    @classmethod
+    def fit(cls, x):
+        return cls(np.min(x), np.max(x))
+
+    def frozen(self):
+        from scipy import stats
+        return stats.uniform(loc=self.lo, scale=(self.hi - self.lo) if self.hi > self.lo else 1)
+
+    def sample(self, rng, n):
+        return rng.integers(self.lo, self.hi + 1, n)
+
+    @property
+    def label(self):
+        return "Uniform[min,max]"
+
+class TruncNormInt(Dist):
+    name, display, kind = "truncnorm", "TruncNormal", "pw"
+
+    def __init__(self, mu, sigma, lo, hi):
+        self.mu, self.sigma, self.lo, self.hi = float(mu), float(sigma), int(lo), int(hi)
+
+    @classmethod
+    def from_bounds(cls, lo, hi, mu=None, sigma=None):
+        return cls(mu if mu is not None else (lo + hi) / 2, sigma if sigma is not None else (hi - lo) / 4, lo, hi)
+
+    @classmethod
+    def fit(cls, x):
+        """Bounds at the sample min/max, (μ, σ) by numerical MLE."""
+        from scipy import stats, optimize
+        x = np.asarray(x, dtype=float); lo, hi = np.min(x), np.max(x)
+
+        def nll(p):
+            mu, s = p[0], np.exp(p[1])
+            return -np.sum(stats.truncnorm.logpdf(x, (lo - mu) / s, (hi - mu) / s, loc=mu, scale=s))
+        r = optimize.minimize(nll, [np.mean(x), np.log(max(np.std(x), 1e-9))], method="Nelder-Mead")
+        return cls(r.x[0], np.exp(r.x[1]), lo, hi)
+
+    def frozen(self):
+        from scipy import stats
+        return stats.truncnorm((self.lo - self.mu) / self.sigma, (self.hi - self.mu) / self.sigma,
+                               loc=self.mu, scale=self.sigma)
+
+    def sample(self, rng, n):
+        return np.rint(self.ppf(rng.random(n))).astype(np.int64)
+
+REGISTRY = {c.name: c for c in (Exponential, ShiftedExponential, Gamma, LogNormal, Empirical, UniformInt, TruncNormInt)}
+ISI_DISTS = tuple(k for k, c in REGISTRY.items() if c.kind == "isi")
+PW_DISTS = tuple(k for k, c in REGISTRY.items() if c.kind == "pw")
+
+def parse_spec(spec):
+    """"gamma:shape=2,scale=0.25" -> ("gamma", {"shape": 2.0, "scale": 0.25})."""
+    name, _, rest = spec.partition(":")
+    kw = {}
+    for item in filter(None, rest.split(",")):
+        k, _, v = item.partition("=")
+        try:
+            kw[k.strip()] = float(v)
+        except ValueError:
+            kw[k.strip()] = v.strip()
+    if name not in REGISTRY:
+        raise ValueError(f"unknown distribution {name!r} (choose from {', '.join(REGISTRY)})")
+    return name, kw
+
+def make(spec, mean=None, lo=None, hi=None):
+    """Distribution from a spec; ISI parameters not given follow from the mean, PW bounds from lo/hi."""
+    name, kw = parse_spec(spec)
+    cls = REGISTRY[name]
+    if cls.kind == "pw":
+        kw.setdefault("lo", lo); kw.setdefault("hi", hi)
+        return cls.from_bounds(**kw)
+    return cls.from_mean(mean, **kw)
+
+def fit(spec, x):
+    """MLE of the named distribution (spec parameters other than the name are ignored).
+    empirical is the exception: its reference sample is loaded from path= instead."""
+    name, kw = parse_spec(spec)
+    if name == "empirical":
+        return Empirical.from_mean(None, **kw)
+    return REGISTRY[name].fit(np.asarray(x, dtype=float))
+
+def sample_train(isi_dist, pw_dist, duration_s, rng):
+    """(time_s, pulse_width_us) on [0, duration_s], drawn in blocks of ~1.1x the expected count."""
+    mean = isi_dist.mean()
+    n = int(duration_s / mean * 1.1 + 10 * np.sqrt(duration_s / mean) + 16)
+    t = np.cumsum(isi_dist.sample(rng, n))
+    while t[-1] <= duration_s:
+        t = np.concatenate([t, t[-1] + np.cumsum(isi_dist.sample(rng, n))])
+    t = t[t <= duration_s]
+    return t, pw_dist.sample(rng, len(t))
+
+def add_dist_args(ap, isi_default=None, pw_default=None):
+    ap.add_argument("--isi-dist", dest="isi_dist", default=isi_default,
+                    help=f"ISI distribution spec, name[:k=v,...] from {', '.join(ISI_DISTS)}")
+    ap.add_argument("--pw-dist", dest="pw_dist", default=pw_default,
+                    help=f"PW distribution spec from {', '.join(PW_DISTS)}")
+
+def main():
+    ap = argparse.ArgumentParser()
+    add_dist_args(ap, "exp", "uniform")
+    ap.add_argument("--lambda", dest="lambda_hz", type=float, default=2.0)
+    ap.add_argument("--pw-min", dest="pw_min_us", type=int, default=50)
+    ap.add_argument("--pw-max", dest="pw_max_us", type=int, default=1000)
+    ap.add_argument("--n", dest="n", type=int, default=100000)
+    ap.add_argument("--seed", dest="seed", type=int, default=0)
+    args = ap.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    for spec, kw in ((args.isi_dist, {"mean": 1.0 / args.lambda_hz}), (args.pw_dist, {"lo": args.pw_min_us, "hi": args.pw_max_us})):
+        d = make(spec, **kw)
+        x = d.sample(rng, args.n)
+        f = fit(spec, x)
+        D, p = f.kstest(x)
+        print(f"{d.label}: mean {np.mean(x):.4g} (model {d.mean():.4g}); fitted {f.label}; KS D={D:.4f} p={p:.3f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+16-bit LFSR source matching the hardware RNG design (Figure 5).
+Fibonacci LFSR, taps 16,14,13,11 (x^16 + x^14 + x^13 + x^11 + 1, period 65535),
+shifting right with the feedback bit entering b15.
+
+  - jump(n): advance n bit-steps via GF(2) matrix powers (square-and-multiply)
+  - words(n): block generation; lanes are spread with jump-ahead and then all
+    lanes are stepped together with NumPy bit operations
+  - random31 / uniform01 / sample_dt_us / sample_pw_us: the firmware mapping,
+    with random() replaced by two LFSR words (31 bits)
+  - exponential / integers: Generator-like methods, so the existing
+    generate(..., rng) functions accept an Lfsr16 as an alternate source.
+
+Usage (writes a reference dataset like mk_reference_dataset.py):
+  python lfsr16.py --lambda 2.0 --duration 60 --pw-min 50 --pw-max 1000 \
+      --seed 44257 --out data/fig1_pulse_train_lfsr.csv
+"""
+import argparse, os, numpy as np, pandas as pd
+
+TAPS = (16, 14, 13, 11)
+
+def _step(s):
+    bit = (s ^ (s >> 2) ^ (s >> 3) ^ (s >> 5)) & 1
+    return (s >> 1) | (bit << 15)
+
+def step_matrix():
+    """16x16 GF(2) matrix of one shift: new_bits = M @ bits (bit i = 2**i)."""
+    M = np.zeros((16, 16), dtype=np.uint8)
+    for i in range(15):
+        M[i, i+1] = 1
+    for t in TAPS:
+        M[15, 16 - t] = 1
+    return M
+
+def _gf2_matmul(A, B):
+    return (A.astype(np.int64) @ B.astype(np.int64) & 1).astype(np.uint8)
+
+def _bits(s):
+    return ((int(s) >> np.arange(16)) & 1).astype(np.uint8)
+
+def _state(bits):
+    return int(np.sum(bits.astype(np.int64) << np.arange(16)))
+
+class Lfsr16:
+    _M = step_matrix()
+    _pow2 = [_M]  # M^(2^k), extended on demand
+
+    def __init__(self, seed=0xACE1):
+        s = int(seed) & 0xFFFF
+        self.state = s if s else 0xACE1
+
+    @classmethod
+    def _matrix_power(cls, n):
+        R = np.eye(16, dtype=np.uint8)
+        k = 0
+        while n:
+            while len(cls._pow2) <= k:
+                cls._pow2.append(_gf2_matmul(cls._pow2[-1], cls._pow2[-1]))
+            if n & 1:
+                R = _gf2_matmul(cls._pow2[k], R)
+            n >>= 1; k += 1
+        return R
+
+    def jump(self, n):
+        """Advance the register by n bit-steps in O(log n) matrix products."""
+        self.state = _state(_gf2_matmul(self._matrix_power(n % 65535), _bits(self.state)[:, None])[:, 0])
+        return self
+
+    def words(self, n, lanes=1024):
+        """Next n 16-bit words (one word = 16 fresh bits), as uint16."""
+        n = int(n)
+        if n <= 0:
+            return np.zeros(0, dtype=np.uint16)
+        lanes = max(1, min(lanes, n))
+        per = -(-n // lanes)
+        J = self._matrix_power((16 * per) % 65535)
+        starts = np.empty(lanes, dtype=np.uint32)
+        b = _bits(self.state)[:, None]
+        for j in range(lanes):
+            starts[j] = _state(b[:, 0])
+            b = _gf2_matmul(J, b)
+        s = starts
+        out = np.empty((per, lanes), dtype=np.uint16)
+        for k in range(per):
+            for _ in range(16):
+                s = _step(s)
+            out[k] = s
+        self.jump(16 * n)
+        return out.T.ravel()[:n]
+
+    # --- firmware mapping (random() -> 31 bits from two words) ---
+    def random31(self, n):
+        w = self.words(2 * n).astype(np.int64)
+        return ((w[0::2] << 16) | w[1::2]) & 0x7FFFFFFF
+
+    def uniform01(self, n):
+        return (self.random31(n) + 1) / 2147483648.0  # (0,1]
+
+    def sample_dt_us(self, lambda_hz, n):
+        u = self.uniform01(n).astype(np.float32).astype(float)
+        return np.maximum((-np.log(u) / lambda_hz * 1e6).astype(np.int64), 1)
+
+    def sample_pw_us(self, a_us, b_us, n):
+        a, b = min(a_us, b_us), max(a_us, b_us)
+        return a + self.random31(n) % (b - a + 1)
+
+    # --- numpy.random.Generator-like subset ---
+    def exponential(self, scale=1.0, size=None):
+        x = -np.log(self.uniform01(1 if size is None else int(np.prod(size)))) * scale
+        return float(x[0]) if size is None else x.reshape(size)
+
+    def integers(self, low, high=None, size=None):
+        if high is None:
+            low, high = 0, low
+        x = low + self.random31(1 if size is None else int(np.prod(size))) % (high - low)
+        return int(x[0]) if size is None else x.reshape(size)
+
+def generate_events(lambda_hz, duration_s, pw_min_us, pw_max_us, src):
+    """Event times (s) and widths (µs) with firmware-style integer-µs ISIs."""
+    m = lambda_hz * duration_s
+    n_block = int(m + 6*np.sqrt(m) + 16)
+    T, W, t0 = [], [], 0.0
+    while t0 <= duration_s:
+        t = t0 + np.cumsum(src.sample_dt_us(lambda_hz, n_block)) * 1e-6
+        T.append(t); W.append(src.sample_pw_us(pw_min_us, pw_max_us, n_block))
+        t0 = t[-1]
+    T, W = np.concatenate(T), np.concatenate(W)
+    keep = T <= duration_s
+    return T[keep], W[keep]
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--lambda", dest="lambda_hz", type=float, required=True)
+    ap.add_argument("--duration", dest="duration_s", type=float, required=True)
+    ap.add_argument("--pw-min", dest="pw_min_us", type=int, required=True)
+    ap.add_argument("--pw-max", dest="pw_max_us", type=int, required=True)
+    ap.add_argument("--seed", dest="seed", type=int, default=0xACE1)
+    ap.add_argument("--out", dest="out_csv", type=str, required=True)
+    args = ap.parse_args()
+
+    T, W = generate_events(args.lambda_hz, args.duration_s, args.pw_min_us, args.pw_max_us, Lfsr16(args.seed))
+    df = pd.DataFrame({"time_s": T, "pulse_width_us": W})
+    os.makedirs(os.path.dirname(args.out_csv) or ".", exist_ok=True)
+    df.to_csv(args.out_csv, index=False)
+    print(f"Wrote {len(df)} events to {args.out_csv}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Linear electrode/load models for the CCS simulations.
+A load is a state-space system driven by the source current i:
+  dx/dt = A x + B i,   v = C x + D i   (v: terminal voltage)
+For a segment of duration tau with constant i the exact update is
+  x(tau) = Phi x0 + Gamma i,   [Phi Gamma; 0 1] = expm([A B; 0 0] tau)
+and (Phi, Gamma) is cached per duration (keyed in ns), so the repeated
+segment lengths of a pulse train (integer-µs PWs, the dt step, a fixed OFF
+time) cost one matrix exponential each.
+
+Models (all with the source on the terminals):
+  rc       R || C                                  (the original bench load)
+  randles  Rs + (Rct || Cdl)                       R = Rct, C = Cdl
+  cpe      Rs + (Rct || CPE), Z_CPE = 1/(Q (jw)^alpha); the ZARC is fitted by a
+           Foster chain sum r_k/(1 + jw tau_k), tau_k log-spaced a decade
+           past [f_min, f_max] (non-negative least squares, relative error
+           over the band)
+Compliance: if a step would drive v above V_comp, the source delivers only
+the (constant) current that ends the step at V_comp; for R||C this is the
+same as capping v, as the original simulators do.
+
+Usage:
+  python load_models.py --load cpe --Rs 200 --R 10000 --cpe-Q 1e-6 --cpe-alpha 0.8 --outdir figures
+"""
+import argparse, os, numpy as np, pandas as pd
+
+LOADS = ("rc", "randles", "cpe")
+
+class LinearLoad:
+    def __init__(self, A, B, C, D=0.0, name="linear"):
+        self.A = np.atleast_2d(np.asarray(A, dtype=float))
+        n = self.A.shape[0]
+        self.B = np.asarray(B, dtype=float).reshape(n)
+        self.C = np.asarray(C, dtype=float).reshape(n)
+        self.D = float(D)
+        self.name = name
+        self._prop = {}
+
+    @property
+    def n_states(self):
+        return self.A.shape[0]
+
+    def propagator(self, tau):
+        """(Phi, Gamma) for a constant-current segment of tau seconds (cached)."""
+        key = int(round(tau * 1e9))
+        p = self._prop.get(key)
+        if p is None:
+            from scipy.linalg import expm
+            n = self.n_states
+            M = np.zeros((n + 1, n + 1))
+            M[:n, :n] = self.A; M[:n, n] = self.B
+            E = expm(M * (key * 1e-9))
+            p = self._prop[key] = (E[:n, :n], E[:n, n])
+        return p
+
+    def output(self, x, i):
+        return float(self.C @ x) + self.D * i
+
+    def step(self, x, i, tau, V_comp=None):
+        """Advance one constant-current segment; returns (x_next, v_end, i_delivered)."""
+        Phi, G = self.propagator(tau)
+        x1 = Phi @ x + G * i
+        v1 = float(self.C @ x1) + self.D * i
+        if V_comp is not None and v1 > V_comp and i > 0:
+            free = float(self.C @ (Phi @ x))
+            i = min(i, max(0.0, (V_comp - free) / (float(self.C @ G) + self.D)))
+            x1 = Phi @ x + G * i
+            v1 = float(self.C @ x1) + self.D * i
+        return x1, v1, i
+
+    def dc_resistance(self):
+        return float(-self.C @ np.linalg.solve(self.A, self.B)) + self.D
+
+    def impedance(self, f):
+        w = 2j * np.pi * np.asarray(f, dtype=float)
+        I = np.eye(self.n_states)
+        return np.array([self.C @ np.linalg.solve(s * I - self.A, self.B) + self.D for s in w])
+
+    def simulate_grid(self, i, dt, V_comp=None):
+        """Terminal voltage on a uniform grid, i[n] held over [t_n, t_n+1) (as the bench simulators)."""
+        v = np.zeros(len(i)); x = np.zeros(self.n_states)
+        for n in range(1, len(i)):
+            x, v[n], _ = self.step(x, i[n-1], dt, V_comp)
+        return v
+
+def rc(R, C):
+    return LinearLoad([[-1.0 / (R * C)]], [1.0 / C], [1.0], 0.0, "rc")
+
+def randles(Rs, Rct, Cdl):
+    return LinearLoad([[-1.0 / (Rct * Cdl)]], [1.0 / Cdl], [1.0], Rs, "randles")
+
+def zarc(f, Rct, Q, alpha):
+    return Rct / (1.0 + Rct * Q * (2j * np.pi * np.asarray(f, dtype=float)) ** alpha)
+
+def randles_cpe(Rs, Rct, Q, alpha, f_min=0.1, f_max=1e6, per_decade=3):
+    if alpha >= 1.0:  # ideal capacitor: exact
+        load = randles(Rs, Rct, Q); load.name, load.fit_rel_err = "cpe", 0.0
+        return load
+    from scipy.optimize import nnls
+    n = max(2, int(np.ceil(per_decade * (np.log10(f_max / f_min) + 2))) + 1)
+    tau = 1.0 / (2 * np.pi * np.logspace(np.log10(f_min) - 1, np.log10(f_max) + 1, n))  # a decade past the band
+    f = np.logspace(np.log10(f_min), np.log10(f_max), 8 * n)
+    Z = zarc(f, Rct, Q, alpha)
+    K = 1.0 / (1.0 + 2j * np.pi * f[:, None] * tau[None, :])
+    wgt = 1.0 / np.abs(Z)
+    r, _ = nnls(np.vstack([(K.real.T * wgt).T, (K.imag.T * wgt).T]), np.concatenate([Z.real * wgt, Z.imag * wgt]))
+    keep = r > 1e-12 * Rct
+    r, tau = r[keep], tau[keep]
+    load = LinearLoad(np.diag(-1.0 / tau), r / tau, np.ones(len(r)), Rs, "cpe")  # branch k: C_k = tau_k / r_k
+    Zf = load.impedance(f) - Rs
+    load.fit_rel_err = float(np.max(np.abs(Zf - Z) / np.abs(Z)))
+    return load
+
+def build(spec):
+    """Load from a plain dict (hashable by simcache): {"load": "rc"|"randles"|"cpe", "R", "C", "Rs", "Q", "alpha"}."""
+    kind = spec.get("load", "rc")
+    if kind == "rc":
+        return rc(spec["R"], spec["C"])
+    if kind == "randles":
+        return randles(spec.get("Rs", 0.0), spec["R"], spec["C"])
+    if kind == "cpe":
+        return randles_cpe(spec.get("Rs", 0.0), spec["R"], spec["Q"], spec["alpha"])
+    raise ValueError(f"unknown load model {kind!r} (choose from {', '.join(LOADS)})")
+
+def add_load_args(ap):
+    ap.add_argument("--load", dest="load", choices=LOADS, default="rc",
+                    help="rc: R||C; randles: Rs + (R||C); cpe: Rs + (R||CPE)")
+    ap.add_argument("--Rs", dest="Rs", type=float, default=0.0, help="series (access) resistance [ohm]")
+    ap.add_argument("--cpe-Q", dest="cpe_Q", type=float, default=None, help="CPE magnitude [F s^(alpha-1)]")
+    ap.add_argument("--cpe-alpha", dest="cpe_alpha", type=float, default=0.8)
+
+def spec_from_args(args):
+    spec = {"load": args.load, "R": args.R, "C": getattr(args, "C", None)}
+    if args.load != "rc":
+        spec["Rs"] = args.Rs
+    if args.load == "cpe":
+        if args.cpe_Q is None:
+            raise SystemExit("--load cpe needs --cpe-Q")
+        spec.update(Q=args.cpe_Q, alpha=args.cpe_alpha)
+        spec.pop("C")
+    return spec
+
+def main():
+    ap = argparse.ArgumentParser()
+    add_load_args(ap)
+    ap.add_argument("--R", dest="R", type=float, required=True, help="R (rc) or Rct (randles/cpe) [ohm]")
+    ap.add_argument("--C", dest="C", type=float, default=None, help="C (rc) or Cdl (randles) [F]")
+    ap.add_argument("--f-min", dest="f_min", type=float, default=1.0)
+    ap.add_argument("--f-max", dest="f_max", type=float, default=1e5)
+    ap.add_argument("--outdir", dest="outdir", required=True)
+    args = ap.parse_args()
+
+    spec = spec_from_args(args)
+    load = build(spec)
+    f = np.logspace(np.log10(args.f_min), np.log10(args.f_max), 61)
+    Z = load.impedance(f)
+    df = pd.DataFrame({"f_Hz": f, "Z_abs_ohm": np.abs(Z), "Z_phase_deg": np.degrees(np.angle(Z))})
+    if args.load == "cpe":
+        Zt = zarc(f, args.R, args.cpe_Q, args.cpe_alpha) + args.Rs
+        df["Z_abs_target_ohm"] = np.abs(Zt)
+        df["Z_phase_target_deg"] = np.degrees(np.angle(Zt))
+        print(f"Foster fit: {load.n_states} branches, max relative error {load.fit_rel_err:.2e}")
+    os.makedirs(args.outdir, exist_ok=True)
+    df.to_csv(os.path.join(args.outdir, f"load_{args.load}_impedance.csv"), index=False)
+    print(f"{load.name}: {load.n_states} state(s), DC resistance {load.dc_resistance():.1f} ohm")
+    print("Done. Outputs in:", args.outdir)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""
+Segmented log store for long (multi-day) logger sessions.
+Rows (utc_iso, line) go to <dir>/<prefix>-NNNNNN.csv; a segment is closed
+when it reaches --rotate-mb or --rotate-min, then compressed (gzip/lzma, in a
+background thread so the serial reader never waits) and recorded in
+<dir>/<prefix>.index.csv:
+  segment, file, t_first, t_last, n_events, bytes_raw, bytes_stored
+The index is rewritten atomically (tmp + os.replace). A segment left open by a
+crash is finalized the next time the store is opened: a torn last row (no
+trailing newline) is cut off, and the segment is compressed with the codec of
+the session that wrote it (read from the index; left as plain CSV when that
+session never rotated). writerow() after close() raises ValueError.
+utc_iso is ISO 8601 UTC, so time windows are plain string comparisons;
+LogReader.read(start, end) opens only the segments whose [t_first, t_last]
+overlaps the window (the live segment is read as plain CSV) and stops at
+the first row past the end. The writer has csv.writer's writerow(), so
+pc_serial_logger / pc_tk_gui use it unchanged; rows are flushed every
+flush_s seconds.
+Usage:
+  python logstore.py --dir logs/session1                       (list segments)
+  python logstore.py --dir logs/session1 --from 2025-01-02T10:00 --to 2025-01-02T11:00 --out window.csv
+"""
+import argparse, csv, glob, gzip, io, lzma, os, re, sys, threading, time
+
+INDEX_COLUMNS = ["segment", "file", "t_first", "t_last", "n_events", "bytes_raw", "bytes_stored"]
+COMPRESSORS = {"gzip": (".gz", gzip.open), "lzma": (".xz", lzma.open), "none": ("", open)}
+HEADER = ["utc_iso", "line"]
+
+def _open_text(path, mode="rt"):
+    if path.endswith(".gz"):
+        return gzip.open(path, mode, newline="", encoding="utf-8")
+    if path.endswith(".xz"):
+        return lzma.open(path, mode, newline="", encoding="utf-8")
+    return open(path, mode[0], newline="", encoding="utf-8")
+
+def read_index(directory, prefix="events"):
+    path = os.path.join(directory, f"{prefix}.index.csv")
+    if not os.path.exists(path):
+        return []
+    with open(path, newline="", encoding="utf-8") as f:
+        return [dict(r, segment=int(r["segment"]), n_events=int(r["n_events"])) for r in csv.DictReader(f)]
+
+def _write_index(directory, prefix, rows):
+    path = os.path.join(directory, f"{prefix}.index.csv")
+    tmp = path + ".tmp"
+    with open(tmp, "w", newline="", encoding="utf-8") as f:
+        w = csv.DictWriter(f, fieldnames=INDEX_COLUMNS)
+        w.writeheader()
+        w.writerows(sorted(rows, key=lambda r: r["segment"]))
+    os.replace(tmp, path)
+
+def _drop_torn_tail(path):
+    """Truncate a plain segment after its last complete line (a crash can leave half a row)."""
+    with open(path, "rb+") as f:
+        end = pos = f.seek(0, 2)
+        while pos > 0:
+            step = min(1 << 16, pos); pos -= step
+            f.seek(pos)
+            i = f.read(step).rfind(b"\n")
+            if i >= 0:
+                if pos + i + 1 < end:
+                    f.truncate(pos + i + 1)
+                return
+        f.truncate(0)
+
+def _codec_of(index):
+    """Codec name of the newest indexed segment ("none" if there is none)."""
+    by_ext = {ext: name for name, (ext, _) in COMPRESSORS.items() if ext}
+    if not index:
+        return "none"
+    f = max(index, key=lambda r: r["segment"])["file"]
+    return by_ext.get(os.path.splitext(f)[1], "none")
+
+def _scan(path):
+    """(t_first, t_last, n_events) of a plain segment."""
+    first = last = ""; n = 0
+    with _open_text(path) as f:
+        r = csv.reader(f)
+        next(r, None)
+        for row in r:
+            if row:
+                first = first or row[0]; last = row[0]; n += 1
+    return first, last, n
+
+class LogStore:
+    def __init__(self, directory, prefix="events", max_bytes=64 << 20, max_seconds=3600.0,
+                 compress="gzip", flush_s=1.0):
+        if compress not in COMPRESSORS:
+            raise ValueError(f"compress must be one of {', '.join(COMPRESSORS)}")
+        os.makedirs(directory, exist_ok=True)
+        self.dir, self.prefix = directory, prefix
+        self.max_bytes, self.max_seconds, self.compress, self.flush_s = max_bytes, max_seconds, compress, flush_s
+        self._lock = threading.Lock()
+        self._index = read_index(directory, prefix)
+        self._jobs = []
+        self._f = None
+        self._closed = False
+        done = {r["segment"] for r in self._index}
+        codec = _codec_of(self._index)
+        for path in sorted(glob.glob(os.path.join(directory, f"{prefix}-*.csv"))):
+            seg = int(re.search(r"-(\d+)\.csv$", path).group(1))
+            if seg not in done:  # left open by a crash
+                _drop_torn_tail(path)
+                self._finalize(seg, path, *_scan(path), os.path.getsize(path), codec)
+        self._next = max([r["segment"] for r in self._index] + [0]) + 1
+
+    def _path(self, seg):
+        return os.path.join(self.dir, f"{self.prefix}-{seg:06d}.csv")
+
+    def _open_segment(self):
+        self._seg = self._next; self._next += 1
+        self._f = open(self._path(self._seg), "w", newline="", encoding="utf-8")
+        self._w = csv.writer(self._f)
+        self._w.writerow(HEADER)
+        self._opened = self._last_flush = time.monotonic()
+        self._first, self._last, self._n = "", "", 0
+
+    def writerow(self, row):
+        with self._lock:
+            if self._closed:
+                raise ValueError("writerow() on a closed LogStore")
+            if self._f is None:
+                self._open_segment()
+            self._w.writerow(row)
+            self._first = self._first or row[0]; self._last = row[0]; self._n += 1
+            now = time.monotonic()
+            if now - self._last_flush >= self.flush_s:
+                self._f.flush(); self._last_flush = now
+            if self._f.tell() >= self.max_bytes or now - self._opened >= self.max_seconds:
+                self._rotate()
+
+    def _rotate(self):
+        self._f.close()
+        args = (self._seg, self._path(self._seg), self._first, self._last, self._n, os.path.getsize(self._path(self._seg)))
+        self._f = None
+        t = threading.Thread(target=self._finalize, args=args, daemon=True)
+        self._jobs.append(t); t.start()
+
+    def _finalize(self, seg, path, first, last, n, size, compress=None):
+        ext, opener = COMPRESSORS[compress or self.compress]
+        out = path + ext
+        if ext:
+            with open(path, "rb") as src, opener(out + ".tmp", "wb") as dst:
+                while True:
+                    b = src.read(1 << 20)
+                    if not b:
+                        break
+                    dst.write(b)
+            os.replace(out + ".tmp", out)
+        with self._lock:
+            self._index = [r for r in self._index if r["segment"] != seg]
+            self._index.append({"segment": seg, "file": os.path.basename(out), "t_first": first, "t_last": last,
+                                "n_events": n, "bytes_raw": size, "bytes_stored": os.path.getsize(out)})
+            _write_index(self.dir, self.prefix, self._index)
+        if ext:
+            os.remove(path)  # only once the index points at the compressed file
+
+    def flush(self):
+        with self._lock:
+            if self._f is not None:
+                self._f.flush()
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+            if self._f is not None:
+                self._rotate()
+        for t in self._jobs:
+            t.join()
+        self._jobs = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+class LogReader:
+    def __init__(self, directory, prefix="events"):
+        self.dir, self.prefix = directory, prefix
+
+    def segments(self):
+        """Indexed segments plus the live (unindexed, uncompressed) one, in order."""
+        idx = read_index(self.dir, self.prefix)
+        done = {r["segment"] for r in idx}
+        for path in glob.glob(os.path.join(self.dir, f"{self.prefix}-*.csv")):
+            seg = int(re.search(r"-(\d+)\.csv$", path).group(1))
+            if seg not in done:
+                idx.append({"segment": seg, "file": os.path.basename(path), "t_first": "", "t_last": "",
+                            "n_events": -1, "live": True})
+        return sorted(idx, key=lambda r: r["segment"])
+
+    def read(self, start=None, end=None):
+        """Rows (utc_iso, line) with start <= utc_iso < end, opening only overlapping segments."""
+        for s in self.segments():
+            if not s.get("live"):
+                if (start and s["t_last"] < start) or (end and s["t_first"] >= end) or not s["n_events"]:
+                    continue
+            try:
+                f = _open_text(os.path.join(self.dir, s["file"]))
+            except FileNotFoundError:  # the live segment was compressed meanwhile
+                s = next(r for r in read_index(self.dir, self.prefix) if r["segment"] == s["segment"])
+                f = _open_text(os.path.join(self.dir, s["file"]))
+            with f:
+                r = csv.reader(f)
+                next(r, None)
+                for row in r:
+                    if not row or (start and row[0] < start):
+                        continue
+                    if end and row[0] >= end:
+                        return
+                    yield row
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--dir", dest="dir", required=True)
+    ap.add_argument("--prefix", dest="prefix", default="events")
+    ap.add_argument("--from", dest="start", default=None, help="ISO UTC start (inclusive)")
+    ap.add_argument("--to", dest="end", default=None, help="ISO UTC end (exclusive)")
+    ap.add_argument("--out", dest="out", default=None, help="CSV for the window (default: stdout)")
+    args = ap.parse_args()
+
+    rd = LogReader(args.dir, args.prefix)
+    if args.start is None and args.end is None and args.out is None:
+        for s in rd.segments():
+            print(f"{s['segment']:6d} {s['file']:<28} {s['t_first'] or '-':<27} {s['t_last'] or '-':<27} "
+                  f"{'live' if s.get('live') else s['n_events']}")
+        return
+    f = open(args.out, "w", newline="", encoding="utf-8") if args.out else io.TextIOWrapper(sys.stdout.buffer, newline="")
+    w = csv.writer(f)
+    w.writerow(HEADER)
+    n = 0
+    for row in rd.read(args.start, args.end):
+        w.writerow(row); n += 1
+    f.flush()
+    if args.out:
+        f.close()
+        print(f"{n} rows -> {args.out}")
+
+if __name__ == "__main__":
+    main()
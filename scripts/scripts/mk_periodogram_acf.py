@@ -1,13 +1,18 @@
 #!/usr/bin/env python3
 """
 Make periodogram (Figure 16 + Tables 9/9b) and ACF (Figure 17 + Tables 10/10b)
-from APPI pulses binned at 1 ms.
+from APPI pulses binned at 1 ms (exact, unbinned spectrum: point_process_spectrum.py).
 Input CSV must have columns time_s, pulse_width_us.
+Figures are rendered by figrender (--no-figures: tables only).
+With --bootstrap B, Tables 9b/10b gain <stat>_ci_lo/_ci_hi/_ci_note columns from a
+moving-block bootstrap of the binned train (bootstrap_ci.py, blocks of --block-s);
+statistics the block bootstrap cannot cover get NaN bounds and the reason.
 Usage:
   python mk_periodogram_acf.py --in data/fig1_pulse_train.csv --outdir figures
+  python mk_periodogram_acf.py --in data/fig1_pulse_train.csv --outdir figures --bootstrap 1000 --no-figures
 """
 import argparse, os, numpy as np, pandas as pd
-import matplotlib.pyplot as plt
+import figrender
 
 def build_binned_signal(df, bin_ms=1.0):
     t = df["time_s"].to_numpy()
@@ -15,42 +20,75 @@ def build_binned_signal(df, bin_ms=1.0):
     t_end = float(np.max(t) + np.max(w_us)*1e-6) if len(t) else 0.0
     fs = 1000.0 / bin_ms  # Hz
     n = int(np.ceil(t_end * fs)) + 1
-    diff = np.zeros(n+1, dtype=np.int32)
-    for ti, w in zip(t, w_us):
-        start = int(np.floor(ti * fs))
-        stop = int(np.ceil((ti + w*1e-6) * fs))
-        stop = max(stop, start+1)
-        diff[start] += 1
-        diff[stop] -= 1
+    start = np.floor(t * fs).astype(np.int64)
+    stop = np.maximum(np.ceil((t + w_us*1e-6) * fs).astype(np.int64), start+1)
+    diff = (np.bincount(start, minlength=n+1) - np.bincount(stop, minlength=n+1)).astype(np.int32)
     x = np.cumsum(diff[:-1]).astype(float)
     return x, fs
 
 def periodogram(x, fs):
-    x0 = x - np.mean(x)
+    """Along the last axis, so a batch of (bootstrap) signals is one call."""
+    x0 = x - np.mean(x, axis=-1, keepdims=True)
     X = np.fft.rfft(x0)
-    P = (np.abs(X)**2) / len(x0)
-    f = np.fft.rfftfreq(len(x0), d=1.0/fs)
+    P = (np.abs(X)**2) / x0.shape[-1]
+    f = np.fft.rfftfreq(x0.shape[-1], d=1.0/fs)
     return f, P
 
 def acf(x, max_lag=None):
-    x0 = x - np.mean(x)
-    denom = np.sum(x0*x0)
-    if denom <= 0: 
+    """Biased ACF along the last axis via FFT, zero-padded to n + max_lag (no circular wrap)."""
+    x0 = x - np.mean(x, axis=-1, keepdims=True)
+    denom = np.sum(x0*x0, axis=-1, keepdims=True)
+    if x0.ndim == 1 and denom[0] <= 0:
         return np.array([0.0]), np.array([1.0])
-    c = np.correlate(x0, x0, mode="full")
-    mid = len(c)//2
-    r = c[mid:]/denom
-    if max_lag is not None:
-        r = r[:max_lag+1]
-    lags = np.arange(len(r))
+    n = x0.shape[-1]
+    m = n if max_lag is None else min(n, max_lag + 1)
+    nfft = 1 << (n + m - 2).bit_length()
+    X = np.fft.rfft(x0, nfft)
+    c = np.fft.irfft(X * np.conj(X), nfft)[..., :m]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        r = c / denom
+    lags = np.arange(r.shape[-1])
     return lags, r
 
+def psd_summary(f, P):
+    """(dominant_freq_Hz, max_to_mean_power_ratio) over f > 0, along the last axis."""
+    if len(f) < 2:
+        nan = np.full(P.shape[:-1], np.nan)
+        return nan, nan
+    Pm = P[..., 1:]  # rfftfreq: only f[0] is 0
+    return f[1:][np.argmax(Pm, axis=-1)], np.max(Pm, axis=-1) / (np.mean(Pm, axis=-1) + 1e-18)
+
+def acf_summary(ms, r):
+    """(first lag [ms] with |ACF| < 0.05 or nan, mean |ACF|), along the last axis."""
+    hit = np.abs(r) < 0.05
+    decor = np.where(hit.any(axis=-1), ms[np.argmax(hit, axis=-1)], np.nan)
+    return decor, np.mean(np.abs(r), axis=-1)
+
+def fig_periodogram(fig, f, P):
+    ax = fig.add_subplot()
+    ax.semilogy(f[1:], P[1:] + 1e-18)  # skip DC
+    ax.set_xlabel("Frequency [Hz]"); ax.set_ylabel("Power")
+    ax.set_title("Figure 16. Periodogram of APPI pulse-train (bin=1 ms)")
+    ax.grid(True, which="both", alpha=0.3)
+    fig.tight_layout()
+
+def fig_acf(fig, ms, r):
+    ax = fig.add_subplot()
+    ax.plot(ms, r, lw=1)
+    ax.set_xlabel("Lag [ms]"); ax.set_ylabel("ACF")
+    ax.set_title("Figure 17. Autocorrelation (first 2 s)")
+    ax.grid(True, alpha=0.3); fig.tight_layout()
+
 def main():
     ap = argparse.ArgumentParser()
     ap.add_argument("--in", dest="in_csv", required=True)
     ap.add_argument("--outdir", dest="outdir", required=True)
     ap.add_argument("--bin-ms", dest="bin_ms", type=float, default=1.0)
+    figrender.add_figure_args(ap)
+    from bootstrap_ci import add_bootstrap_args
+    add_bootstrap_args(ap, block=True)
     args = ap.parse_args()
+    fr = figrender.from_args(args)
 
     os.makedirs(args.outdir, exist_ok=True)
     df = pd.read_csv(args.in_csv)
@@ -58,54 +96,44 @@ def main():
     f, P = periodogram(x, fs)
 
     # Figure 16
-    plt.figure(figsize=(6,4))
-    plt.semilogy(f[1:], P[1:] + 1e-18)  # skip DC
-    plt.xlabel("Frequency [Hz]"); plt.ylabel("Power")
-    plt.title("Figure 16. Periodogram of APPI pulse-train (bin=1 ms)")
-    plt.grid(True, which="both", alpha=0.3)
-    plt.tight_layout()
-    plt.savefig(os.path.join(args.outdir, "fig16_periodogram.png"), dpi=300)
-    plt.close()
+    fr.submit(fig_periodogram, os.path.join(args.outdir, "fig16_periodogram.png"), f, P)
 
     # Table 9
     pd.DataFrame({"freq_Hz": f, "power": P}).to_csv(os.path.join(args.outdir, "table9_psd.csv"), index=False)
 
-    # Table 9b (summary)
-    mask = f > 0
-    if np.any(mask):
-        f_dom = float(f[mask][np.argmax(P[mask])])
-        max_to_mean = float(np.max(P[mask]) / (np.mean(P[mask]) + 1e-18))
-    else:
-        f_dom, max_to_mean = np.nan, np.nan
-    pd.DataFrame([{
-        "fs_Hz": fs, "N_bins": len(x),
-        "dominant_freq_Hz": f_dom, "max_to_mean_power_ratio": max_to_mean
-    }]).to_csv(os.path.join(args.outdir, "table9b_psd_summary.csv"), index=False)
-
-    # ACF (Figure 17 + Tables 10/10b)
+    # ACF (Figure 17 + Table 10)
     lags, r = acf(x, max_lag=int(2*fs))  # first 2 seconds
     ms = lags * (1000.0 / fs)
-    plt.figure(figsize=(6,4))
-    plt.plot(ms, r, lw=1)
-    plt.xlabel("Lag [ms]"); plt.ylabel("ACF")
-    plt.title("Figure 17. Autocorrelation (first 2 s)")
-    plt.grid(True, alpha=0.3); plt.tight_layout()
-    plt.savefig(os.path.join(args.outdir, "fig17_acf.png"), dpi=300)
-    plt.close()
+    fr.submit(fig_acf, os.path.join(args.outdir, "fig17_acf.png"), ms, r)
 
     pd.DataFrame({"lag_ms": ms, "acf": r}).to_csv(os.path.join(args.outdir, "table10_acf.csv"), index=False)
 
-    try:
-        idx = np.where(np.abs(r) < 0.05)[0]
-        decor_ms = ms[int(idx[0])] if len(idx)>0 else np.nan
-    except Exception:
-        decor_ms = np.nan
-    mean_abs = float(np.mean(np.abs(r)))
+    f_dom, max_to_mean = psd_summary(f, P)
+    decor_ms, mean_abs = acf_summary(ms, r)
+
+    # Bootstrap CIs (moving blocks of the binned train, see bootstrap_ci.py)
+    ci9, ci10 = {}, {}
+    if args.bootstrap > 0 and len(x) > 1:
+        from bootstrap_ci import PSD_STATS, ACF_STATS, block_replicates, ci_columns
+        reps = block_replicates(x, fs, args.bootstrap, args.block_s, int(2*fs), args.boot_seed,
+                                args.boot_workers, args.boot_mem)
+        meta = {"bootstrap_B": args.bootstrap, "block_s": args.block_s, "ci_level": args.ci}
+        ci9 = dict(ci_columns(PSD_STATS, reps[:, :2], args.ci, [f_dom, max_to_mean]), **meta)
+        ci10 = dict(ci_columns(ACF_STATS, reps[:, 2:], args.ci, [decor_ms, mean_abs]), **meta)
+
+    # Table 9b (summary)
+    pd.DataFrame([{
+        "fs_Hz": fs, "N_bins": len(x),
+        "dominant_freq_Hz": float(f_dom), "max_to_mean_power_ratio": float(max_to_mean), **ci9
+    }]).to_csv(os.path.join(args.outdir, "table9b_psd_summary.csv"), index=False)
+
+    # Table 10b (summary)
     pd.DataFrame([{
-        "decorrelation_lag_ms(<0.05)": decor_ms,
-        "mean_abs_acf_first_2s": mean_abs
+        "decorrelation_lag_ms(<0.05)": float(decor_ms),
+        "mean_abs_acf_first_2s": float(mean_abs), **ci10
     }]).to_csv(os.path.join(args.outdir, "table10b_acf_summary.csv"), index=False)
 
+    fr.run()
     print("Done. Outputs in:", args.outdir)
 
 if __name__ == "__main__":
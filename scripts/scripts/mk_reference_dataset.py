@@ -9,6 +9,13 @@ Usage:
   python mk_reference_dataset.py --lambda 2.0 --duration 60 \
       --pw-min 50 --pw-max 1000 --seed 123 \
       --out data/fig1_pulse_train.csv
+  (--source lfsr uses the 16-bit LFSR with the firmware dt/PW mapping, see lfsr16.py)
+  (--isi-dist / --pw-dist draw from isi_distributions.py in blocks, e.g.
+   --isi-dist gamma:shape=4 --pw-dist truncnorm:mu=400,sigma=150; the ISI mean
+   stays 1/lambda and the PW bounds --pw-min/--pw-max unless the spec sets them)
+  (--overlap-policy drop|defer|truncate|firmware --dead-us D resolves pulse
+   overlaps, see dead_time.py; events deferred past --duration are clipped and
+   the report, with n_clipped, goes to <out>_dead_time.csv)
 """
 import argparse, numpy as np, pandas as pd, os
 
@@ -33,12 +40,36 @@ def main():
     ap.add_argument("--pw-min", dest="pw_min_us", type=int, required=True)
     ap.add_argument("--pw-max", dest="pw_max_us", type=int, required=True)
     ap.add_argument("--seed", dest="seed", type=int, default=123)
+    ap.add_argument("--source", dest="source", choices=["pcg64", "lfsr"], default="pcg64")
+    from isi_distributions import add_dist_args
+    add_dist_args(ap)
+    ap.add_argument("--overlap-policy", dest="overlap_policy", default="none",
+                    choices=["none", "drop", "defer", "truncate", "firmware"])
+    ap.add_argument("--dead-us", dest="dead_us", type=float, default=0.0)
     ap.add_argument("--out", dest="out_csv", type=str, required=True)
     args = ap.parse_args()
 
-    rng = np.random.default_rng(args.seed)
-    df = generate(args.lambda_hz, args.duration_s, args.pw_min_us, args.pw_max_us, rng)
+    if args.source == "lfsr":
+        from lfsr16 import Lfsr16, generate_events
+        T, W = generate_events(args.lambda_hz, args.duration_s, args.pw_min_us, args.pw_max_us, Lfsr16(args.seed))
+        df = pd.DataFrame({"time_s": T, "pulse_width_us": W})
+    elif args.isi_dist or args.pw_dist:
+        from isi_distributions import make, sample_train
+        T, W = sample_train(make(args.isi_dist or "exp", mean=1.0 / args.lambda_hz),
+                            make(args.pw_dist or "uniform", lo=args.pw_min_us, hi=args.pw_max_us),
+                            args.duration_s, np.random.default_rng(args.seed))
+        df = pd.DataFrame({"time_s": T, "pulse_width_us": W})
+    else:
+        rng = np.random.default_rng(args.seed)
+        df = generate(args.lambda_hz, args.duration_s, args.pw_min_us, args.pw_max_us, rng)
     os.makedirs(os.path.dirname(args.out_csv), exist_ok=True)
+    if args.overlap_policy != "none":
+        from dead_time import apply_dead_time
+        T, W, _, rep = apply_dead_time(df["time_s"].to_numpy(), df["pulse_width_us"].to_numpy(),
+                                       args.dead_us, args.overlap_policy, args.duration_s)
+        df = pd.DataFrame({"time_s": T, "pulse_width_us": W})
+        pd.DataFrame([rep]).to_csv(os.path.splitext(args.out_csv)[0] + "_dead_time.csv", index=False)
+        print(rep)
     df.to_csv(args.out_csv, index=False)
     print(f"Wrote {len(df)} events to {args.out_csv}")
 
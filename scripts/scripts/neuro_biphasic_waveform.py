@@ -3,15 +3,21 @@
 Generate biphasic, charge-balanced APPI stimulation and RC load response.
 Outputs:
   - ns_biphasic_waveform.csv (t_s, i_A, v_V)
+  - ns_charge_per_pulse.csv, ns_charge_summary.csv: per-phase charge, net
+    charge drift and delivered energy, computed analytically per event
+    (charge_accounting.py); --no-waveform skips the dense simulation
   - Figure 25: fig25_current_biphasic.png
   - Figure 26: fig26_voltage_on_load.png
+  (--no-figures writes the CSV only, see figrender.py)
 
 Usage:
   python neuro_biphasic_waveform.py --lambda 2 --duration 10 --I-phase 0.003 \
       --pw-us 200 --gap-us 50 --R 1000 --C 1e-7 --dt-us 10 --outdir figures --seed 42
 """
 import argparse, os, numpy as np, pandas as pd
-import matplotlib.pyplot as plt
+from plot_decimate import fig_waveform
+import figrender, simcache
+from charge_accounting import account, write_tables
 
 def make_events(lambda_hz, duration_s, rng):
     t = 0.0; T = []
@@ -21,6 +27,7 @@ def make_events(lambda_hz, duration_s, rng):
         T.append(t)
     return np.array(T)
 
+@simcache.memoize("1")
 def simulate(lambda_hz, duration_s, I_phase, pw_us, gap_us, R, C, dt_us, seed):
     rng = np.random.default_rng(seed)
     T_events = make_events(lambda_hz, duration_s, rng)
@@ -52,24 +59,32 @@ def main():
     ap.add_argument("--dt-us", dest="dt_us", type=float, default=10.0)
     ap.add_argument("--outdir", dest="outdir", required=True)
     ap.add_argument("--seed", dest="seed", type=int, default=123)
+    ap.add_argument("--no-waveform", dest="no_waveform", action="store_true",
+                    help="charge/energy tables only (no dense waveform, CSV or figures)")
+    figrender.add_figure_args(ap)
     args = ap.parse_args()
 
+    os.makedirs(args.outdir, exist_ok=True)
+    T_events = make_events(args.lambda_hz, args.duration_s, np.random.default_rng(args.seed))
+    per, summary = account(T_events, args.R, args.C, args.I_phase, args.pw_us, args.gap_us,
+                           grid_us=args.dt_us)
+    write_tables(per, summary, args.outdir)
+    s = summary.iloc[0]
+    print(f"pulses={int(s.n_pulses)}  Q_net_drift={s.Q_net_drift_C:.3e} C  E_total={s.E_total_J:.3e} J  "
+          f"v_peak={s.v_peak_V:.3f} V")
+    if args.no_waveform:
+        print("Done. Outputs in:", args.outdir)
+        return
+
     t, i, v = simulate(args.lambda_hz, args.duration_s, args.I_phase, args.pw_us,
                        args.gap_us, args.R, args.C, args.dt_us, args.seed)
-    os.makedirs(args.outdir, exist_ok=True)
     pd.DataFrame({"time_s": t, "i_A": i, "v_V": v}).to_csv(os.path.join(args.outdir, "ns_biphasic_waveform.csv"), index=False)
 
-    plt.figure(figsize=(7,2.6)); plt.plot(t, i, lw=1)
-    plt.xlabel("Time [s]"); plt.ylabel("Current [A]")
-    plt.title("Figure 25. Biphasic, charge-balanced current (APPI timing)")
-    plt.grid(True, alpha=0.3); plt.tight_layout()
-    plt.savefig(os.path.join(args.outdir, "fig25_current_biphasic.png"), dpi=300); plt.close()
-
-    plt.figure(figsize=(7,2.6)); plt.plot(t, v, lw=1)
-    plt.xlabel("Time [s]"); plt.ylabel("Voltage [V]")
-    plt.title("Figure 26. Voltage on R||C during biphasic APPI")
-    plt.grid(True, alpha=0.3); plt.tight_layout()
-    plt.savefig(os.path.join(args.outdir, "fig26_voltage_on_load.png"), dpi=300); plt.close()
+    with figrender.from_args(args) as fr:
+        fr.submit(fig_waveform, os.path.join(args.outdir, "fig25_current_biphasic.png"),
+                  t, i, "Current [A]", "Figure 25. Biphasic, charge-balanced current (APPI timing)", figsize=(7,2.6))
+        fr.submit(fig_waveform, os.path.join(args.outdir, "fig26_voltage_on_load.png"),
+                  t, v, "Voltage [V]", "Figure 26. Voltage on R||C during biphasic APPI", figsize=(7,2.6))
     print("Done. Outputs in:", args.outdir)
 
 if __name__ == "__main__":
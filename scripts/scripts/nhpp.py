@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Time-varying λ(t) APPI generation (non-homogeneous Poisson) via thinning.
+Lewis–Shedler thinning against a piecewise-constant upper bound: candidates
+are drawn per segment (Poisson count, uniform times) and accepted with
+probability λ(t)/λ̄_seg, all block-vectorized so hour-long sessions need no
+per-event Python code. λ(t) is a RateTable (step or linear breakpoints, exact
+bounds and integral) or any callable (bounds/integral from a fine grid).
+
+Time-rescaling GOF: τ_k = Λ(t_k) - Λ(t_{k-1}) ~ Exp(1) under the model
+(isi_analysis1.py --rate-table uses it).
+
+Outputs: <out>.csv (time_s, pulse_width_us) and <out>_rate.csv (t_s, rate_Hz, kind)
+Usage:
+  python nhpp.py --ramp 1 8 --duration 3600 --pw-min 50 --pw-max 1000 --out data/ramp.csv
+  python nhpp.py --bursts 1 10 60 0.2 --duration 3600 --pw-min 50 --pw-max 1000 --out data/bursts.csv
+  python nhpp.py --blocks 300 2 600 5 300 1 --duration 1200 --pw-min 50 --pw-max 1000 --out data/blocks.csv
+  python nhpp.py --rate-table protocol.csv --duration 3600 --pw-min 50 --pw-max 1000 --out data/prot.csv
+"""
+import argparse, os, numpy as np, pandas as pd
+
+class RateTable:
+    """λ(t) from breakpoints t_s[i] -> rate_Hz[i]; kind 'step' (hold) or 'linear'."""
+    def __init__(self, t_s, rate_hz, kind="step"):
+        self.t = np.asarray(t_s, dtype=float)
+        self.r = np.asarray(rate_hz, dtype=float)
+        self.kind = kind
+        if kind == "step":
+            seg = self.r[:-1] * np.diff(self.t)
+        else:
+            seg = 0.5 * (self.r[:-1] + self.r[1:]) * np.diff(self.t)
+        self.L = np.concatenate([[0.0], np.cumsum(seg)])
+
+    @classmethod
+    def from_csv(cls, path, kind=None):
+        df = pd.read_csv(path)
+        if kind is None:
+            kind = str(df["kind"].iloc[0]) if "kind" in df.columns else "step"
+        return cls(df["t_s"], df["rate_Hz"], kind)
+
+    def __call__(self, t):
+        t = np.asarray(t, dtype=float)
+        if self.kind == "step":
+            i = np.clip(np.searchsorted(self.t, t, side="right") - 1, 0, len(self.r) - 1)
+            return self.r[i]
+        return np.interp(t, self.t, self.r)
+
+    def cumulative(self, t):
+        """Λ(t) = ∫_0^t λ, exact; constant extrapolation of λ beyond the last breakpoint."""
+        t = np.asarray(t, dtype=float)
+        i = np.clip(np.searchsorted(self.t, t, side="right") - 1, 0, len(self.t) - 1)
+        dt = t - self.t[i]
+        if self.kind == "step":
+            return self.L[i] + self.r[i] * dt
+        j = np.minimum(i + 1, len(self.t) - 1)
+        span = np.where(j > i, self.t[j] - self.t[i], 1.0)
+        slope = np.where(j > i, (self.r[j] - self.r[i]) / span, 0.0)
+        return self.L[i] + self.r[i] * dt + 0.5 * slope * dt**2
+
+    def upper_bound(self, edges):
+        """max λ on each [edges[k], edges[k+1]) (breakpoints inside included)."""
+        lo, hi = edges[:-1], edges[1:]
+        ub = np.maximum(self(lo), self(np.nextafter(hi, lo)))
+        if len(self.t):
+            k = np.searchsorted(edges, self.t, side="right") - 1
+            ok = (k >= 0) & (k < len(lo))
+            np.maximum.at(ub, k[ok], self.r[ok])
+        return ub
+
+    def to_frame(self):
+        return pd.DataFrame({"t_s": self.t, "rate_Hz": self.r, "kind": self.kind})
+
+class CallableRate:
+    """Wrap a vectorized callable λ(t); bounds/integral from a grid of step grid_s."""
+    def __init__(self, fn, duration_s, grid_s=1e-3, margin=1.05):
+        self.fn, self.margin = fn, margin
+        self.tg = np.linspace(0.0, duration_s, int(np.ceil(duration_s / grid_s)) + 1)
+        self.rg = np.asarray(fn(self.tg), dtype=float)
+        self.Lg = np.concatenate([[0.0], np.cumsum(0.5 * (self.rg[1:] + self.rg[:-1]) * np.diff(self.tg))])
+
+    def __call__(self, t):
+        return np.asarray(self.fn(np.asarray(t, dtype=float)), dtype=float)
+
+    def cumulative(self, t):
+        return np.interp(t, self.tg, self.Lg)
+
+    def upper_bound(self, edges):
+        k = np.clip(np.searchsorted(edges, self.tg, side="right") - 1, 0, len(edges) - 2)
+        ub = np.zeros(len(edges) - 1)
+        np.maximum.at(ub, k, self.rg)
+        return np.maximum(ub, np.maximum(self(edges[:-1]), self(edges[1:]))) * self.margin
+
+    def to_frame(self):
+        return pd.DataFrame({"t_s": self.tg, "rate_Hz": self.rg, "kind": "linear"})
+
+def ramp(l0_hz, l1_hz, duration_s):
+    return RateTable([0.0, duration_s], [l0_hz, l1_hz], kind="linear")
+
+def bursts(base_hz, peak_hz, period_s, duty, duration_s):
+    n = int(np.ceil(duration_s / period_s))
+    starts = np.arange(n) * period_s
+    t = np.column_stack([starts, starts + duty * period_s]).ravel()
+    r = np.tile([peak_hz, base_hz], n)
+    # a partial last period: clip its edges to the end, keep the last of equal breakpoints
+    t = np.append(np.minimum(t, duration_s), duration_s); r = np.append(r, base_hz)
+    keep = np.append(np.diff(t) > 0, True)
+    return RateTable(t[keep], r[keep], kind="step")
+
+def blocks(durations_s, rates_hz):
+    t = np.concatenate([[0.0], np.cumsum(durations_s)])
+    return RateTable(t, np.append(rates_hz, rates_hz[-1]), kind="step")
+
+def thin_times(rate, duration_s, rng, seg_s=1.0, max_candidates=2_000_000):
+    """Event times on [0, duration_s] by thinning against a per-segment bound."""
+    edges = np.append(np.arange(0.0, duration_s, seg_s), duration_s)
+    ub = rate.upper_bound(edges)
+    lengths = np.diff(edges)
+    expected = np.cumsum(ub * lengths)
+    out, k0 = [], 0
+    while k0 < len(ub):
+        # block of segments whose expected candidate count fits the memory budget
+        k1 = max(k0 + 1, int(np.searchsorted(expected, expected[k0] - ub[k0]*lengths[k0] + max_candidates)))
+        n = rng.poisson(ub[k0:k1] * lengths[k0:k1])
+        seg = np.repeat(np.arange(k0, k1), n)
+        t = edges[seg] + rng.random(len(seg)) * lengths[seg]
+        keep = rng.random(len(t)) * ub[seg] < rate(t)
+        out.append(np.sort(t[keep]))
+        k0 = k1
+    return np.concatenate(out) if out else np.zeros(0)
+
+def generate_nhpp(rate, duration_s, pw_min_us, pw_max_us, rng, seg_s=1.0):
+    t = thin_times(rate, duration_s, rng, seg_s)
+    w = rng.integers(pw_min_us, pw_max_us + 1, len(t))
+    return pd.DataFrame({"time_s": t, "pulse_width_us": w})
+
+def time_rescaled_isi(t, rate):
+    """τ_k = Λ(t_k) - Λ(t_{k-1}), with t_0 = 0; Exp(1) under the rate model."""
+    return np.diff(rate.cumulative(np.concatenate([[0.0], np.sort(t)])))
+
+def time_rescaling_gof(t, rate):
+    from scipy import stats
+    tau = time_rescaled_isi(t, rate)
+    D, p = stats.kstest(tau, "expon", args=(0, 1.0)) if len(tau) else (np.nan, np.nan)
+    return {"test": "KS time-rescaled ISI vs Exp(1)", "D": D, "p_value": p, "n": len(tau)}
+
+def main():
+    ap = argparse.ArgumentParser()
+    g = ap.add_mutually_exclusive_group(required=True)
+    g.add_argument("--rate-table", dest="rate_table", help="CSV with columns t_s, rate_Hz[, kind]")
+    g.add_argument("--ramp", dest="ramp", type=float, nargs=2, metavar=("L0", "L1"))
+    g.add_argument("--bursts", dest="bursts", type=float, nargs=4, metavar=("BASE", "PEAK", "PERIOD_S", "DUTY"))
+    g.add_argument("--blocks", dest="blocks", type=float, nargs="+", metavar="DUR_S RATE_HZ",
+                   help="protocol blocks as duration/rate pairs")
+    ap.add_argument("--kind", dest="kind", choices=["step", "linear"], default=None)
+    ap.add_argument("--duration", dest="duration_s", type=float, required=True)
+    ap.add_argument("--pw-min", dest="pw_min_us", type=int, required=True)
+    ap.add_argument("--pw-max", dest="pw_max_us", type=int, required=True)
+    ap.add_argument("--seg-s", dest="seg_s", type=float, default=1.0)
+    ap.add_argument("--seed", dest="seed", type=int, default=123)
+    ap.add_argument("--out", dest="out_csv", type=str, required=True)
+    args = ap.parse_args()
+
+    if args.rate_table:
+        rate = RateTable.from_csv(args.rate_table, args.kind)
+    elif args.blocks:
+        if len(args.blocks) % 2:
+            ap.error("--blocks expects DUR_S RATE_HZ pairs")
+        rate = blocks(args.blocks[0::2], args.blocks[1::2])
+    elif args.ramp:
+        rate = ramp(args.ramp[0], args.ramp[1], args.duration_s)
+    else:
+        b = args.bursts
+        rate = bursts(b[0], b[1], b[2], b[3], args.duration_s)
+
+    rng = np.random.default_rng(args.seed)
+    df = generate_nhpp(rate, args.duration_s, args.pw_min_us, args.pw_max_us, rng, args.seg_s)
+    os.makedirs(os.path.dirname(args.out_csv) or ".", exist_ok=True)
+    df.to_csv(args.out_csv, index=False)
+    rate.to_frame().to_csv(os.path.splitext(args.out_csv)[0] + "_rate.csv", index=False)
+    print(f"Wrote {len(df)} events to {args.out_csv}")
+
+if __name__ == "__main__":
+    main()
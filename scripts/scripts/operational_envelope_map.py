@@ -2,11 +2,14 @@
 """
 Mapa v_peak(λ, PW) na R||C sa CCS, konzervativno: periodičan režim.
 Simulacija više perioda po tački mreže (brza diskretna).
+Tačke mreže se keširaju (simcache, APPI_CACHE=off za ponovno računanje).
 Out: tables/table18_operational_envelope_grid.csv, figures/fig27_operational_envelope.png
 """
 import os, csv
 import numpy as np
 import matplotlib.pyplot as plt
+import simcache
+from safe_envelope_solver import max_lambda_periodic
 
 os.makedirs("tables", exist_ok=True)
 os.makedirs("figures", exist_ok=True)
@@ -17,7 +20,8 @@ dt=1e-6
 lams = np.linspace(1, 8, 8)     # Hz
 pws  = np.array([50,100,200,300,400,500,800,1000])  # µs
 
-def simulate_periodic(lam, pw_us):
+@simcache.memoize("1")
+def simulate_periodic(lam, pw_us, R=R, C=C, V_comp=V_comp, I_limit=I_limit, dt=dt):
     T = 1.0/max(1e-6, lam)
     samples = int(np.ceil(5*T/dt))  # 5 perioda
     v = 0.0; vmax=0.0
@@ -50,6 +54,10 @@ plt.colorbar(label="v_peak [V]")
 plt.contour(np.linspace(pws.min(), pws.max(), len(pws)),
             np.linspace(lams.min(), lams.max(), len(lams)),
             grid, levels=[0.95*V_comp], colors="w", linewidths=1.0)
+# tačna granica periodičnog stacionarnog stanja (safe_envelope_solver.py)
+pw_line = np.linspace(pws.min(), pws.max(), 200)
+plt.plot(pw_line, max_lambda_periodic(I_limit, R, C, pw_line, 0.95*V_comp)[0], "r-", lw=1.2)
+plt.ylim(lams.min(), lams.max())
 plt.xlabel("PW [µs]"); plt.ylabel("λ [Hz]")
 plt.title("Operational envelope: v_peak on R||C")
 plt.savefig("figures/fig27_operational_envelope.png", dpi=160)
@@ -4,79 +4,197 @@ PC Serial Logger: povezuje se na Arduino, šalje SET komande, asinhrono čita EV
 Usage:
   python scripts/pc_serial_logger.py --port COM5 --baud 115200 --csv logs/events.csv \
      --lambda 2.0 --pwmin 50 --pwmax 1000 --seed analog --start
+START se šalje samo ako plan (λ, PW, --plan-duration, opterećenje --R/--C) prođe
+pre-flight proveru bezbednosnih ciljeva (preflight_safety.py, tabela 19).
+Za duge (višednevne) sesije umesto --csv: --store logs/session1 piše segmente
+koji se rotiraju po veličini/vremenu (--rotate-mb, --rotate-min), kompresuju
+(--compress gzip|lzma) i indeksiraju (logstore.py; čitanje prozora: logstore.py --from/--to).
+--journal logs/session1.jnl piše žurnal sa CRC-om po zapisu i periodičnim fsync-om
+(--fsync-s, event_journal.py). Ako proces ili USB veza padne, --resume oporavlja
+žurnal (odseca oštećen rep), ponovo otvara port, šalje poslednje SET parametre
+(i START ako je sesija radila) i nastavlja isti fajl. Sa --reconnect se to radi
+automatski pri gubitku veze; bez njega logger izlazi sa kodom 2.
+Komande idu kroz protocol_client.py: šalju se jedna za drugom bez čekanja, a
+OK/ACK/ERR odgovori se uparuju sa komandama; komanda bez odgovora u roku
+--ack-timeout ili sa ERR se prijavljuje, a na kraju se ispisuje latencija
+komanda (p50/p95/p99).
 """
-import argparse, csv, sys, threading, time
+import argparse, csv, os, sys, threading, time
 from datetime import datetime
 import serial
+from protocol_client import ProtocolClient
 
-def reader_thread(ser: serial.Serial, writer):
-    for line in ser:
-        try:
-            s = line.decode('utf-8', errors='replace').strip()
-        except Exception:
-            continue
-        if not s:
-            continue
-        # print to console
-        print(s)
-        # try parse EV or BIP
-        if s.startswith("EV,") or s.startswith("BIP,"):
-            # dump raw line into CSV for simplicity
-            writer.writerow([datetime.utcnow().isoformat(), s])
+def reader_thread(ser: serial.Serial, writer, client=None):
+    try:
+        while True:  # not "for line in ser": that stops at the first readline() timeout
+            line = ser.readline()
+            if not line:
+                continue
+            try:
+                s = line.decode('utf-8', errors='replace').strip()
+            except Exception:
+                continue
+            if not s:
+                continue
+            # print to console
+            print(s)
+            if client is not None and client.feed(s):
+                continue
+            # try parse EV or BIP
+            if s.startswith("EV,") or s.startswith("BIP,"):
+                # dump raw line into CSV for simplicity
+                writer.writerow([datetime.utcnow().isoformat(), s])
+    except (serial.SerialException, OSError, TypeError, AttributeError) as e:  # USB unplugged / port closed
+        print(f"Link lost: {e}", file=sys.stderr)
 
 def main():
     ap = argparse.ArgumentParser()
     ap.add_argument("--port", required=True)
     ap.add_argument("--baud", type=int, default=115200)
-    ap.add_argument("--csv", required=True)
+    out = ap.add_mutually_exclusive_group(required=True)
+    out.add_argument("--csv")
+    out.add_argument("--store", default=None, help="log store directory (rotating, compressed segments)")
+    out.add_argument("--journal", default=None, help="crash-safe journal file (event_journal.py)")
+    ap.add_argument("--resume", action="store_true", help="continue the --journal session with its last parameters")
+    ap.add_argument("--reconnect", action="store_true", help="reopen the port and resume when the link is lost")
+    ap.add_argument("--fsync-s", dest="fsync_s", type=float, default=1.0)
+    ap.add_argument("--ack-timeout", dest="ack_timeout", type=float, default=1.0, help="reply timeout per command [s]")
+    ap.add_argument("--rotate-mb", dest="rotate_mb", type=float, default=64.0)
+    ap.add_argument("--rotate-min", dest="rotate_min", type=float, default=60.0)
+    ap.add_argument("--compress", choices=["gzip", "lzma", "none"], default="gzip")
     ap.add_argument("--lambda", dest="lam", type=float, default=None)
     ap.add_argument("--pwmin", type=int, default=None)
     ap.add_argument("--pwmax", type=int, default=None)
     ap.add_argument("--seed", choices=["analog","fixed"], default=None)
     ap.add_argument("--seed_value", type=int, default=12345)
     ap.add_argument("--start", action="store_true")
+    ap.add_argument("--R", type=float, default=1000.0, help="load R for the pre-flight check [ohm]")
+    ap.add_argument("--C", type=float, default=1e-7, help="load C for the pre-flight check [F]")
+    ap.add_argument("--plan-duration", dest="plan_duration", type=float, default=3600.0)
+    ap.add_argument("--skip-preflight", dest="skip_preflight", action="store_true")
     args = ap.parse_args()
 
+    jr = None
+    if args.journal:
+        from event_journal import Journal
+        if args.resume and not os.path.exists(args.journal):
+            ap.error(f"--resume: no journal at {args.journal}")
+        jr = Journal(args.journal, fsync_s=args.fsync_s)
+        if jr.truncated:
+            print(f"Journal recovered: cut {jr.truncated} damaged bytes after record {jr.state['last_seq']}")
+        if jr.resumed and not args.resume:
+            ap.error(f"{args.journal} already holds a session; use --resume to continue it")
+        if args.resume:
+            p = jr.state["params"]
+            args.lam = args.lam if args.lam is not None else (float(p["lambda"]) if "lambda" in p else None)
+            args.pwmin = args.pwmin if args.pwmin is not None else (int(p["pwmin"]) if "pwmin" in p else None)
+            args.pwmax = args.pwmax if args.pwmax is not None else (int(p["pwmax"]) if "pwmax" in p else None)
+            args.start = args.start or jr.state["running"]
+            print(f"Resuming session {jr.state['session']} ({jr.state['events']} events so far)")
+    elif args.resume or args.reconnect:
+        ap.error("--resume/--reconnect need --journal")
+
+    if args.start and not args.skip_preflight:
+        # numpy/pandas tek ovde, da logger bez --start ostane brz
+        from preflight_safety import FIRMWARE_DEFAULTS as fw, check_params, format_report, load_targets
+        ok, rep = check_params(fw["lambda_hz"] if args.lam is None else args.lam,
+                               fw["pw_min_us"] if args.pwmin is None else args.pwmin,
+                               fw["pw_max_us"] if args.pwmax is None else args.pwmax,
+                               args.plan_duration, args.R, args.C, load_targets())
+        print("Pre-flight safety check:\n" + format_report(rep))
+        if not ok:
+            print("Refusing to send START (--skip-preflight to override).", file=sys.stderr)
+            sys.exit(1)
+
     ser = serial.Serial(args.port, args.baud, timeout=1)
     time.sleep(0.3)
 
-    csvfile = open(args.csv, "w", newline="", encoding="utf-8")
-    writer = csv.writer(csvfile)
-    writer.writerow(["utc_iso", "line"])
+    if jr is not None:
+        csvfile = writer = jr
+        if args.resume:
+            jr.append("R", "resume")
+    elif args.store:
+        from logstore import LogStore
+        csvfile = writer = LogStore(args.store, max_bytes=int(args.rotate_mb * (1 << 20)),
+                                    max_seconds=args.rotate_min * 60.0, compress=args.compress)
+    else:
+        csvfile = open(args.csv, "w", newline="", encoding="utf-8")
+        writer = csv.writer(csvfile)
+        writer.writerow(["utc_iso", "line"])
+
+    client = ProtocolClient(ser, timeout=args.ack_timeout)
 
     def send(cmd):
-        ser.write((cmd + "\n").encode("utf-8"))
+        p = client.submit(cmd)
+        if jr is not None:
+            jr.command(cmd)
+        return p
 
+    def confirm(sent):
+        for cmd, e in client.wait_all(sent):
+            print(f"Warning: {e}", file=sys.stderr)
+
+    t = threading.Thread(target=reader_thread, args=(ser, writer, client), daemon=True)
+    t.start()
+
+    sent = []
     if args.lam is not None:
-        send(f"SET,lambda,{args.lam}")
+        sent.append(send(f"SET,lambda,{args.lam}"))
     if args.pwmin is not None:
-        send(f"SET,pwmin,{args.pwmin}")
+        sent.append(send(f"SET,pwmin,{args.pwmin}"))
     if args.pwmax is not None:
-        send(f"SET,pwmax,{args.pwmax}")
+        sent.append(send(f"SET,pwmax,{args.pwmax}"))
     if args.seed == "analog":
-        send("SEED,analog")
+        sent.append(send("SEED,analog"))
     elif args.seed == "fixed":
-        send(f"SEED,fixed,{args.seed_value}")
+        sent.append(send(f"SEED,fixed,{args.seed_value}"))
 
     if args.start:
-        send("START")
-
-    t = threading.Thread(target=reader_thread, args=(ser, writer), daemon=True)
-    t.start()
+        sent.append(send("START"))
+    confirm(sent)
 
     print("Press Ctrl+C to stop...")
+    lost = False
     try:
         while True:
             time.sleep(0.1)
+            if t.is_alive():
+                continue
+            if jr is not None:
+                jr.append("L", "link lost"); jr.sync()
+            if not args.reconnect:
+                lost = True
+                break
+            ser.close()
+            while True:  # same port, same journal, last parameters (START only if it was running)
+                time.sleep(2.0)
+                try:
+                    ser = serial.Serial(args.port, args.baud, timeout=1)
+                    break
+                except serial.SerialException:
+                    continue
+            time.sleep(0.3)
+            from event_journal import resume_commands
+            jr.append("R", "reconnect")
+            client.attach(ser)
+            t = threading.Thread(target=reader_thread, args=(ser, writer, client), daemon=True)
+            t.start()
+            confirm([send(cmd) for cmd in resume_commands(jr.state)])
+            print("Reconnected, session resumed.")
     except KeyboardInterrupt:
         pass
     finally:
         try:
-            send("STOP")
+            confirm([send("STOP")])
         except Exception:
             pass
         ser.close()
+        t.join(timeout=2.0)  # the reader's last writerow must land before the log closes
         csvfile.close()
+        print(client.latency.summary())
+    if lost:
+        print("Link lost; continue with --resume" if jr is not None else "Link lost.", file=sys.stderr)
+        sys.exit(2)
 
 if __name__ == "__main__":
     main()
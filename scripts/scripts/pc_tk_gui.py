@@ -1,11 +1,19 @@
 #!/usr/bin/env python3
 """
 Tkinter GUI: konekcija, SET parametri, live log prikaz, brza statistika.
+START prvo proverava plan (λ, PW, opterećenje R/C, trajanje) prema bezbednosnim
+ciljevima (preflight_safety.py) i šalje SET + START samo ako provera prođe.
+Log: jedan CSV (Choose CSV..., flush po redu) ili folder sa rotirajućim,
+kompresovanim segmentima (Log folder..., logstore.py); zatvara se pri izlazu.
+Komande idu kroz protocol_client.py (Apply šalje tri SET-a bez čekanja); uz
+svaki OK/ERR odgovor log prikazuje latenciju komande, a komanda bez odgovora
+posle 1 s se prijavljuje kao timeout.
 """
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
 import serial, threading, queue, time
 import csv, os
+from protocol_client import ProtocolClient
 
 class App(tk.Tk):
     def __init__(self):
@@ -13,12 +21,16 @@ class App(tk.Tk):
         self.title("APPI Controller")
         self.geometry("780x520")
         self.ser = None
+        self.client = None
         self.rxq = queue.Queue()
         self.running = False
         self.log_writer = None
+        self.log_file = None
+        self.log_lock = threading.Lock()  # reader upisuje, glavna nit zatvara/menja log
         self.csvpath = None
 
         self._build()
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
 
     def _build(self):
         frm = ttk.Frame(self); frm.pack(fill="both", expand=True, padx=8, pady=8)
@@ -44,16 +56,26 @@ class App(tk.Tk):
         ttk.Label(p, text="PWmax [µs]:").grid(row=0, column=4, sticky="e")
         ttk.Entry(p, textvariable=self.var_pwmax, width=8).grid(row=0, column=5, sticky="w", padx=4)
         ttk.Button(p, text="Apply", command=self.apply).grid(row=0, column=6, padx=8)
+        self.var_R = tk.StringVar(value="1000")
+        self.var_C = tk.StringVar(value="1e-7")
+        self.var_plan = tk.StringVar(value="3600")
+        ttk.Label(p, text="Load R [Ω]:").grid(row=1, column=0, sticky="e")
+        ttk.Entry(p, textvariable=self.var_R, width=8).grid(row=1, column=1, sticky="w", padx=4)
+        ttk.Label(p, text="C [F]:").grid(row=1, column=2, sticky="e")
+        ttk.Entry(p, textvariable=self.var_C, width=8).grid(row=1, column=3, sticky="w", padx=4)
+        ttk.Label(p, text="Plan [s]:").grid(row=1, column=4, sticky="e")
+        ttk.Entry(p, textvariable=self.var_plan, width=8).grid(row=1, column=5, sticky="w", padx=4)
 
         p2 = ttk.Frame(frm); p2.pack(fill="x", pady=4)
         ttk.Button(p2, text="Seed (analog)", command=lambda: self.send("SEED,analog")).pack(side="left")
         self.seed_fixed = ttk.Entry(p2, width=12); self.seed_fixed.insert(0, "12345"); self.seed_fixed.pack(side="left", padx=4)
         ttk.Button(p2, text="Seed (fixed)", command=self.seed_fixed_cmd).pack(side="left", padx=4)
-        ttk.Button(p2, text="START", command=lambda: self.send("START")).pack(side="left", padx=8)
+        ttk.Button(p2, text="START", command=self.start).pack(side="left", padx=8)
         ttk.Button(p2, text="STOP", command=lambda: self.send("STOP")).pack(side="left")
 
         p3 = ttk.Frame(frm); p3.pack(fill="x", pady=4)
         ttk.Button(p3, text="Choose CSV...", command=self.choose_csv).pack(side="left")
+        ttk.Button(p3, text="Log folder...", command=self.choose_store).pack(side="left", padx=4)
         self.csv_label = ttk.Label(p3, text="No CSV"); self.csv_label.pack(side="left", padx=6)
 
         txtf = ttk.Frame(frm); txtf.pack(fill="both", expand=True, pady=8)
@@ -67,6 +89,7 @@ class App(tk.Tk):
             port = self.port.get()
             baud = int(self.baud.get())
             self.ser = serial.Serial(port, baud, timeout=1)
+            self.client = ProtocolClient(self.ser, on_done=self.on_reply)
             self._reader = threading.Thread(target=self.reader, daemon=True); self._reader.start()
             messagebox.showinfo("OK", f"Connected to {port}")
         except Exception as e:
@@ -85,7 +108,14 @@ class App(tk.Tk):
         if not self.ser:
             messagebox.showwarning("No conn", "Not connected")
             return
-        self.ser.write((cmd+"\n").encode("utf-8"))
+        self.client.submit(cmd)
+
+    def on_reply(self, p):
+        # reader thread: only the queue, the Tk widgets belong to poll_rx
+        if p.error is not None:
+            self.rxq.put(f"  ! {p.error}")
+        else:
+            self.rxq.put(f"  {p.cmd}: {1e3 * p.latency:.1f} ms")
 
     def apply(self):
         try:
@@ -99,6 +129,27 @@ class App(tk.Tk):
         self.send(f"SET,pwmin,{pmin}")
         self.send(f"SET,pwmax,{pmax}")
 
+    def start(self):
+        if not self.ser:
+            messagebox.showwarning("No conn", "Not connected")
+            return
+        try:
+            lam = float(self.var_lambda.get())
+            pmin = int(self.var_pwmin.get())
+            pmax = int(self.var_pwmax.get())
+            R, C, plan = float(self.var_R.get()), float(self.var_C.get()), float(self.var_plan.get())
+        except ValueError:
+            messagebox.showerror("Bad input", "Numbers expected")
+            return
+        from preflight_safety import check_params, format_report, load_targets
+        ok, rep = check_params(lam, pmin, pmax, plan, R, C, load_targets())
+        self.txt.insert("end", "Pre-flight safety check:\n" + format_report(rep) + "\n"); self.txt.see("end")
+        if not ok:
+            messagebox.showerror("Pre-flight safety", "START refused:\n" + format_report(rep))
+            return
+        self.apply()  # the checked values are the ones that run
+        self.send("START")
+
     def seed_fixed_cmd(self):
         try:
             s = int(self.seed_fixed.get())
@@ -107,25 +158,69 @@ class App(tk.Tk):
             return
         self.send(f"SEED,fixed,{s}")
 
+    def close_log(self):
+        with self.log_lock:
+            f, self.log_file, self.log_writer = self.log_file, None, None
+            if f is not None:
+                f.close()
+
+    def write_log(self, s):
+        import datetime as dt
+        with self.log_lock:
+            if self.log_writer is None:
+                return
+            try:
+                self.log_writer.writerow([dt.datetime.utcnow().isoformat(), s])
+            except (OSError, ValueError) as e:
+                self.rxq.put(f"  ! log write failed: {e}")
+
     def choose_csv(self):
         path = filedialog.asksaveasfilename(defaultextension=".csv", initialfile="events.csv")
         if path:
+            self.close_log()
             self.csvpath = path
             self.csv_label.config(text=os.path.basename(path))
-            self.log_file = open(path, "w", newline="", encoding="utf-8")
-            self.log_writer = csv.writer(self.log_file)
-            self.log_writer.writerow(["utc_iso", "line"])
+            f = open(path, "w", newline="", encoding="utf-8", buffering=1)  # line-buffered: flushed per row
+            w = csv.writer(f)
+            w.writerow(["utc_iso", "line"])
+            with self.log_lock:
+                self.log_file, self.log_writer = f, w
+
+    def choose_store(self):
+        path = filedialog.askdirectory(mustexist=False)
+        if path:
+            from logstore import LogStore
+            self.close_log()
+            self.csvpath = path
+            self.csv_label.config(text=os.path.basename(path) + "/ (rotating)")
+            st = LogStore(path)
+            with self.log_lock:
+                self.log_file = self.log_writer = st
+
+    def on_close(self):
+        self.close_log()
+        if self.ser:
+            try:
+                self.ser.close()
+            except Exception:
+                pass
+        self.destroy()
 
     def reader(self):
         try:
-            for line in self.ser:
+            while self.ser:  # readline() times out every second; "for line in ser" would stop there
+                line = self.ser.readline()
+                if not line:
+                    continue
                 s = line.decode("utf-8", errors="replace").strip()
                 self.rxq.put(s)
-                if self.log_writer and (s.startswith("EV,") or s.startswith("BIP,")):
-                    import datetime as dt
-                    self.log_writer.writerow([dt.datetime.utcnow().isoformat(), s])
-        except Exception:
-            pass
+                if self.client.feed(s):
+                    continue
+                if s.startswith("EV,") or s.startswith("BIP,"):
+                    self.write_log(s)
+        except Exception as e:
+            if self.ser:  # disconnect() clears ser first; anything else is worth showing
+                self.rxq.put(f"  ! reader stopped: {e}")
 
     def poll_rx(self):
         try:
@@ -135,6 +230,8 @@ class App(tk.Tk):
                 self.txt.see("end")
         except queue.Empty:
             pass
+        if self.client:
+            self.client.expire()
         self.after(100, self.poll_rx)
 
 if __name__ == "__main__":
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Min/max envelope decimation for plotting long waveforms.
+A line drawn through N >> pixel samples is reduced per pixel column to its
+first, min, max and last sample (M4 aggregation), in time order. Drawn as a
+line (or steps-post) this rasterizes to the same pixels as the full trace,
+while Agg only sees ~4 points per pixel column.
+
+  - m4_indices(t, y, bins): sample indices to keep; bins come from
+    searchsorted on t and y is read chunk by chunk, so np.memmap / np.load
+    (mmap_mode="r") inputs are never loaded whole
+  - plot_envelope(ax, t, y, dpi=..., step=False, **kw): drop-in for
+    ax.plot / ax.step(where="post") binned on the axes' pixel columns;
+    savefig(path, dpi) re-bins for the final layout before saving
+  - fig_waveform(fig, t, y, ylabel, title): figrender draw function for a
+    single envelope-plotted waveform
+  - pixel_check(t, y): render full vs decimated and compare ink
+
+Usage (equivalence check on a saved waveform or a synthetic 1M-sample trace):
+  python plot_decimate.py --in figures/bench_waveform.csv --col v_V
+  python plot_decimate.py --n 1000000 --step
+"""
+import argparse, weakref, numpy as np
+
+# envelope line -> (t, y, xlim) for savefig's re-binning; entries go with their lines
+_ENVELOPES = weakref.WeakKeyDictionary()
+
+def m4_indices(t, y, bins, chunk=1 << 20):
+    """Indices of first/min/max/last sample per bin; bins = count or interior edges in t."""
+    n = len(t)
+    if np.ndim(bins) == 0:
+        if n <= 4 * bins:
+            return np.arange(n)
+        bins = np.linspace(float(t[0]), float(t[-1]), int(bins) + 1)[1:-1]
+    edges = np.searchsorted(t, bins, side="left")
+    starts = np.unique(np.concatenate([[0], edges]))
+    starts = starts[starts < n]
+    ends = np.append(starts[1:], n)
+    out = []
+    b0 = 0
+    while b0 < len(starts):
+        # group whole bins so each slice of y stays near `chunk` samples
+        b1 = max(b0 + 1, int(np.searchsorted(ends, starts[b0] + chunk, side="right")))
+        i0, i1 = starts[b0], ends[b1 - 1]
+        yc = np.asarray(y[i0:i1], dtype=float)
+        s = starts[b0:b1] - i0
+        lens = ends[b0:b1] - starts[b0:b1]
+        seg = np.repeat(np.arange(b1 - b0), lens)
+        mn = np.minimum.reduceat(yc, s)
+        mx = np.maximum.reduceat(yc, s)
+        # first occurrence of the min / max inside each bin
+        _, kmin = np.unique(seg[yc == mn[seg]], return_index=True)
+        _, kmax = np.unique(seg[yc == mx[seg]], return_index=True)
+        imin = np.flatnonzero(yc == mn[seg])[kmin]
+        imax = np.flatnonzero(yc == mx[seg])[kmax]
+        out.append(np.unique(np.concatenate([s, s + lens - 1, imin, imax])) + i0)
+        b0 = b1
+    return np.concatenate(out)
+
+def pixel_edges(ax, dpi, xlim):
+    """Data x of the pixel-column boundaries the axes covers at the save dpi
+    (Agg fills column k for display x in [k - 0.5, k + 0.5))."""
+    pos, W = ax.get_position(), ax.figure.get_figwidth() * dpi
+    x0, x1 = pos.x0 * W, pos.x1 * W
+    px = np.arange(np.floor(x0 + 0.5) + 0.5, x1)
+    return xlim[0] + (px - x0) / (x1 - x0) * (xlim[1] - xlim[0])
+
+def _envelope_xy(ax, t, y, dpi, xlim):
+    xlim = (float(t[0]), float(t[-1])) if xlim is None else xlim
+    k = m4_indices(t, y, pixel_edges(ax, dpi or ax.figure.dpi, xlim))
+    return np.asarray(t[k]), np.asarray(y[k])
+
+def plot_envelope(ax, t, y, dpi=None, step=False, xlim=None, **kw):
+    """ax.plot / ax.step(where='post') through the M4 envelope of (t, y).
+    Bins follow the pixel columns of `ax` over `xlim` (default: the span of t);
+    savefig() below re-bins after tight_layout has moved the axes."""
+    tk, yk = _envelope_xy(ax, t, y, dpi, xlim)
+    if step:
+        kw["drawstyle"] = "steps-post"
+    line, = ax.plot(tk, yk, **kw)
+    _ENVELOPES[line] = (t, y, xlim)
+    return line
+
+def savefig(path, dpi, fig=None):
+    """plt.savefig that first re-bins envelope lines for the final layout and dpi."""
+    if fig is None:
+        import matplotlib.pyplot as plt
+        fig = plt.gcf()
+    for ax in fig.axes:
+        for line in ax.get_lines():
+            if line in _ENVELOPES:
+                t, y, xlim = _ENVELOPES[line]
+                line.set_data(*_envelope_xy(ax, t, y, dpi, xlim or ax.get_xlim()))
+    fig.savefig(path, dpi=dpi)
+
+def fig_waveform(fig, t, y, ylabel, title, step=False, dpi=300):
+    ax = fig.add_subplot()
+    plot_envelope(ax, t, y, dpi=dpi, step=step, lw=1)
+    ax.set_xlabel("Time [s]"); ax.set_ylabel(ylabel)
+    ax.set_title(title)
+    ax.grid(True, alpha=0.3); fig.tight_layout()
+
+def _ink(t, y, decimate, step, size, dpi, lw):
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    fig = plt.figure(figsize=size, dpi=dpi)
+    ax = fig.add_axes([0.1, 0.15, 0.85, 0.75])
+    ax.axis("off")
+    if decimate:
+        plot_envelope(ax, t, y, dpi=dpi, step=step, lw=lw, color="k")
+    else:
+        ax.plot(t, y, lw=lw, color="k", drawstyle="steps-post" if step else "default")
+    ax.set_xlim(t[0], t[-1])
+    fig.canvas.draw()
+    img = np.asarray(fig.canvas.buffer_rgba())[..., 0] < 128
+    plt.close(fig)
+    return img
+
+def _grow(m):
+    """Binary dilation by one pixel (3x3)."""
+    p = np.pad(m, 1)
+    return np.any([p[1+dy:p.shape[0]-1+dy, 1+dx:p.shape[1]-1+dx]
+                   for dy in (-1, 0, 1) for dx in (-1, 0, 1)], axis=0)
+
+def pixel_check(t, y, step=False, size=(7, 3), dpi=300, lw=1.0):
+    """Compare ink of the full and the decimated rendering.
+    Agg darkens where many segments overdraw and aliases sub-pixel joins, so
+    exact equality is also reported but the pass criterion is no ink of either
+    rendering farther than one pixel from ink of the other."""
+    full = _ink(t, y, False, step, size, dpi, lw)
+    dec = _ink(t, y, True, step, size, dpi, lw)
+    miss, extra = int(np.sum(full & ~_grow(dec))), int(np.sum(dec & ~_grow(full)))
+    return {"n_samples": len(t), "ink_px": int(full.sum()),
+            "px_differing": int(np.sum(full != dec)),
+            "px_missing_gt1": miss, "px_extra_gt1": extra, "pass": miss == 0 and extra == 0}
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--in", dest="in_path", default=None, help="CSV or .npy waveform")
+    ap.add_argument("--col", dest="col", default="v_V")
+    ap.add_argument("--n", dest="n", type=int, default=1_000_000)
+    ap.add_argument("--step", dest="step", action="store_true")
+    ap.add_argument("--dpi", dest="dpi", type=int, default=300)
+    ap.add_argument("--lw", dest="lw", type=float, default=1.0)
+    args = ap.parse_args()
+
+    if args.in_path is None:
+        rng = np.random.default_rng(0)
+        t = np.arange(args.n) * 1e-6
+        y = np.cumsum(rng.normal(size=args.n)) + (rng.random(args.n) < 1e-3) * 20.0
+    elif args.in_path.endswith(".npy"):
+        w = np.load(args.in_path, mmap_mode="r")
+        t, y = w[:, 0], w[:, 1]
+    else:
+        import pandas as pd
+        df = pd.read_csv(args.in_path, usecols=["time_s", args.col])
+        t, y = df["time_s"].to_numpy(), df[args.col].to_numpy()
+    res = pixel_check(t, y, step=args.step, dpi=args.dpi, lw=args.lw)
+    print(res)
+    if not res["pass"]:
+        raise SystemExit(1)
+
+if __name__ == "__main__":
+    main()
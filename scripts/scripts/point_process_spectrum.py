@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Exact spectrum of the pulse train from event times and widths, without the
+1 ms raster of mk_periodogram_acf.py / spectrum_periodogram.py (which aliases
+above 500 Hz and rounds every pulse up to whole bins).
+On the observation window [0, T):
+  point   x(t) = sum_k delta(t - t_k)                 X(f) = A(t; f)
+  pulse   x(t) = sum_k rect over [t_k, t_k + w_k)     X(f) = (A(t; f) - A(t + w; f)) / (i 2 pi f)
+with A(s; f) = sum_k exp(-i 2 pi f s_k), so a pulse train costs two point
+sums. The mean (rate, or duty cycle for pulses) is removed analytically,
+and the periodogram is I(f) = |X(f)|^2 / T [events^2/Hz]. For a Poisson
+train I(f) scatters around lambda (point) or lambda E|W(f)|^2 with
+|W(f)|^2 = sin^2(pi f w) / (pi f)^2 (pulse); that is the poisson_theory column.
+A is summed in chunks of at most --max-elems (events x frequencies), so
+memory does not grow with the rate or the duration. On a uniform grid the
+phasors are stepped, exp(-i 2 pi (f + df) s) = exp(-i 2 pi f s) exp(-i 2 pi df s),
+and recomputed exactly every --resync frequencies: one complex multiply
+instead of an exp per term (~15x faster), with the rounding error bounded by
+--resync multiplications (~1e-14 relative at 64; --resync 1: exp only).
+Outputs: table9c_point_process_psd.csv, fig16b_point_process_spectrum.png
+Usage:
+  python point_process_spectrum.py --in data/fig1_pulse_train.csv --f-max 5000 --n-freq 4000 --outdir figures
+  python point_process_spectrum.py --in data/fig1_pulse_train.csv --mode point --log --outdir figures
+"""
+import argparse, os, numpy as np, pandas as pd
+import figrender
+
+def is_uniform(f):
+    d = np.diff(f)
+    return len(f) > 2 and bool(np.all(np.abs(d - d[0]) <= 1e-9 * np.abs(f).max()))
+
+def point_sum(s, f, max_elems=4_000_000, resync=64):
+    """A(f) = sum_k exp(-i 2 pi f s_k) for every f, (events x freqs) chunks of at most max_elems."""
+    s = np.asarray(s, dtype=float); f = np.asarray(f, dtype=float)
+    A = np.zeros(len(f), dtype=complex)
+    if resync > 1 and is_uniform(f):
+        df = f[1] - f[0]
+        ec = max(1, max_elems // 2)
+        for k in range(0, len(s), ec):
+            sk = s[k:k+ec]
+            z = np.exp(-2j * np.pi * df * sk)
+            for j0 in range(0, len(f), resync):
+                b = np.exp(-2j * np.pi * f[j0] * sk)
+                for j in range(j0, min(len(f), j0 + resync)):
+                    A[j] += b.sum()
+                    b *= z
+        return A
+    fc = max(1, min(len(f), max_elems))
+    for j in range(0, len(f), fc):
+        ff = f[j:j+fc]
+        ec = max(1, max_elems // len(ff))
+        for k in range(0, len(s), ec):
+            A[j:j+fc] += np.exp(-2j * np.pi * np.multiply.outer(ff, s[k:k+ec])).sum(axis=1)
+    return A
+
+def _box(f, w):
+    """Transform of a unit rect on [0, w): (1 - exp(-i 2 pi f w)) / (i 2 pi f), w at f = 0."""
+    f = np.asarray(f, dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        B = -np.expm1(-2j * np.pi * f * w) / (2j * np.pi * f)
+    return np.where(f == 0, w + 0j, B)
+
+def transform(t_s, pw_us, f, T, mode="pulse", max_elems=4_000_000, resync=64):
+    """Mean-removed X(f) of the train on [0, T)."""
+    t = np.asarray(t_s, dtype=float)
+    if mode == "point":
+        return point_sum(t, f, max_elems, resync) - len(t) / T * _box(f, T)
+    w = np.asarray(pw_us, dtype=float) * 1e-6
+    A = point_sum(t, f, max_elems, resync) - point_sum(t + w, f, max_elems, resync)
+    f = np.asarray(f, dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        X = np.where(f == 0, w.sum() + 0j, A / (2j * np.pi * f))
+    return X - w.sum() / T * _box(f, T)
+
+def periodogram(t_s, pw_us, f, T, mode="pulse", max_elems=4_000_000, resync=64):
+    return np.abs(transform(t_s, pw_us, f, T, mode, max_elems, resync)) ** 2 / T
+
+def poisson_theory(t_s, pw_us, f, T, mode="pulse", max_elems=4_000_000):
+    """Expected periodogram of a Poisson train with the observed rate and PW distribution."""
+    lam = len(t_s) / T
+    if mode == "point":
+        return np.full(len(f), lam)
+    w, cnt = np.unique(np.asarray(pw_us, dtype=float) * 1e-6, return_counts=True)
+    f = np.asarray(f, dtype=float)
+    S = np.zeros(len(f))
+    ec = max(1, max_elems // max(1, len(f)))
+    for k in range(0, len(w), ec):
+        S += (cnt[k:k+ec, None] * np.abs(_box(f[None, :], w[k:k+ec, None])) ** 2).sum(axis=0)
+    return lam * S / cnt.sum()
+
+def freq_grid(f_min, f_max, n, log=False):
+    return np.logspace(np.log10(f_min), np.log10(f_max), n) if log else np.linspace(f_min, f_max, n)
+
+def fig_spectrum(fig, f, P, theory, mode, log):
+    ax = fig.add_subplot()
+    ax.plot(f, P + 1e-18, lw=0.6, label="periodogram (exact)")
+    ax.plot(f, theory, "k--", lw=1, label="Poisson theory")
+    ax.set_yscale("log")
+    if log:
+        ax.set_xscale("log")
+    ax.set_xlabel("Frequency [Hz]"); ax.set_ylabel("|X(f)|² / T")
+    ax.set_title(f"Figure 16b. Exact {mode}-train spectrum (no binning)")
+    ax.grid(True, which="both", alpha=0.3); ax.legend(); fig.tight_layout()
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--in", dest="in_csv", required=True)
+    ap.add_argument("--outdir", dest="outdir", required=True)
+    ap.add_argument("--mode", dest="mode", choices=["pulse", "point"], default="pulse")
+    ap.add_argument("--f-min", dest="f_min", type=float, default=0.1)
+    ap.add_argument("--f-max", dest="f_max", type=float, default=5000.0)
+    ap.add_argument("--n-freq", dest="n_freq", type=int, default=4000)
+    ap.add_argument("--log", dest="log", action="store_true", help="log-spaced frequency grid")
+    ap.add_argument("--duration", dest="duration", type=float, default=None,
+                    help="observation length T [s] (default: end of the last pulse)")
+    ap.add_argument("--max-elems", dest="max_elems", type=int, default=4_000_000,
+                    help="events x frequencies per chunk")
+    ap.add_argument("--resync", dest="resync", type=int, default=64,
+                    help="uniform grid: exact phasors every N frequencies (1: exact exp everywhere)")
+    figrender.add_figure_args(ap)
+    args = ap.parse_args()
+
+    df = pd.read_csv(args.in_csv, usecols=["time_s", "pulse_width_us"]).sort_values("time_s")
+    t, pw = df["time_s"].to_numpy(), df["pulse_width_us"].to_numpy()
+    T = args.duration if args.duration is not None else float(t[-1] + pw[-1] * 1e-6)
+    f = freq_grid(args.f_min, args.f_max, args.n_freq, args.log)
+    P = periodogram(t, pw, f, T, args.mode, args.max_elems, args.resync)
+    th = poisson_theory(t, pw, f, T, args.mode, args.max_elems)
+
+    os.makedirs(args.outdir, exist_ok=True)
+    pd.DataFrame({"freq_Hz": f, "power": P, "poisson_theory": th}).to_csv(
+        os.path.join(args.outdir, "table9c_point_process_psd.csv"), index=False)
+    with figrender.from_args(args) as fr:
+        fr.submit(fig_spectrum, os.path.join(args.outdir, "fig16b_point_process_spectrum.png"),
+                  f, P, th, args.mode, args.log)
+    print(f"{len(t)} events, T = {T:.1f} s, {len(f)} frequencies; mean power / theory = {np.mean(P / th):.3f}")
+    print("Done. Outputs in:", args.outdir)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+Pre-flight safety check of a planned APPI session, run before START.
+The plan is either the generator parameters (λ, PW range, duration) or a
+pre-generated schedule CSV (time_s, pulse_width_us). From parameters, dt ~
+Exp(λ) and PW ~ U{pw_min..pw_max} are drawn and the pulse times follow the
+firmware's own rule (nothing is redrawn):
+  isr       firmware_timer_isr: fires at max(dt, PW_prev) after the previous
+            pulse (default: never slower than baseline for the same draws)
+  baseline  loop() sketch: delay(dt) after the previous pulse, dt + PW_prev
+  poisson   dt alone, an upper bound on the rate of both
+Each check reports its worst value over --seeds drawn schedules. By default
+the seed count follows the plan size: short or slow plans (few pulses, noisy
+window maxima) get up to 5 seeds, plans of PLAN_EVENTS pulses or more get one.
+λ must satisfy 0 < λ < 1000 Hz: the firmware ignores any other SET value, so
+such a plan fails the check instead of being simulated.
+All checks are vectorized passes:
+  max_rate_hz          most pulses in any window [t_k, t_k + window_s) / window_s
+  charge_per_phase_C   I_limit * PW (max over pulses)
+  net_charge_window_C  net charge in any window (0 for --biphasic trains)
+  v_peak_V             predicted peak on the R||C load (safe_envelope_solver.train_peaks;
+                       biphasic: charge_accounting with the longest PW)
+I_limit and V_comp come from tables/table19_safety_targets.csv; the other
+limits are DEFAULT_TARGETS unless overridden on the command line.
+Exit status 1 (and no START from pc_serial_logger / the GUIs) on violation.
+Outputs: preflight_report.csv (with --outdir)
+Usage:
+  python preflight_safety.py --lambda 2 --pw-min 50 --pw-max 1000 --duration 3600 --R 1000 --C 1e-7
+  python preflight_safety.py --schedule data/fig1_pulse_train.csv --R 1000 --C 1e-7 --outdir tables
+"""
+import argparse, os, re, sys, numpy as np, pandas as pd
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+TABLE19 = os.path.join(HERE, "..", "..", "tables", "table19_safety_targets.csv")
+
+DEFAULT_TARGETS = {
+    "I_limit_A": 0.010,               # table19: output current limit (CCS)
+    "V_comp_V": 10.0,                 # table19: output compliance voltage
+    "v_peak_frac": 1.0,               # predicted v_peak must stay below frac * V_comp
+    "window_s": 1.0,
+    "max_rate_hz": 50.0,
+    "max_charge_per_phase_C": 10e-6,
+    "max_net_charge_window_C": 100e-6,
+}
+
+# firmware_timer_isr.ino power-on values, for SET parameters that are not sent
+FIRMWARE_DEFAULTS = {"lambda_hz": 2.0, "pw_min_us": 50, "pw_max_us": 1000}
+LAMBDA_MAX_HZ = 1000.0   # firmware: if (v > 0 && v < 1000) lambda_hz = v;
+PLAN_EVENTS = 200_000    # pulses checked per plan before extra seeds stop paying off
+
+def load_targets(path=TABLE19):
+    """DEFAULT_TARGETS with I_limit / V_comp taken from the table19 CSV when present."""
+    t = dict(DEFAULT_TARGETS)
+    if not os.path.exists(path):
+        return t
+    df = pd.read_csv(path)
+    for _, r in df.iterrows():
+        p, v = str(r.iloc[0]).lower(), str(r.iloc[1])
+        m = re.search(r"([\d.]+)\s*(mA|A|V)\b", v)
+        if not m:
+            continue
+        x = float(m.group(1)) * (1e-3 if m.group(2) == "mA" else 1.0)
+        if "current limit" in p and m.group(2) != "V":
+            t["I_limit_A"] = x
+        elif "compliance voltage" in p and m.group(2) == "V":
+            t["V_comp_V"] = x
+    return t
+
+FIRMWARES = ("isr", "baseline", "poisson")
+
+def plan_schedule(lam, pw_min_us, pw_max_us, duration_s, seed=0, firmware="isr"):
+    """(t_s, pw_us) of one planned session; ISI rule per firmware (see module docstring)."""
+    if firmware not in FIRMWARES:
+        raise ValueError(f"firmware must be one of {FIRMWARES}, got {firmware!r}")
+    rng = np.random.default_rng(seed)
+    n = int(duration_s * lam * 1.1 + 10 * np.sqrt(duration_s * lam) + 16)
+    T, W, t0, w_prev = [], [], 0.0, 0.0
+    while t0 < duration_s:
+        dt = rng.exponential(1.0 / lam, n)
+        w = rng.integers(pw_min_us, pw_max_us + 1, n).astype(float)
+        prev = np.concatenate([[w_prev], w[:-1]]) * 1e-6
+        isi = np.maximum(dt, prev) if firmware == "isr" else dt + prev if firmware == "baseline" else dt
+        T.append(t0 + np.cumsum(isi)); W.append(w)
+        t0, w_prev = T[-1][-1], w[-1]
+    t, w = np.concatenate(T), np.concatenate(W)
+    keep = t < duration_s
+    return t[keep], w[keep]
+
+def window_ends(t, W, chunk=1 << 14):
+    """searchsorted(t, t + W, "left") for sorted t, block by block within the slice each block can reach
+    (cache-sized searches; a single call over millions of keys is dominated by cache misses)."""
+    j = np.empty(len(t), dtype=np.int64)
+    for lo in range(0, len(t), chunk):
+        q = t[lo:lo+chunk] + W
+        a, b = np.searchsorted(t, q[0], side="left"), np.searchsorted(t, q[-1], side="left")
+        j[lo:lo+chunk] = a + np.searchsorted(t[a:b], q, side="left")
+    return j
+
+def check_schedule(t_s, pw_us, R, C, targets=None, biphasic=False, gap_us=0.0):
+    """(ok, report DataFrame[check, value, limit, ok]) for a schedule sorted by time."""
+    from safe_envelope_solver import train_peaks
+    tg = dict(DEFAULT_TARGETS, **(targets or {}))
+    t = np.asarray(t_s, dtype=float); pw = np.asarray(pw_us, dtype=float)
+    n = len(t); I = tg["I_limit_A"]; W = tg["window_s"]
+    k = np.arange(n)
+    j = window_ends(t, W)                                # window [t_k, t_k + W) holds pulses k..j-1
+    rate = float((j - k).max()) / W if n else 0.0
+    q = I * pw * 1e-6
+    Qc = np.concatenate([[0.0], np.cumsum(np.zeros(n) if biphasic else q)])
+    net = float(np.abs(Qc[j] - Qc[k]).max()) if n else 0.0
+    if not n:
+        v_peak = 0.0
+    elif biphasic:
+        from charge_accounting import account
+        v_peak = float(account(t, R, C, I, pw.max(), gap_us)[1]["v_peak_V"].iloc[0])
+    else:
+        off = np.maximum(0.0, np.diff(t, append=t[-1]) - pw * 1e-6)
+        v_peak = float(train_peaks(I, R, C, pw * 1e-6, off).max())
+    rows = [("max_rate_hz", rate, tg["max_rate_hz"]),
+            ("charge_per_phase_C", float(q.max()) if n else 0.0, tg["max_charge_per_phase_C"]),
+            ("net_charge_window_C", net, tg["max_net_charge_window_C"]),
+            ("v_peak_V", v_peak, tg["v_peak_frac"] * tg["V_comp_V"])]
+    rep = pd.DataFrame(rows, columns=["check", "value", "limit"])
+    rep["ok"] = rep["value"] <= rep["limit"] * (1 + 1e-9)  # a limit itself is allowed
+    return bool(rep["ok"].all()), rep
+
+def auto_seeds(lam, duration_s, max_seeds=5):
+    return int(np.clip(np.ceil(PLAN_EVENTS / max(lam * duration_s, 1.0)), 1, max_seeds))
+
+def check_params(lam, pw_min_us, pw_max_us, duration_s, R, C, targets=None, seed=0, seeds=None,
+                 firmware="isr", **kw):
+    """check_schedule over plans drawn with seeds seed..seed+seeds-1 (None: auto_seeds);
+    each check keeps its worst value."""
+    if not 0.0 < lam < LAMBDA_MAX_HZ:
+        rep = pd.DataFrame([("lambda_hz", float(lam), LAMBDA_MAX_HZ, False)], columns=["check", "value", "limit", "ok"])
+        return False, rep
+    seeds = auto_seeds(lam, duration_s) if seeds is None else max(1, seeds)
+    reps = [check_schedule(*plan_schedule(lam, pw_min_us, pw_max_us, duration_s, s, firmware),
+                           R, C, targets, **kw)[1] for s in range(seed, seed + seeds)]
+    rep = reps[0].copy()
+    rep["value"] = np.max([r["value"].to_numpy() for r in reps], axis=0)
+    rep["ok"] = rep["value"] <= rep["limit"] * (1 + 1e-9)
+    return bool(rep["ok"].all()), rep
+
+def format_report(rep):
+    return "\n".join(f"  {'OK ' if r.ok else 'FAIL'} {r.check:<20} {r.value:.4g} (limit {r.limit:.4g})"
+                     for r in rep.itertuples())
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--schedule", dest="schedule", default=None, help="CSV with time_s, pulse_width_us")
+    ap.add_argument("--lambda", dest="lambda_hz", type=float, default=2.0)
+    ap.add_argument("--pw-min", dest="pw_min", type=int, default=50)
+    ap.add_argument("--pw-max", dest="pw_max", type=int, default=1000)
+    ap.add_argument("--duration", dest="duration", type=float, default=3600.0)
+    ap.add_argument("--seed", dest="seed", type=int, default=0)
+    ap.add_argument("--seeds", dest="seeds", type=int, default=None,
+                    help="planned schedules checked, worst case (default: 1-5 by plan size)")
+    ap.add_argument("--firmware", dest="firmware", choices=FIRMWARES, default="isr")
+    ap.add_argument("--R", dest="R", type=float, required=True)
+    ap.add_argument("--C", dest="C", type=float, required=True)
+    ap.add_argument("--biphasic", dest="biphasic", action="store_true")
+    ap.add_argument("--gap-us", dest="gap_us", type=float, default=0.0)
+    ap.add_argument("--targets", dest="targets", default=TABLE19, help="table19-style CSV (I_limit, V_comp)")
+    for key, v in DEFAULT_TARGETS.items():
+        ap.add_argument("--" + key.replace("_", "-"), dest=key, type=float, default=None, help=f"default {v:g}")
+    ap.add_argument("--outdir", dest="outdir", default=None)
+    args = ap.parse_args()
+
+    tg = load_targets(args.targets)
+    tg.update({k: getattr(args, k) for k in DEFAULT_TARGETS if getattr(args, k) is not None})
+    if args.schedule:
+        df = pd.read_csv(args.schedule, usecols=["time_s", "pulse_width_us"]).sort_values("time_s")
+        t, pw = df["time_s"].to_numpy(), df["pulse_width_us"].to_numpy()
+        ok, rep = check_schedule(t, pw, args.R, args.C, tg, args.biphasic, args.gap_us)
+        print(f"{len(t)} pulses over {t[-1] if len(t) else 0:.1f} s")
+    else:
+        ok, rep = check_params(args.lambda_hz, args.pw_min, args.pw_max, args.duration, args.R, args.C, tg,
+                               args.seed, args.seeds, args.firmware, biphasic=args.biphasic, gap_us=args.gap_us)
+        seeds = args.seeds or auto_seeds(args.lambda_hz, args.duration)
+        print(f"{seeds} planned {args.duration:g} s sessions ({args.firmware} firmware), worst case:")
+    print(format_report(rep))
+    if args.outdir:
+        os.makedirs(args.outdir, exist_ok=True)
+        rep.to_csv(os.path.join(args.outdir, "preflight_report.csv"), index=False)
+    print("PASS" if ok else "FAIL: a safety target would be violated")
+    sys.exit(0 if ok else 1)
+
+if __name__ == "__main__":
+    main()
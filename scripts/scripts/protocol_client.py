@@ -0,0 +1,300 @@
+#!/usr/bin/env python3
+"""
+Pipelined command channel to the APPI firmware with reply correlation.
+Commands are written back to back without waiting (pipelined) and each one
+gets a Pending handle; the serial reader passes every line to feed(), which
+matches the OK/ACK/ERR replies to their requests:
+  csv     SET,lambda,<f> -> OK,lambda,<f>   (firmware_timer_isr.ino in this
+          SET,pwmin,<n>  -> OK,pwmin,<n>     folder answers ACK,... for SET
+          SET,pwmax,<n>  -> OK,pwmax,<n>     and nothing for SEED/START/STOP)
+          SEED,fixed,<s> -> OK,seed,fixed,<s>;  SEED,analog -> OK,seed,analog
+          START -> OK,START;  STOP -> OK,STOP;  unknown -> ERR,UnknownCommand
+  legacy  LAMBDA:<f>;MINW:<n>;MAXW:<n>      (gui_tk_app.py; no reply, so
+          set_params() completes on write and no latency is measured)
+The firmware answers in order, so a reply matches the oldest pending command
+with the same key (parameter name, seed, START/STOP; ERR: the oldest one),
+and pending commands ahead of it were not answered at all (CommandTimeout
+right away instead of after the timeout). Pending commands older than
+timeout are failed by expire(), which the caller's loop runs. At most
+max_inflight bytes are unanswered at once (the AVR serial RX buffer is 64
+bytes; a command line written into a full buffer is lost).
+Round-trip latency (write -> reply line read) goes into a log-binned
+histogram, 10 bins per decade from 0.1 ms to 10 s.
+Usage:
+  python protocol_client.py --port COM5 --lambda 2.0 --pwmin 50 --pwmax 1000 --repeat 200 --out logs/latency.csv
+"""
+import argparse, csv, math, threading, time
+from collections import deque
+
+DIALECTS = ("csv", "legacy")
+
+class CommandError(Exception):
+    """The firmware answered ERR,..."""
+
+class CommandTimeout(Exception):
+    """No reply within the timeout (or the firmware answered a later command instead)."""
+
+def command_key(cmd):
+    f = cmd.strip().split(",")
+    if f[0] == "SET" and len(f) >= 2:
+        return f[1]
+    if f[0] == "SEED":
+        return "seed"
+    return f[0]
+
+def parse_reply(line):
+    """("OK"|"ERR", key, rest) of a reply line, else None (EV/BIP and other output)."""
+    f = line.strip().split(",")
+    if f[0] in ("OK", "ACK") and len(f) >= 2:
+        return "OK", f[1], f[2:]
+    if f[0] == "ERR":
+        return "ERR", None, f[1:]
+    return None
+
+class Pending:
+    def __init__(self, cmd, key, t_sent, nbytes):
+        self.cmd, self.key, self.t_sent, self.nbytes = cmd, key, t_sent, nbytes
+        self.reply = self.error = self.latency = None
+        self._done = threading.Event()
+
+    @property
+    def done(self):
+        return self._done.is_set()
+
+    def _finish(self, reply=None, error=None, t=None):
+        self.reply, self.error = reply, error
+        if t is not None:
+            self.latency = t - self.t_sent
+        self._done.set()
+
+    def wait(self, timeout=None):
+        """The reply line; raises CommandError / CommandTimeout."""
+        if not self._done.wait(timeout):
+            raise CommandTimeout(f"{self.cmd}: no reply within {timeout} s")
+        if self.error is not None:
+            raise self.error
+        return self.reply
+
+class LatencyHistogram:
+    def __init__(self, lo=1e-4, hi=10.0, per_decade=10, keep=100000):
+        n = int(round(per_decade * math.log10(hi / lo)))
+        self.edges = [lo * 10 ** (k / per_decade) for k in range(n + 1)]
+        self.counts = [0] * (n + 2)  # [under, bins..., over]
+        self.samples = deque(maxlen=keep)
+        self.timeouts = self.errors = 0
+
+    def add(self, dt):
+        k = 0
+        while k < len(self.edges) and dt >= self.edges[k]:
+            k += 1
+        self.counts[k] += 1
+        self.samples.append(dt)
+
+    def quantile(self, q):
+        s = sorted(self.samples)
+        return s[min(len(s) - 1, int(q * len(s)))] if s else float("nan")
+
+    def summary(self):
+        n = len(self.samples)
+        ms = lambda x: f"{1e3 * x:.2f}"
+        if not n:
+            return f"latency: no replies (timeouts {self.timeouts}, errors {self.errors})"
+        return (f"latency [ms] n={n}: mean {ms(sum(self.samples) / n)}  p50 {ms(self.quantile(0.5))}  "
+                f"p95 {ms(self.quantile(0.95))}  p99 {ms(self.quantile(0.99))}  max {ms(max(self.samples))}  "
+                f"(timeouts {self.timeouts}, errors {self.errors})")
+
+    def rows(self):
+        """(lo_ms, hi_ms, count); the first/last rows are the under-/overflow bins."""
+        e = [0.0] + self.edges + [float("inf")]
+        return [(1e3 * e[k], 1e3 * e[k + 1], c) for k, c in enumerate(self.counts)]
+
+    def write_csv(self, path):
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            w = csv.writer(f)
+            w.writerow(["lo_ms", "hi_ms", "count"])
+            w.writerows(self.rows())
+
+class ProtocolClient:
+    def __init__(self, ser, dialect="csv", timeout=1.0, max_inflight=60, on_done=None):
+        if dialect not in DIALECTS:
+            raise ValueError(f"dialect must be one of {', '.join(DIALECTS)}")
+        self.ser, self.dialect, self.timeout, self.max_inflight = ser, dialect, timeout, max_inflight
+        self.on_done = on_done  # called with each finished Pending (from the reader / expire thread)
+        self.latency = LatencyHistogram()
+        self._pending = []
+        self._cv = threading.Condition()
+
+    def attach(self, ser):
+        """Continue on a reopened port; commands still pending on the old one fail."""
+        with self._cv:
+            old, self._pending = self._pending, []
+            self.ser = ser
+            self._cv.notify_all()
+        for p in old:
+            self._fail(p, CommandTimeout(f"{p.cmd}: link lost"))
+
+    def submit(self, cmd):
+        """Write cmd now (waits only while max_inflight bytes are unanswered); returns its Pending."""
+        data = (cmd + "\n").encode("utf-8")
+        if self.dialect == "legacy":
+            with self._cv:
+                p = Pending(cmd, None, time.perf_counter(), len(data))
+                self.ser.write(data)
+            p._finish()
+            return p
+        with self._cv:
+            deadline = time.monotonic() + self.timeout
+            while self._pending and sum(q.nbytes for q in self._pending) + len(data) > self.max_inflight:
+                if not self._cv.wait(max(0.0, deadline - time.monotonic())):
+                    break
+            p = Pending(cmd, command_key(cmd), time.perf_counter(), len(data))
+            self._pending.append(p)  # before the write, so the reply cannot overtake it
+            self.ser.write(data)
+        return p
+
+    def command(self, cmd, timeout=None):
+        """Send one command and wait for its reply."""
+        p = self.submit(cmd)
+        return self.wait(p, timeout)
+
+    def wait(self, p, timeout=None):
+        """The reply to p; by default waits until p is timeout old (not timeout from now)."""
+        if timeout is None:
+            timeout = max(0.0, self.timeout - (time.perf_counter() - p.t_sent))
+        try:
+            return p.wait(timeout)
+        except CommandTimeout:
+            with self._cv:
+                if p in self._pending:
+                    e = CommandTimeout(f"{p.cmd}: no reply after {1e3 * (time.perf_counter() - p.t_sent):.0f} ms")
+                    self._pending.remove(p); self._cv.notify_all()
+                    self.latency.timeouts += 1
+                    p._finish(error=e)
+            return p.wait(0)  # the reply may have come in meanwhile
+
+    def feed(self, line, t=None):
+        """Match a received line to its command; False if it is not a reply (EV/BIP, ...)."""
+        r = parse_reply(line)
+        if r is None:
+            return False
+        t = time.perf_counter() if t is None else t
+        status, key, _ = r
+        with self._cv:
+            i = 0 if key is None else next((k for k, p in enumerate(self._pending) if p.key == key), None)
+            if i is None or not self._pending:
+                return True  # unsolicited (e.g. a reply to a command sent before this client)
+            skipped, p = self._pending[:i], self._pending[i]
+            del self._pending[:i + 1]
+            self._cv.notify_all()
+        for q in skipped:
+            self._fail(q, CommandTimeout(f"{q.cmd}: not answered (device replied to {p.cmd})"))
+        if status == "OK":
+            self.latency.add(t - p.t_sent)
+            p._finish(line, t=t)
+        else:
+            self.latency.errors += 1
+            p._finish(line, CommandError(f"{p.cmd}: {line}"), t)
+        if self.on_done:
+            self.on_done(p)
+        return True
+
+    def _fail(self, p, err):
+        self.latency.timeouts += 1
+        p._finish(error=err)
+        if self.on_done:
+            self.on_done(p)
+
+    def expire(self):
+        """Fail the pending commands older than the timeout; returns them."""
+        now = time.perf_counter()
+        with self._cv:
+            old = [p for p in self._pending if now - p.t_sent > self.timeout]
+            if old:
+                self._pending = [p for p in self._pending if p not in old]
+                self._cv.notify_all()
+        for p in old:
+            self._fail(p, CommandTimeout(f"{p.cmd}: no reply within {self.timeout} s"))
+        return old
+
+    @property
+    def in_flight(self):
+        with self._cv:
+            return len(self._pending)
+
+    def set_params(self, lam=None, pwmin=None, pwmax=None):
+        """Pipelined parameter change in the client's dialect; list of Pending (wait_all to confirm)."""
+        if self.dialect == "legacy":
+            if None in (lam, pwmin, pwmax):
+                raise ValueError("legacy dialect sets lambda, pwmin and pwmax together")
+            return [self.submit(f"LAMBDA:{lam};MINW:{pwmin};MAXW:{pwmax}")]
+        cmds = [f"SET,{k},{v}" for k, v in (("lambda", lam), ("pwmin", pwmin), ("pwmax", pwmax)) if v is not None]
+        return [self.submit(c) for c in cmds]
+
+    def _csv_only(self, cmd):
+        if self.dialect == "legacy":
+            raise ValueError(f"{cmd} is not part of the legacy dialect")
+        return self.submit(cmd)
+
+    def seed(self, value=None):
+        return self._csv_only("SEED,analog" if value is None else f"SEED,fixed,{value}")
+
+    def start(self):
+        return self._csv_only("START")
+
+    def stop(self):
+        return self._csv_only("STOP")
+
+    def wait_all(self, pendings, timeout=None):
+        """Wait for every Pending; returns the list of failures (cmd, exception)."""
+        failed = []
+        for p in pendings:
+            try:
+                self.wait(p, timeout)
+            except (CommandError, CommandTimeout) as e:
+                failed.append((p.cmd, e))
+        return failed
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--port", dest="port", required=True)
+    ap.add_argument("--baud", dest="baud", type=int, default=115200)
+    ap.add_argument("--dialect", dest="dialect", choices=DIALECTS, default="csv")
+    ap.add_argument("--lambda", dest="lam", type=float, default=2.0)
+    ap.add_argument("--pwmin", dest="pwmin", type=int, default=50)
+    ap.add_argument("--pwmax", dest="pwmax", type=int, default=1000)
+    ap.add_argument("--repeat", dest="repeat", type=int, default=100, help="pipelined SET rounds to time")
+    ap.add_argument("--timeout", dest="timeout", type=float, default=1.0, help="reply timeout [s]")
+    ap.add_argument("--max-inflight", dest="max_inflight", type=int, default=60,
+                    help="unanswered bytes allowed on the link (device RX buffer)")
+    ap.add_argument("--out", dest="out", default=None, help="latency histogram CSV")
+    args = ap.parse_args()
+
+    import serial
+    ser = serial.Serial(args.port, args.baud, timeout=0.1)
+    time.sleep(0.3)
+    cl = ProtocolClient(ser, args.dialect, args.timeout, args.max_inflight)
+    stop = threading.Event()
+
+    def reader():
+        while not stop.is_set():
+            line = ser.readline()
+            if line:
+                cl.feed(line.decode("utf-8", errors="replace").strip())
+    t = threading.Thread(target=reader, daemon=True)
+    t.start()
+    failed = []
+    t0 = time.perf_counter()
+    for _ in range(args.repeat):
+        failed += cl.wait_all(cl.set_params(args.lam, args.pwmin, args.pwmax))
+    dt = time.perf_counter() - t0
+    stop.set(); t.join(); ser.close()
+    print(f"{args.repeat} rounds in {dt:.3f} s ({1e3 * dt / max(1, args.repeat):.2f} ms per parameter set)")
+    print(cl.latency.summary())
+    for cmd, e in failed[:5]:
+        print(f"  failed: {e}")
+    if args.out:
+        cl.latency.write_csv(args.out)
+        print("Histogram ->", args.out)
+
+if __name__ == "__main__":
+    main()
@@ -2,11 +2,12 @@
 """
 Compute PSD of load voltage (Figure 22 + Table 15) by aggregating into 1 ms bins.
 Input CSV is expected to contain columns: time_s, v_V (or 'voltage_V').
+--no-figures writes the table only (see figrender.py).
 Usage:
   python psd_on_load.py --in data/bench_waveform.csv --outdir figures
 """
 import argparse, os, numpy as np, pandas as pd
-import matplotlib.pyplot as plt
+import figrender
 
 def resample_ms(df):
     if "v_V" not in df.columns and "voltage_V" in df.columns:
@@ -29,21 +30,25 @@ def periodogram(x, fs):
     f = np.fft.rfftfreq(len(x0), d=1.0/fs)
     return f, P
 
+def fig_psd(fig, f, P):
+    ax = fig.add_subplot()
+    ax.semilogy(f[1:], P[1:] + 1e-24)
+    ax.set_xlabel("Frequency [Hz]"); ax.set_ylabel("Power")
+    ax.set_title("Figure 22. PSD of load voltage (1 ms bins)")
+    ax.grid(True, which="both", alpha=0.3); fig.tight_layout()
+
 def main():
     ap = argparse.ArgumentParser()
     ap.add_argument("--in", dest="in_csv", required=True)
     ap.add_argument("--outdir", dest="outdir", required=True)
+    figrender.add_figure_args(ap)
     args = ap.parse_args()
     os.makedirs(args.outdir, exist_ok=True)
     df = pd.read_csv(args.in_csv)
     x, fs = resample_ms(df)
     f, P = periodogram(x, fs)
-    plt.figure(figsize=(6,4))
-    plt.semilogy(f[1:], P[1:] + 1e-24)
-    plt.xlabel("Frequency [Hz]"); plt.ylabel("Power")
-    plt.title("Figure 22. PSD of load voltage (1 ms bins)")
-    plt.grid(True, which="both", alpha=0.3); plt.tight_layout()
-    plt.savefig(os.path.join(args.outdir, "fig22_psd_load.png"), dpi=300); plt.close()
+    with figrender.from_args(args) as fr:
+        fr.submit(fig_psd, os.path.join(args.outdir, "fig22_psd_load.png"), f, P)
     pd.DataFrame({"freq_Hz": f, "power": P}).to_csv(os.path.join(args.outdir, "table15_psd_load.csv"), index=False)
     print("Done. Outputs in:", args.outdir)
 
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Per-pulse waveform metrics for every pulse of a simulated session.
+Same definitions as the first-pulse table of rc_ccs_sim.py, on the sample
+grid, over the pulse samples [s, e):
+  v_max_V            max v
+  rise_time_10_90_us first sample >= 0.9 v_max minus first sample >= 0.1 v_max
+  droop_V            v[s] - v[e-1]
+  energy_pulse_mJ    sum v^2 / R dt               (R||C load: power in R)
+  energy_in_mJ       sum v * i dt                 (given the current: energy delivered
+                                                   to any load, e.g. randles/cpe)
+All pulses are reduced at once: the sample indices of a batch of pulses are
+laid out flat and reduced per pulse with ufunc.reduceat (crossings via
+minimum.reduceat over the local index of samples above threshold), so
+overlapping pulses are fine and memory is bounded by --max-samples.
+Outputs: table12_waveform_metrics_per_pulse.csv, table12_waveform_metrics_summary.csv
+Usage:
+  python pulse_metrics.py --wave figures/bench_waveform.csv --events data/fig1_pulse_train.csv \
+      --R 1000 --outdir tables
+  Without --R the wave CSV must carry i_A and energy_in_mJ is reported instead.
+"""
+import argparse, os, numpy as np, pandas as pd
+
+METRICS = ["v_max_V", "rise_time_10_90_us", "droop_V", "energy_pulse_mJ"]
+METRICS_VI = METRICS[:3] + ["energy_in_mJ"]
+QUANTILES = (0.05, 0.5, 0.95, 0.99)
+
+def grid_indices(t_s, pw_us, dt):
+    """(start, n) sample indices as bench_rc_load_sim1 injects the current."""
+    s = np.floor(np.asarray(t_s, dtype=float) / dt).astype(np.int64)
+    n = np.maximum(1, np.round(np.asarray(pw_us, dtype=float) * 1e-6 / dt)).astype(np.int64)
+    return s, n
+
+def _reduce(v, s, e, dt, R, i=None):
+    L = e - s
+    off = np.concatenate([[0], np.cumsum(L)[:-1]])
+    idx = np.arange(L.sum()) - np.repeat(off - s, L)   # flat sample indices of every pulse
+    local = np.arange(L.sum()) - np.repeat(off, L)
+    vals = v[idx]
+    vmax = np.maximum.reduceat(vals, off)
+    big = np.iinfo(np.int64).max
+
+    def first(frac):
+        hit = vals >= np.repeat(frac * vmax, L)
+        k = np.minimum.reduceat(np.where(hit, local, big), off)
+        return np.where(k == big, L, k)  # no crossing -> e, as find_cross()
+    rise = np.round((first(0.9) - first(0.1)) * dt * 1e6, 6)
+    droop = np.where(L > 1, v[s] - v[e - 1], 0.0)
+    if i is None:
+        energy = np.add.reduceat(vals * vals, off) / R * dt * 1000.0
+    else:
+        energy = np.add.reduceat(vals * i[idx], off) * dt * 1000.0
+    return vmax, rise, droop, energy
+
+def pulse_metrics(v, dt, start, n, R=None, max_samples=5_000_000, i=None):
+    """Metrics for pulses occupying samples [start, start+n) of v; pulses starting past the end are dropped.
+    Energy is sum v^2/R dt (energy_pulse_mJ), or sum v*i dt (energy_in_mJ) when the current i is given."""
+    if (R is None) == (i is None):
+        raise ValueError("pass exactly one of R or i")
+    v = np.asarray(v, dtype=float)
+    if i is not None:
+        i = np.asarray(i, dtype=float)
+    names = METRICS if i is None else METRICS_VI
+    start = np.asarray(start, dtype=np.int64); n = np.asarray(n, dtype=np.int64)
+    keep = (start >= 0) & (start < len(v))
+    k_src = np.flatnonzero(keep)
+    s = start[keep]; e = np.minimum(len(v), s + n[keep])
+    out = [np.empty(len(s)) for _ in names]
+    cs = np.cumsum(e - s)
+    lo = 0
+    while lo < len(s):
+        base = cs[lo - 1] if lo else 0
+        hi = max(lo + 1, int(np.searchsorted(cs, base + max_samples, side="right")))
+        for o, r in zip(out, _reduce(v, s[lo:hi], e[lo:hi], dt, R, i)):
+            o[lo:hi] = r
+        lo = hi
+    df = pd.DataFrame({"pulse": k_src, "pulse_start_s": np.round(s * dt, 12),
+                       "pulse_width_us": np.round((e - s) * dt * 1e6, 6)})
+    for m, o in zip(names, out):
+        df[m] = o
+    return df
+
+def summarize(per, quantiles=QUANTILES):
+    rows = []
+    for m in METRICS + METRICS_VI[3:]:
+        if m not in per:
+            continue
+        x = per[m].to_numpy()
+        r = {"metric": m, "n": len(x), "mean": float(np.mean(x)) if len(x) else np.nan,
+             "max": float(np.max(x)) if len(x) else np.nan}
+        for q in quantiles:
+            r[f"p{int(round(q * 100))}"] = float(np.quantile(x, q)) if len(x) else np.nan
+        rows.append(r)
+    return pd.DataFrame(rows)
+
+def write_tables(per, outdir, prefix="table12_waveform_metrics"):
+    os.makedirs(outdir, exist_ok=True)
+    per.to_csv(os.path.join(outdir, f"{prefix}_per_pulse.csv"), index=False)
+    summary = summarize(per)
+    summary.to_csv(os.path.join(outdir, f"{prefix}_summary.csv"), index=False)
+    return summary
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--wave", dest="wave_csv", required=True, help="CSV with columns time_s, v_V")
+    ap.add_argument("--events", dest="events_csv", required=True, help="CSV with columns time_s, pulse_width_us")
+    ap.add_argument("--R", dest="R", type=float, default=None,
+                    help="load resistance for energy_pulse_mJ; omit to use i_A of --wave (energy_in_mJ)")
+    ap.add_argument("--max-samples", dest="max_samples", type=int, default=5_000_000)
+    ap.add_argument("--outdir", dest="outdir", required=True)
+    args = ap.parse_args()
+
+    w = pd.read_csv(args.wave_csv, usecols=["time_s", "v_V"] + ([] if args.R is not None else ["i_A"]))
+    ev = pd.read_csv(args.events_csv, usecols=["time_s", "pulse_width_us"])
+    t = w["time_s"].to_numpy()
+    dt = round((t[-1] - t[0]) / (len(t) - 1) * 1e6, 6) * 1e-6  # same float as the simulators' dt_us*1e-6
+    s, n = grid_indices(ev["time_s"].to_numpy(), ev["pulse_width_us"].to_numpy(), dt)
+    i = None if args.R is not None else w["i_A"].to_numpy()
+    per = pulse_metrics(w["v_V"].to_numpy(), dt, s, n, args.R, args.max_samples, i)
+    print(write_tables(per, args.outdir).to_string(index=False))
+    print("Done. Outputs in:", args.outdir)
+
+if __name__ == "__main__":
+    main()
@@ -1,48 +1,113 @@
 #!/usr/bin/env python3
 """
 Raster comparison: periodic (2 Hz) vs APPI (~2 Hz) for equal duration.
+Each channel is drawn as one EventCollection (eventplot), not one artist per
+spike. A channel with more spikes than pixel columns in the window (--density
+auto; on: every channel, off: never) is drawn as per-pixel spike-count
+shading instead; its isolated spikes (no other spike in the neighbouring
+columns) stay ordinary full-opacity event lines.
+Channels: periodic, then one APPI train per --seeds entry, then any --in logs
+(CSV with time_s, e.g. other devices). Rendered via figrender.
 Outputs:
   - fig27_raster_compare.png
 Usage:
   python raster_compare_periodic_vs_appi.py --duration 10 --lambda 2.0 --outdir figures --seed 7
+  python raster_compare_periodic_vs_appi.py --duration 600 --lambda 20 --seeds 1 2 3 4 \
+      --tmin 100 --tmax 110 --outdir figures
 """
-import argparse, os, numpy as np
-import matplotlib.pyplot as plt
+import argparse, os, numpy as np, pandas as pd
+from plot_decimate import pixel_edges
+import figrender
 
 def make_appi(lam, dur, rng):
-    t=0.0; T=[]
-    while t<dur:
-        isi=rng.exponential(1.0/lam)
-        t+=isi
-        if t>dur: break
-        T.append(t)
-    return np.array(T)
+    """Poisson times on (0, dur], ISIs drawn in blocks (same stream as one draw per event)."""
+    n = int(dur * lam * 1.1 + 10 * np.sqrt(dur * lam) + 16)
+    T = np.cumsum(rng.exponential(1.0/lam, n))
+    while T[-1] <= dur:
+        T = np.concatenate([T, T[-1] + np.cumsum(rng.exponential(1.0/lam, n))])
+    return T[T <= dur]
 
 def make_periodic(rate_hz, dur):
     return np.arange(1.0/rate_hz, dur+1e-9, 1.0/rate_hz)
 
+def isolated(cnt):
+    """Columns holding exactly one spike with both neighbouring columns empty."""
+    nb = np.concatenate([[0], cnt[:-1]]) + np.concatenate([cnt[1:], [0]])
+    return (cnt == 1) & (nb == 0)
+
+def density_image(trains, edges, colors):
+    """RGBA rows (one per channel): channel colour, alpha ~ log spike count per column;
+    isolated spikes are left transparent (raster() draws them as event lines)."""
+    from matplotlib.colors import to_rgba
+    img = np.zeros((len(trains), len(edges) - 1, 4))
+    for k, (T, c) in enumerate(zip(trains, colors)):
+        cnt = np.histogram(T, bins=edges)[0]
+        img[k, :, :3] = to_rgba(c)[:3]
+        img[k, :, 3] = np.where(isolated(cnt), 0.0, np.log1p(cnt) / np.log1p(max(cnt.max(), 1)))
+    return img
+
+def raster(ax, trains, colors, tmin, tmax, dpi, density="auto", lw=0.8):
+    """Draw channel k on [k+0.1, k+0.9]; returns the channels drawn as density."""
+    edges = np.concatenate([[tmin], pixel_edges(ax, dpi, (tmin, tmax)), [tmax]])
+    trains = [T[(T >= tmin) & (T <= tmax)] for T in trains]
+    dense = [density == "on" or (density == "auto" and len(T) > len(edges) - 1) for T in trains]
+    lines = []
+    for T, d in zip(trains, dense):
+        if d:  # only the isolated spikes of a shaded channel
+            col = np.clip(np.searchsorted(edges, T, side="right") - 1, 0, len(edges) - 2)
+            T = T[isolated(np.histogram(T, bins=edges)[0])[col]]
+        lines.append(T)
+    ev = [k for k in range(len(trains)) if len(lines[k])]
+    if ev:
+        ax.eventplot([lines[k] for k in ev], lineoffsets=[k + 0.5 for k in ev], linelengths=0.8,
+                     colors=[colors[k] for k in ev], linewidths=lw)
+    for k in np.flatnonzero(dense):
+        ax.imshow(density_image([trains[k]], edges, [colors[k]]), aspect="auto",
+                  interpolation="nearest", extent=(tmin, tmax, k + 0.1, k + 0.9), origin="lower")
+    return [k for k in range(len(trains)) if dense[k]]
+
+def fig_raster(fig, trains, labels, tmin, tmax, density="auto", dpi=300):
+    n = len(trains)
+    ax = fig.add_subplot()
+    ax.set_yticks(np.arange(n) + 0.5, labels)
+    ax.set_ylim(0, n + 0.2); ax.set_xlim(tmin, tmax)
+    ax.set_xlabel("Time [s]"); ax.set_title("Figure 27. Raster: periodic vs APPI timing")
+    ax.grid(True, axis="x", alpha=0.25); fig.tight_layout()
+    dense = raster(ax, trains, [f"C{k}" for k in range(n)], tmin, tmax, dpi=dpi, density=density)
+    ax.set_ylim(0, n + 0.2); ax.set_xlim(tmin, tmax)
+    if dense:
+        print("Density shading for channels:", [labels[k] for k in dense])
+
 def main():
     ap = argparse.ArgumentParser()
     ap.add_argument("--duration", dest="duration_s", type=float, required=True)
     ap.add_argument("--lambda", dest="lambda_hz", type=float, default=2.0)
     ap.add_argument("--outdir", dest="outdir", required=True)
     ap.add_argument("--seed", dest="seed", type=int, default=7)
+    ap.add_argument("--seeds", dest="seeds", type=int, nargs="+", default=None,
+                    help="one APPI channel per seed (default: --seed)")
+    ap.add_argument("--in", dest="in_csv", nargs="*", default=[], help="extra channels from event logs")
+    ap.add_argument("--tmin", dest="tmin", type=float, default=0.0)
+    ap.add_argument("--tmax", dest="tmax", type=float, default=None)
+    ap.add_argument("--density", dest="density", choices=["auto", "on", "off"], default="auto")
+    figrender.add_figure_args(ap)
     args = ap.parse_args()
     os.makedirs(args.outdir, exist_ok=True)
-    rng = np.random.default_rng(args.seed)
-    T_appi = make_appi(args.lambda_hz, args.duration_s, rng)
-    T_per = make_periodic(args.lambda_hz, args.duration_s)
-
-    plt.figure(figsize=(7,3))
-    for t in T_per:
-        plt.plot([t,t],[0.1,0.9], color="tab:blue", lw=0.8)
-    for t in T_appi:
-        plt.plot([t,t],[1.1,1.9], color="tab:orange", lw=0.8)
-    plt.yticks([0.5,1.5], ["Periodic (2 Hz)","APPI (~2 Hz)"])
-    plt.ylim(0,2.2); plt.xlim(0,args.duration_s)
-    plt.xlabel("Time [s]"); plt.title("Figure 27. Raster: periodic vs APPI timing")
-    plt.grid(True, axis="x", alpha=0.25); plt.tight_layout()
-    plt.savefig(os.path.join(args.outdir, "fig27_raster_compare.png"), dpi=300); plt.close()
+    seeds = args.seeds or [args.seed]
+    tmax = args.duration_s if args.tmax is None else args.tmax
+
+    trains = [make_periodic(args.lambda_hz, args.duration_s)]
+    labels = [f"Periodic ({args.lambda_hz:g} Hz)"]
+    for s in seeds:
+        trains.append(make_appi(args.lambda_hz, args.duration_s, np.random.default_rng(s)))
+        labels.append(f"APPI (~{args.lambda_hz:g} Hz)" if len(seeds) == 1 else f"APPI seed {s}")
+    for path in args.in_csv:
+        trains.append(pd.read_csv(path, usecols=["time_s"])["time_s"].to_numpy())
+        labels.append(os.path.splitext(os.path.basename(path))[0])
+
+    with figrender.from_args(args) as fr:
+        fr.submit(fig_raster, os.path.join(args.outdir, "fig27_raster_compare.png"),
+                  trains, labels, args.tmin, tmax, args.density, figsize=(7, max(3, 0.45*len(trains) + 2)))
     print("Done. Outputs in:", args.outdir)
 
 if __name__ == "__main__":
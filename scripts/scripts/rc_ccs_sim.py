@@ -3,12 +3,16 @@
 RC (R||C) + idealni CCS (I_limit, V_comp) simulacija s korakom dt=1 µs, prozor=0.5 s.
 Ulaz: datasets/fig1_pulse_train.csv
 Izlaz: figures/fig19_rc_voltage_apppi.png, figures/fig20_ccs_current_apppi.png,
-       tables/table11_load_ccs_params.csv, tables/table12_waveform_metrics_first_pulse.csv
+       tables/table11_load_ccs_params.csv, tables/table12_waveform_metrics_first_pulse.csv,
+       tables/table12_waveform_metrics_per_pulse.csv, tables/table12_waveform_metrics_summary.csv
+       (iste metrike za svaki impuls + percentili, vidi pulse_metrics.py)
 """
 import os, csv
 import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
+from plot_decimate import plot_envelope, savefig
+import pulse_metrics
 
 os.makedirs("tables", exist_ok=True)
 os.makedirs("figures", exist_ok=True)
@@ -52,36 +56,25 @@ for k in range(1, N):
   if v[k] > V_comp: v[k] = V_comp
   if v[k] < 0: v[k] = 0.0
 
-# metrika prvog impulsa
-first = None
-for ts, pwu in events:
-  if ts < window_s:
-    first = (ts, pwu); break
-if first is not None:
-  s = int(first[0]/dt); e = min(N, s+max(1,int((first[1]/1e6)/dt)))
-  vmax = float(np.max(v[s:e]))
-  # rise 10-90%
-  v10 = 0.1*vmax; v90 = 0.9*vmax
-  def find_cross(arr, start, end, thr):
-    for kk in range(start, end):
-      if arr[kk] >= thr: return kk
-    return end
-  k10 = find_cross(v, s, e, v10); k90 = find_cross(v, s, e, v90)
-  rise_us = (k90 - k10)*dt*1e6
-  droop_v = float(v[s] - v[e-1]) if e-1 > s else 0.0
-  energy_mJ = float(np.sum( v[s:e]**2 / R * dt )*1000.0)
+# metrike za svaki impuls (vektorski, pulse_metrics.py); prvi impuls i dalje posebno
+ts_all = df["t_schedule_s"].to_numpy(); pw_all = df["pulse_width_us"].to_numpy()
+per = pulse_metrics.pulse_metrics(v, dt, (ts_all/dt).astype(np.int64),
+                                  np.maximum(1, ((pw_all/1e6)/dt).astype(np.int64)), R)
+pulse_metrics.write_tables(per, "tables")
+if len(per):
+  m = per.iloc[0]; k = int(m["pulse"])
   with open("tables/table12_waveform_metrics_first_pulse.csv","w",newline="",encoding="utf-8") as f:
     w=csv.writer(f); w.writerow(["pulse_start_s","pulse_width_us","v_max_V","rise_time_10_90_us","droop_V","energy_pulse_mJ"])
-    w.writerow([first[0], first[1], vmax, rise_us, droop_v, energy_mJ])
+    w.writerow([ts_all[k], pw_all[k], m["v_max_V"], m["rise_time_10_90_us"], m["droop_V"], m["energy_pulse_mJ"]])
 
-# crteži
-plt.figure(); plt.plot(t, v); plt.xlim(0, window_s)
+# crteži (min/max anvelopa po pikselu, vidi plot_decimate.py)
+plt.figure(); plot_envelope(plt.gca(), t, v, dpi=160, xlim=(0, window_s)); plt.xlim(0, window_s)
 plt.xlabel("t [s]"); plt.ylabel("v(t) [V]"); plt.grid(True)
 plt.title("Load voltage v(t) under APPI")
-plt.savefig("figures/fig19_rc_voltage_apppi.png", dpi=160)
+savefig("figures/fig19_rc_voltage_apppi.png", 160)
 
-plt.figure(); plt.step(t, i_in, where="post"); plt.xlim(0, window_s)
+plt.figure(); plot_envelope(plt.gca(), t, i_in, dpi=160, step=True, xlim=(0, window_s)); plt.xlim(0, window_s)
 plt.xlabel("t [s]"); plt.ylabel("I_in(t) [A]"); plt.grid(True)
 plt.title("Injected current (CCS)")
-plt.savefig("figures/fig20_ccs_current_apppi.png", dpi=160)
+savefig("figures/fig20_ccs_current_apppi.png", 160)
 print("RC+CCS sim done.")
@@ -2,14 +2,15 @@
 """
 Robustness across seeds (Figure 24 + Table 21).
 Generates ~30 s per seed with specified λ and PW range, then runs KS tests.
+Also summarises the p-values across seeds (ks_batch.pvalue_summary): KS of the
+p-values vs Uniform[0,1] (table21b) and their histogram (table21c, Figure 24b).
 
 Usage:
   python robustness_by_seed.py --lambda 2.0 --duration 30 --pw-min 50 --pw-max 1000 \
-      --seeds 1001 1002 1003 1004 1005 --outdir figures
+      --seeds 1001 1002 1003 1004 1005 --outdir figures [--source lfsr]
 """
-import argparse, os, numpy as np, pandas as pd
-import matplotlib.pyplot as plt
-from scipy import stats
+import argparse, os, numpy as np
+import ks_batch, figrender, simcache
 
 def generate(lambda_hz, duration_s, pw_min_us, pw_max_us, rng):
     t = 0.0; T = []; W = []
@@ -21,13 +22,18 @@ def generate(lambda_hz, duration_s, pw_min_us, pw_max_us, rng):
         T.append(t)
     return np.array(T), np.array(W)
 
-def ks_wrap(isi, w):
-    lam = 1.0/np.mean(isi) if len(isi) else np.nan
-    scale = 1.0/lam if lam>0 else np.inf
-    D1, p1 = stats.kstest(isi, 'expon', args=(0, scale)) if len(isi)>0 and np.isfinite(scale) else (np.nan, np.nan)
-    a, b = int(np.min(w)), int(np.max(w))
-    D2, p2 = stats.kstest(w, 'uniform', args=(a, (b-a) if b>a else 1)) if len(w)>0 else (np.nan, np.nan)
-    return lam, D1, p1, D2, p2
+@simcache.memoize("1")
+def generate_seeded(lambda_hz, duration_s, pw_min_us, pw_max_us, seed):
+    """generate() with a fresh PCG64 stream per seed; cached across runs."""
+    return generate(lambda_hz, duration_s, pw_min_us, pw_max_us, np.random.default_rng(seed))
+
+def fig_robustness(fig, df):
+    ax = fig.add_subplot()
+    ax.plot(df["seed"], df["KS_ISI_p"], "o-", label="ISI p-value")
+    ax.plot(df["seed"], df["KS_PW_p"], "s-", label="PW p-value")
+    ax.axhline(0.05, color="k", ls="--", lw=1, label="α=0.05")
+    ax.set_xlabel("Seed"); ax.set_ylabel("p-value"); ax.set_title("Figure 24. Robustness by seed (KS p-values)")
+    ax.grid(True, alpha=0.3); ax.legend(); fig.tight_layout()
 
 def main():
     ap = argparse.ArgumentParser()
@@ -37,30 +43,34 @@ def main():
     ap.add_argument("--pw-max", dest="pw_max_us", type=int, required=True)
     ap.add_argument("--seeds", nargs="+", type=int, required=True)
     ap.add_argument("--outdir", dest="outdir", required=True)
+    ap.add_argument("--source", dest="source", choices=["pcg64", "lfsr"], default="pcg64")
+    ap.add_argument("--alpha", dest="alpha", type=float, default=0.05)
+    figrender.add_figure_args(ap)
     args = ap.parse_args()
 
-    rows = []
-    for s in args.seeds:
-        rng = np.random.default_rng(s)
-        T, W = generate(args.lambda_hz, args.duration_s, args.pw_min_us, args.pw_max_us, rng)
-        isi = np.diff(T)
-        lam, D1, p1, D2, p2 = ks_wrap(isi, W)
-        rows.append({
-            "seed": s, "n_events": len(T), "lambda_mle_Hz": lam,
-            "KS_ISI_D": D1, "KS_ISI_p": p1, "KS_PW_D": D2, "KS_PW_p": p2
-        })
-    df = pd.DataFrame(rows)
+    if args.source == "lfsr":
+        from lfsr16 import Lfsr16, generate_events
+        runs = [generate_events(args.lambda_hz, args.duration_s, args.pw_min_us, args.pw_max_us,
+                                Lfsr16(s)) for s in args.seeds]
+    else:
+        runs = [generate_seeded(args.lambda_hz, args.duration_s, args.pw_min_us, args.pw_max_us, s)
+                for s in args.seeds]
+    off = np.concatenate([[0], np.cumsum([len(T) for T, _ in runs])])
+    T = np.concatenate([T for T, _ in runs]); W = np.concatenate([W for _, W in runs])
+    # KS for all seeds in one vectorized pass (asymptotic p-values)
+    df = ks_batch.robustness_table(args.seeds, T, W, off)
+    summary, hist = ks_batch.pvalue_summary(df, args.alpha)
 
     os.makedirs(args.outdir, exist_ok=True)
     df.to_csv(os.path.join(args.outdir, "table21_robustness.csv"), index=False)
+    summary.to_csv(os.path.join(args.outdir, "table21b_pvalue_uniformity.csv"), index=False)
+    hist.to_csv(os.path.join(args.outdir, "table21c_pvalue_histogram.csv"), index=False)
 
-    plt.figure(figsize=(6,4))
-    plt.plot(df["seed"], df["KS_ISI_p"], "o-", label="ISI p-value")
-    plt.plot(df["seed"], df["KS_PW_p"], "s-", label="PW p-value")
-    plt.axhline(0.05, color="k", ls="--", lw=1, label="α=0.05")
-    plt.xlabel("Seed"); plt.ylabel("p-value"); plt.title("Figure 24. Robustness by seed (KS p-values)")
-    plt.grid(True, alpha=0.3); plt.legend(); plt.tight_layout()
-    plt.savefig(os.path.join(args.outdir, "fig24_robustness.png"), dpi=300); plt.close()
+    with figrender.from_args(args) as fr:
+        fr.submit(fig_robustness, os.path.join(args.outdir, "fig24_robustness.png"), df)
+        fr.submit(ks_batch.fig_pvalue_hist, os.path.join(args.outdir, "fig24b_pvalue_hist.png"), hist)
+    for r in summary.itertuples():
+        print(f"{r.test}: {r.n_seeds} seeds, {100 * r.frac_p_below_alpha:.1f}% below α={r.alpha}, D={r.D:.3f} p={r.p_value:.3f}")
     print("Done. Outputs in:", args.outdir)
 
 if __name__ == "__main__":
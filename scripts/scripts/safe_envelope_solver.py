@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Inverse envelope: the largest λ (or PW) that keeps v_peak on R||C under a
+limit (default 0.95 V_comp) for given I_limit, vectorized over many loads.
+
+periodic  closed-form periodic steady state (the supremum of what
+          env_map_vpeak / operational_envelope_map approach from v = 0):
+            v_peak = I R (1 - a_on) / (1 - exp(-T/RC)),  a_on = exp(-PW/RC)
+          inverted exactly for T (or PW); PW is the longest pulse (--pw-max).
+p99       APPI trains (ISI ~ Exp(λ), PW ~ U[pw_min, pw_max]): the q-quantile
+          of per-pulse peaks over --pulses pulses. Peaks follow the affine
+          recursion v_k = a_on,k a_off,k-1 v_k-1 + I R (1 - a_on,k), composed
+          with charge_accounting.affine_scan for all loads at once. Common
+          random numbers (unit exponentials E_k, uniforms U_k from --seed)
+          make every peak monotone in λ (ISI = E_k/λ) and in pw_max, so a
+          vectorized geometric bisection brackets the boundary. Overlapping
+          pulses are taken back to back (no superposition).
+A limit that a single pulse already exceeds gives 0; a boundary beyond the
+bracket (--lambda-hi) or the duty-cycle limit (PW = T) is reported at that
+bound with bound_hit = True.
+Outputs: table25_safe_envelope.csv
+Usage:
+  python safe_envelope_solver.py --I-limit 0.01 --V-comp 10 --R 500 1000 2000 --C 1e-7 1e-6 \
+      --solve lambda --pw-min 50 --pw-max 1000 --mode periodic --outdir tables
+  python safe_envelope_solver.py --I-limit 0.01 --V-comp 10 --R 1000 --C 1e-7 \
+      --solve pw --lambda 5 --mode p99 --outdir tables
+"""
+import argparse, os, numpy as np, pandas as pd
+from charge_accounting import affine_scan
+
+def vpeak_periodic(I, R, C, lam, pw_us):
+    """Steady-state peak of a periodic train (broadcast over all arguments)."""
+    tau = np.asarray(R, dtype=float) * C
+    a_on = np.exp(-np.asarray(pw_us, dtype=float) * 1e-6 / tau)
+    return I * R * (1.0 - a_on) / (-np.expm1(-1.0 / (np.asarray(lam, dtype=float) * tau)))
+
+def max_lambda_periodic(I, R, C, pw_us, limit):
+    """(λ_max, bound_hit): largest rate with steady-state v_peak <= limit; duty limit 1/PW."""
+    tau = np.asarray(R, dtype=float) * C; PW = np.asarray(pw_us, dtype=float) * 1e-6
+    single = I * R * -np.expm1(-PW / tau)          # one pulse from v = 0
+    b = 1.0 - single / limit                      # exp(-T/tau) <= b
+    with np.errstate(divide="ignore", invalid="ignore"):
+        T_min = np.where(b > 0, -tau * np.log(np.where(b > 0, b, 1.0)), np.inf)
+    hit = T_min <= PW
+    lam = np.where(b > 0, 1.0 / np.maximum(T_min, PW), 0.0)
+    return lam, hit & (b > 0)
+
+def max_pw_periodic(I, R, C, lam, limit):
+    """(PW_max [µs], bound_hit): longest pulse with steady-state v_peak <= limit at rate λ; at most T."""
+    tau = np.asarray(R, dtype=float) * C; T = 1.0 / np.asarray(lam, dtype=float)
+    c = limit * -np.expm1(-T / tau) / (I * R)     # 1 - a_on <= c
+    with np.errstate(divide="ignore", invalid="ignore"):
+        pw = np.where(c < 1, -tau * np.log1p(-np.minimum(c, 1.0)), np.inf)
+    return np.minimum(pw, T) * 1e6, pw >= T
+
+def train_peaks(I, R, C, PW, off):
+    """Per-pulse peak (end of each pulse) on R||C from v = 0; PW and off (pulse end -> next start) [s]
+    along axis 0, R and C broadcast against the trailing axes."""
+    tau = R * C
+    a_on = np.exp(-PW / tau)
+    a = a_on * np.concatenate([np.zeros_like(a_on[:1]), np.exp(-off[:-1] / tau)])  # v_0 = 0 so a[0] drops out
+    return affine_scan(a, I * R * (1.0 - a_on))[1]
+
+def crn_draws(n, seed):
+    """Common random numbers for the p99 mode: unit exponentials (ISI) and uniforms (PW)."""
+    rng = np.random.default_rng(seed)
+    return rng.exponential(1.0, n), rng.random(n)
+
+def vpeak_quantile(I, R, C, lam, pw_min_us, pw_max_us, E, U, q=0.99, burn=0.05):
+    """q-quantile of per-pulse peaks per load; R, C, lam, pw_max_us broadcast to (n_loads,)."""
+    R, C, lam, pw_max_us = np.broadcast_arrays(*(np.atleast_1d(np.asarray(x, dtype=float))
+                                                 for x in (R, C, lam, pw_max_us)))
+    PW = (pw_min_us + U[:, None] * (pw_max_us - pw_min_us)[None, :]) * 1e-6
+    off = np.maximum(0.0, E[:, None] / lam[None, :] - PW)
+    v = train_peaks(I, R[None, :], C[None, :], PW, off)
+    return np.quantile(v[int(burn * len(E)):], q, axis=0)
+
+def bisect_increasing(f, lo, hi, limit, iters=30):
+    """Largest x in [lo, hi] with f(x) <= limit for f increasing in x, per column; geometric bisection.
+    Returns (x, bound_hit); x = 0 where f(lo) > limit."""
+    lo = np.array(lo, dtype=float); hi = np.array(hi, dtype=float)
+    ok_hi = f(hi) <= limit
+    bad_lo = f(lo) > limit
+    for _ in range(iters):
+        mid = np.sqrt(lo * hi)
+        good = f(mid) <= limit
+        lo = np.where(good, mid, lo); hi = np.where(good, hi, mid)
+    x = np.where(ok_hi, hi, lo)
+    return np.where(bad_lo, 0.0, x), ok_hi
+
+def solve(args, R, C):
+    limit = args.v_limit if args.v_limit is not None else args.limit_frac * args.V_comp
+    I = args.I_limit
+    if args.mode == "periodic":
+        if args.solve == "lambda":
+            x, hit = max_lambda_periodic(I, R, C, args.pw_max, limit)
+        else:
+            x, hit = max_pw_periodic(I, R, C, args.lambda_hz, limit)
+        return x, hit, limit
+    E, U = crn_draws(args.pulses, args.seed)
+    n = len(R)
+    if args.solve == "lambda":
+        f = lambda lam: vpeak_quantile(I, R, C, lam, args.pw_min, args.pw_max, E, U, args.quantile)
+        x, hit = bisect_increasing(f, np.full(n, args.lambda_lo), np.full(n, args.lambda_hi), limit, args.iters)
+    else:
+        f = lambda pw: vpeak_quantile(I, R, C, args.lambda_hz, args.pw_min, pw, E, U, args.quantile)
+        x, hit = bisect_increasing(f, np.full(n, args.pw_min), np.full(n, 1e6 / args.lambda_hz), limit, args.iters)
+    return x, hit, limit
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--I-limit", dest="I_limit", type=float, required=True)
+    ap.add_argument("--V-comp", dest="V_comp", type=float, required=True)
+    ap.add_argument("--limit-frac", dest="limit_frac", type=float, default=0.95, help="limit = frac * V_comp")
+    ap.add_argument("--v-limit", dest="v_limit", type=float, default=None, help="absolute limit [V]")
+    ap.add_argument("--R", dest="R", type=float, nargs="+", required=True)
+    ap.add_argument("--C", dest="C", type=float, nargs="+", required=True)
+    ap.add_argument("--solve", dest="solve", choices=["lambda", "pw"], default="lambda")
+    ap.add_argument("--mode", dest="mode", choices=["periodic", "p99"], default="periodic")
+    ap.add_argument("--pw-min", dest="pw_min", type=float, default=50.0)
+    ap.add_argument("--pw-max", dest="pw_max", type=float, default=1000.0)
+    ap.add_argument("--lambda", dest="lambda_hz", type=float, default=None, help="rate for --solve pw")
+    ap.add_argument("--lambda-lo", dest="lambda_lo", type=float, default=1e-3)
+    ap.add_argument("--lambda-hi", dest="lambda_hi", type=float, default=1e4)
+    ap.add_argument("--quantile", dest="quantile", type=float, default=0.99)
+    ap.add_argument("--pulses", dest="pulses", type=int, default=5000)
+    ap.add_argument("--iters", dest="iters", type=int, default=30)
+    ap.add_argument("--seed", dest="seed", type=int, default=1)
+    ap.add_argument("--outdir", dest="outdir", required=True)
+    args = ap.parse_args()
+    if args.solve == "pw" and args.lambda_hz is None:
+        ap.error("--solve pw needs --lambda")
+
+    R, C = (g.ravel() for g in np.meshgrid(np.asarray(args.R), np.asarray(args.C), indexing="ij"))
+    x, hit, limit = solve(args, R, C)
+    col = "lambda_max_Hz" if args.solve == "lambda" else "pw_max_us"
+    df = pd.DataFrame({"R_ohm": R, "C_F": C, "I_limit_A": args.I_limit, "v_limit_V": limit,
+                       "mode": args.mode if args.mode == "periodic" else f"p{int(round(args.quantile * 100))}",
+                       col: x, "bound_hit": hit})
+    if args.solve == "lambda":
+        df["pw_max_us"] = args.pw_max
+    else:
+        df["lambda_Hz"] = args.lambda_hz
+    os.makedirs(args.outdir, exist_ok=True)
+    df.to_csv(os.path.join(args.outdir, "table25_safe_envelope.csv"), index=False)
+    print(df.to_string(index=False))
+    print("Done. Outputs in:", args.outdir)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+Content-addressed cache for simulation results.
+Key = sha256 over (script.function, version string, digest of the sources,
+normalized parameters). The source digest covers the file that defines the
+function and every script of this directory reachable from it through
+imports (modules and imported functions, transitively), so editing a
+simulator or a helper it calls invalidates its entries. Changes outside
+these files (numpy/scipy upgrades, data files read at run time) are not
+seen: bump the version string for those. Parameters are normalized
+before hashing: defaults applied, numpy scalars -> Python numbers, arrays ->
+dtype/shape/bytes digest, dict keys sorted.
+
+Two layers:
+  - in-process LRU (OrderedDict, max_items) for repeats within one run; it
+    keeps the pickled bytes, so every hit returns a fresh copy and callers
+    may modify what they get back
+  - on-disk store <dir>/<k[:2]>/<k>.pkl, size-bounded LRU: hits refresh the
+    file mtime, writes evict the least recently used files above max_mb
+
+  @simcache.memoize("1")
+  def simulate_vpeak(I, Vc, R, C, lam, PW_us, dt_us=50, periods=200): ...
+
+Environment: APPI_CACHE_DIR (default ~/.cache/appi), APPI_CACHE_MB (default
+512), APPI_CACHE=off disables both layers.
+Usage:
+  python simcache.py --stats
+  python simcache.py --clear
+"""
+import argparse, functools, hashlib, inspect, json, os, pickle, sys, tempfile
+from collections import OrderedDict
+import numpy as np
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+def _norm(x):
+    if isinstance(x, dict):
+        return {str(k): _norm(v) for k, v in sorted(x.items(), key=lambda kv: str(kv[0]))}
+    if isinstance(x, (list, tuple)):
+        return [_norm(v) for v in x]
+    if isinstance(x, np.ndarray):
+        a = np.ascontiguousarray(x)
+        return {"__ndarray__": a.dtype.str, "shape": a.shape, "sha256": hashlib.sha256(a.tobytes()).hexdigest()}
+    if isinstance(x, np.generic):
+        return x.item()
+    if x is None or isinstance(x, (bool, int, float, str)):
+        return x
+    raise TypeError(f"simcache: cannot key parameter of type {type(x).__name__}")
+
+def make_key(name, version, params, source=""):
+    blob = json.dumps({"fn": name, "v": str(version), "src": hashlib.sha256(source.encode()).hexdigest(),
+                       "p": _norm(params)}, sort_keys=True)
+    return hashlib.sha256(blob.encode()).hexdigest()
+
+def _local_file(module):
+    f = getattr(module, "__file__", None)
+    if f and f.endswith(".py") and os.path.dirname(os.path.abspath(f)) == HERE:
+        return os.path.abspath(f)
+    return None
+
+def source_digest(fn):
+    """sha256 over the sources of fn's module and the local modules it reaches via imports."""
+    seen, stack = {}, [inspect.getmodule(fn)]
+    while stack:
+        m = stack.pop()
+        f = _local_file(m)
+        if f is None or f in seen:
+            continue
+        with open(f, "rb") as fh:
+            seen[f] = hashlib.sha256(fh.read()).hexdigest()
+        for v in list(vars(m).values()):
+            if inspect.ismodule(v):
+                stack.append(v)
+            elif callable(v) and isinstance(getattr(v, "__module__", None), str):
+                stack.append(sys.modules.get(v.__module__))
+    return hashlib.sha256(json.dumps(sorted((os.path.basename(f), d) for f, d in seen.items())).encode()).hexdigest()
+
+class SimCache:
+    def __init__(self, root=None, max_mb=None, max_items=256, enabled=None):
+        self.root = root or os.environ.get("APPI_CACHE_DIR") or os.path.join(os.path.expanduser("~"), ".cache", "appi")
+        self.max_bytes = int(float(max_mb or os.environ.get("APPI_CACHE_MB", 512)) * 2**20)
+        self.enabled = (os.environ.get("APPI_CACHE", "on").lower() not in ("off", "0", "no")) if enabled is None else enabled
+        self.mem = OrderedDict()
+        self.max_items = max_items
+        self._size = None
+        self.hits = self.misses = 0
+
+    def _path(self, key):
+        return os.path.join(self.root, key[:2], key + ".pkl")
+
+    def _files(self):
+        for d, _, names in os.walk(self.root):
+            for n in names:
+                if n.endswith(".pkl"):
+                    p = os.path.join(d, n)
+                    try:
+                        st = os.stat(p)
+                    except FileNotFoundError:
+                        continue
+                    yield p, st.st_size, st.st_mtime
+
+    def _remember(self, key, blob):
+        self.mem[key] = blob
+        self.mem.move_to_end(key)
+        while len(self.mem) > self.max_items:
+            self.mem.popitem(last=False)
+
+    def get(self, key):
+        """(True, value) on a hit, (False, None) otherwise."""
+        if key in self.mem:
+            self.mem.move_to_end(key); self.hits += 1
+            return True, pickle.loads(self.mem[key])
+        p = self._path(key)
+        try:
+            with open(p, "rb") as f:
+                blob = f.read()
+            value = pickle.loads(blob)
+            os.utime(p)  # LRU recency
+        except Exception:  # missing, truncated, or written by incompatible code: recompute
+            self.misses += 1
+            return False, None
+        self.hits += 1
+        self._remember(key, blob)
+        return True, value
+
+    def put(self, key, value):
+        blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        self._remember(key, blob)
+        p = self._path(key)
+        os.makedirs(os.path.dirname(p), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(p), suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(blob)
+        os.replace(tmp, p)  # atomic: readers never see a partial entry
+        if self._size is None:
+            self._size = sum(s for _, s, _ in self._files())
+        else:
+            self._size += os.path.getsize(p)
+        if self._size > self.max_bytes:
+            self.evict()
+
+    def evict(self, target=None):
+        """Delete least recently used files until the store is below target bytes (default 90% of max)."""
+        target = int(0.9 * self.max_bytes) if target is None else target
+        files = sorted(self._files(), key=lambda f: f[2])
+        size = sum(s for _, s, _ in files)
+        for p, s, _ in files:
+            if size <= target:
+                break
+            try:
+                os.remove(p); size -= s
+            except FileNotFoundError:
+                pass
+        self._size = size
+
+    def clear(self):
+        self.mem.clear()
+        self.evict(target=0)
+
+    def stats(self):
+        files = list(self._files())
+        return {"root": self.root, "entries": len(files), "size_MB": sum(s for _, s, _ in files) / 2**20,
+                "max_MB": self.max_bytes / 2**20, "hits": self.hits, "misses": self.misses}
+
+_default = None
+
+def default_cache():
+    global _default
+    if _default is None:
+        _default = SimCache()
+    return _default
+
+def memoize(version, cache=None):
+    """Cache results of a pure function of its (hashable-by-content) arguments."""
+    def deco(fn):
+        sig = inspect.signature(fn)
+        name = f"{os.path.splitext(os.path.basename(inspect.getfile(fn)))[0]}.{fn.__qualname__}"
+        source = []  # digest computed on first call, once the defining module is fully imported
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            c = cache or default_cache()
+            if not c.enabled:
+                return fn(*args, **kwargs)
+            if not source:
+                source.append(source_digest(fn))
+            bound = sig.bind(*args, **kwargs); bound.apply_defaults()
+            key = make_key(name, version, bound.arguments, source[0])
+            hit, value = c.get(key)
+            if hit:
+                return value
+            value = fn(*args, **kwargs)
+            c.put(key, value)
+            return value
+        wrapper.uncached = fn
+        return wrapper
+    return deco
+
+def main():
+    ap = argparse.ArgumentParser()
+    g = ap.add_mutually_exclusive_group(required=True)
+    g.add_argument("--stats", dest="stats", action="store_true")
+    g.add_argument("--clear", dest="clear", action="store_true")
+    args = ap.parse_args()
+    c = default_cache()
+    if args.clear:
+        c.clear()
+    print(c.stats())
+
+if __name__ == "__main__":
+    main()
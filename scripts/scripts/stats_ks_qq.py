@@ -3,14 +3,26 @@
 Učitava datasets/fig1_pulse_train.csv i radi:
 - MLE λ iz ISI
 - K–S testovi za ISI~Exp(λ) i PW~Uniform[min,max]
+  (druge raspodele: --isi-dist / --pw-dist po imenu iz isi_distributions.py, MLE fit)
+- sa --pw-discrete: i χ² / diskretni K–S za PW (discrete_gof.py) u table08,
+  uz kolonu statistic (χ² ili D; kolona D ostaje samo K–S D)
 - QQ dijagrami i CDF (PNG)
 - Tabele: tables/table07_params_descriptives.csv, tables/table08_ks_results.csv
+Upotreba:
+  python stats_ks_qq.py [--isi-dist gamma] [--pw-dist truncnorm] [--pw-discrete]
 """
-import os, csv, math
+import argparse, os, csv, math
 import numpy as np
 import pandas as pd
-from scipy import stats
 import matplotlib.pyplot as plt
+from discrete_gof import DiscreteUniformGOF, gof_rows
+from isi_distributions import add_dist_args, fit
+
+ap = argparse.ArgumentParser()
+add_dist_args(ap, "exp", "uniform")
+ap.add_argument("--pw-discrete", dest="pw_discrete", action="store_true",
+                help="dodaj χ² / diskretni K–S za PW u table08")
+args = ap.parse_args()
 
 os.makedirs("tables", exist_ok=True)
 os.makedirs("figures", exist_ok=True)
@@ -31,49 +43,62 @@ with open("tables/table07_params_descriptives.csv","w",newline="",encoding="utf-
     w.writerow(["lambda_mle_Hz","isi_mean_s","isi_std_s","pw_min_us","pw_max_us","pw_mean_us","pw_std_us","duration_s","num_events"])
     w.writerow([lam_mle, np.mean(isi), np.std(isi, ddof=1), pw_min, pw_max, pw_mean, pw_std, t[-1], len(df)])
 
-# KS: ISI vs Exp(lam_mle)
-D1, p1 = stats.kstest(isi, 'expon', args=(0, 1.0/lam_mle))
-# KS: PW vs Uniform[min,max]
-D2, p2 = stats.kstest(pw, 'uniform', args=(pw_min, pw_max - pw_min))
+# KS: ISI vs --isi-dist (Exp(lam_mle)), PW vs --pw-dist (Uniform[min,max])
+isi_d, pw_d = fit(args.isi_dist, isi), fit(args.pw_dist, pw)
+D1, p1 = isi_d.kstest(isi)
+D2, p2 = pw_d.kstest(pw)
+# podrazumevani Exp zadržava stare nazive u tabeli i na slikama
+if args.isi_dist == "exp":
+    isi_label, isi_theory, isi_name = "Exp(lam_mle)", f"Exp(λ={lam_mle:.3f})", "Exponential"
+else:
+    isi_label, isi_theory, isi_name = isi_d.label, isi_d.describe(), isi_d.display
 
 with open("tables/table08_ks_results.csv","w",newline="",encoding="utf-8") as f:
     w=csv.writer(f)
-    w.writerow(["test","D","p_value","n"])
-    w.writerow(["KS ISI vs Exp(lam_mle)", D1, p1, len(isi)])
-    w.writerow(["KS PW vs Uniform[min,max]", D2, p2, len(pw)])
+    if not args.pw_discrete:
+        w.writerow(["test","D","p_value","n"])
+        w.writerow([f"KS ISI vs {isi_label}", D1, p1, len(isi)])
+        w.writerow([f"KS PW vs {pw_d.label}", D2, p2, len(pw)])
+    else:
+        w.writerow(["test","D","p_value","n","statistic"])
+        w.writerow([f"KS ISI vs {isi_label}", D1, p1, len(isi), D1])
+        w.writerow([f"KS PW vs {pw_d.label}", D2, p2, len(pw), D2])
+        # PW su celi brojevi µs: diskretni χ² i K–S preko bincount (O(n))
+        for r in gof_rows(DiscreteUniformGOF(pw_min, pw_max).update(pw).result(), pw_min, pw_max):
+            w.writerow([r["test"], "" if np.isnan(r["D"]) else r["D"], r["p_value"], r["n"], r["statistic"]])
 
 # ISI CDF emp vs theory
 x = np.sort(isi)
 cdf_emp = np.arange(1, len(x)+1)/len(x)
-cdf_the = 1 - np.exp(-lam_mle * x)
+cdf_the = isi_d.cdf(x)
 plt.figure()
 plt.plot(x, cdf_emp, label="Empirical")
-plt.plot(x, cdf_the, label=f"Theory Exp(λ={lam_mle:.3f})")
+plt.plot(x, cdf_the, label=f"Theory {isi_theory}")
 plt.xlabel("ISI [s]"); plt.ylabel("CDF"); plt.legend(); plt.grid(True)
 plt.title("ISI CDF: empirical vs theoretical")
 plt.savefig("figures/fig13_isi_cdf_emp_vs_theory.png", dpi=160)
 
 # QQ ISI vs Exp
 q_emp = np.quantile(x, np.linspace(0.01,0.99,99))
-q_the = stats.expon.ppf(np.linspace(0.01,0.99,99), scale=1.0/lam_mle)
+q_the = isi_d.ppf(np.linspace(0.01,0.99,99))
 plt.figure()
 plt.scatter(q_the, q_emp, s=8)
 lims=[0,max(q_the.max(), q_emp.max())]
 plt.plot(lims, lims, 'k--')
-plt.xlabel("Theoretical quantiles (Exp)"); plt.ylabel("Empirical quantiles (ISI)")
-plt.title("ISI QQ vs Exponential")
+plt.xlabel(f"Theoretical quantiles ({isi_d.display})"); plt.ylabel("Empirical quantiles (ISI)")
+plt.title(f"ISI QQ vs {isi_name}")
 plt.grid(True)
 plt.savefig("figures/fig14_isi_qq_exp.png", dpi=160)
 
 # QQ PW vs Uniform
 q_emp_pw = np.quantile(pw, np.linspace(0.01,0.99,99))
-q_the_pw = stats.uniform.ppf(np.linspace(0.01,0.99,99), loc=pw_min, scale=pw_max-pw_min)
+q_the_pw = pw_d.ppf(np.linspace(0.01,0.99,99))
 plt.figure()
 plt.scatter(q_the_pw, q_emp_pw, s=8)
 lims=[pw_min, pw_max]
 plt.plot(lims, lims, 'k--')
-plt.xlabel("Theoretical quantiles (Uniform)"); plt.ylabel("Empirical quantiles (PW)")
-plt.title("PW QQ vs Uniform")
+plt.xlabel(f"Theoretical quantiles ({pw_d.display})"); plt.ylabel("Empirical quantiles (PW)")
+plt.title(f"PW QQ vs {pw_d.display}")
 plt.grid(True)
 plt.savefig("figures/fig15_pw_qq_uniform.png", dpi=160)
 
@@ -0,0 +1,470 @@
+#!/usr/bin/env python3
+"""
+Localhost live-stream server: one process owns the serial port (or the
+built-in firmware emulator) and any number of dashboards subscribe.
+  ws://<host>:<port>/ws     binary WebSocket frames, one per batch of events
+  http://<host>:<port>/stats  JSON: rate, PW, counts, per-client frames/drops
+Decoded EV/BIP lines are collected for --batch-ms (or --batch-max events)
+and sent as one message:
+  header  <BHQd   version, n_records, seq of the first record, host time of the batch
+  record  <BdIIIf kind (0 EV, 1 BIP), host time [s, UTC epoch], t_ms, w_us,
+          next_dt_ms, Iphase_mA (NaN for EV)
+Each client has its own queue of at most --client-frames messages. A client
+that does not keep up loses its oldest queued messages (counted in /stats,
+visible to the client as a gap in seq); the serial reader and the other
+clients never wait for it. Below the queue only the message being written is
+buffered: drain() empties the transport (high-water mark 0) and, on Linux,
+the next message is taken from the queue only once the peer has acked the
+previous one (TIOCOUTQ = 0). The queue is therefore the real backlog bound,
+frames_sent counts messages the peer's TCP stack has received, and /stats
+shows the bytes still in flight per client (unsent_bytes). Startup parameters (--lambda/--pwmin/--pwmax,
+--start after the pre-flight check) are sent through protocol_client.py.
+--emulate generates EV lines like firmware_timer_isr (Exp ISI at λ, uniform
+PW, millis() timestamps) instead of reading a port; --client runs a local
+subscriber that prints events/s, frames and seq gaps per second
+(--client-delay-ms makes it a slow one).
+Usage:
+  python stream_server.py --port COM5 --lambda 2.0 --pwmin 50 --pwmax 1000 --start
+  python stream_server.py --emulate --lambda 500 --duration 60
+  python stream_server.py --client --client-delay-ms 200
+"""
+import argparse, asyncio, base64, hashlib, json, math, os, random, socket, struct, sys, threading, time
+from collections import deque
+
+FRAME_HEADER = struct.Struct("<BHQd")
+RECORD = struct.Struct("<BdIIIf")
+VERSION = 1
+KINDS = {"EV": 0, "BIP": 1}
+WS_GUID = b"258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+def decode_event(line, host_t):
+    """RECORD fields of an EV/BIP line, else None."""
+    f = line.split(",")
+    kind = KINDS.get(f[0])
+    if kind is None:
+        return None
+    try:
+        kv = dict(x.split("=", 1) for x in f[1:])
+        if kind == 0:
+            return (0, host_t, int(kv["t_ms"]), int(kv["w_us"]), int(kv["next_dt_ms"]), math.nan)
+        return (1, host_t, int(kv["t_ms"]), int(kv["PW_us"]), int(kv["next_dt_ms"]), float(kv["Iphase_mA"]))
+    except (KeyError, ValueError):
+        return None
+
+def decode_frame(data):
+    """(first_seq, batch host time, list of RECORD tuples) of one stream message."""
+    version, n, seq, t = FRAME_HEADER.unpack_from(data)
+    if version != VERSION:
+        raise ValueError(f"stream version {version}, expected {VERSION}")
+    return seq, t, [RECORD.unpack_from(data, FRAME_HEADER.size + k * RECORD.size) for k in range(n)]
+
+# ---- WebSocket (RFC 6455) framing, the subset a local dashboard needs ----
+
+def ws_frame(payload, opcode=2, mask=False):
+    n = len(payload)
+    head = bytes([0x80 | opcode])
+    m = 0x80 if mask else 0
+    if n < 126:
+        head += bytes([m | n])
+    elif n < 1 << 16:
+        head += struct.pack("!BH", m | 126, n)
+    else:
+        head += struct.pack("!BQ", m | 127, n)
+    if not mask:
+        return head + payload
+    key = os.urandom(4)
+    return head + key + bytes(b ^ key[k % 4] for k, b in enumerate(payload))
+
+async def ws_read(reader):
+    """(opcode, payload) of the next frame."""
+    b0, b1 = await reader.readexactly(2)
+    n = b1 & 0x7F
+    if n == 126:
+        n = struct.unpack("!H", await reader.readexactly(2))[0]
+    elif n == 127:
+        n = struct.unpack("!Q", await reader.readexactly(8))[0]
+    key = await reader.readexactly(4) if b1 & 0x80 else None
+    data = await reader.readexactly(n)
+    if key:
+        data = (int.from_bytes(data, "little") ^ int.from_bytes((key * (n // 4 + 1))[:n], "little")).to_bytes(n, "little")
+    return b0 & 0x0F, data
+
+def ws_accept(key):
+    return base64.b64encode(hashlib.sha1(key.encode("ascii") + WS_GUID).digest()).decode("ascii")
+
+async def read_request(reader):
+    """(method, path, headers) of an HTTP request head."""
+    head = await reader.readuntil(b"\r\n\r\n")
+    lines = head.decode("latin-1").split("\r\n")
+    method, path, _ = lines[0].split(" ", 2)
+    headers = {}
+    for l in lines[1:]:
+        k, sep, v = l.partition(":")
+        if sep:
+            headers[k.strip().lower()] = v.strip()
+    return method, path, headers
+
+# ---- hub: batching, fan-out, stats ----
+
+def unsent_bytes(writer):
+    """Bytes in the transport buffer plus, on Linux, the socket send queue not yet acked by the peer."""
+    n = writer.transport.get_write_buffer_size()
+    sock = writer.get_extra_info("socket")
+    try:
+        import fcntl, termios
+        n += struct.unpack("i", fcntl.ioctl(sock.fileno(), termios.TIOCOUTQ, b"\0\0\0\0"))[0]
+    except (ImportError, AttributeError, OSError, ValueError):  # no TIOCOUTQ, or socket already closed
+        pass
+    return n
+
+class Subscriber:
+    def __init__(self, peer, max_frames, writer=None):
+        self.peer, self.max_frames, self.writer = peer, max_frames, writer
+        self.frames = deque()
+        self.ready = asyncio.Event()
+        self.sent = self.dropped = 0
+        self.connected = time.time()
+
+    def put(self, frame):
+        if len(self.frames) >= self.max_frames:
+            self.frames.popleft(); self.dropped += 1
+        self.frames.append(frame)
+        self.ready.set()
+
+    async def get(self):
+        while not self.frames:
+            self.ready.clear()
+            await self.ready.wait()
+        return self.frames.popleft()
+
+class Hub:
+    def __init__(self, batch_ms=50.0, batch_max=512, client_frames=64, rate_window_s=10.0):
+        self.batch_s, self.batch_max, self.client_frames = batch_ms / 1e3, batch_max, client_frames
+        self.rate_window_s = rate_window_s
+        self.subscribers = set()
+        self._batch = []
+        self.seq = 0
+        self.n_events = self.n_bip = self.n_other = self.frames = 0
+        self.dropped = 0  # by clients that have disconnected
+        self.pw_sum = 0; self.pw_min = self.pw_max = None
+        self.last = None
+        self._times = deque()
+        self.replies = deque(maxlen=20)
+        self.started = time.time()
+        self.source = ""
+        self.client = None  # protocol_client.ProtocolClient of a serial source
+
+    def on_line(self, line, host_t=None):
+        host_t = time.time() if host_t is None else host_t
+        rec = decode_event(line, host_t)
+        if rec is None:
+            self.n_other += 1
+            if self.client is not None:
+                self.client.feed(line)
+            if line.startswith(("OK,", "ACK,", "ERR,")):
+                self.replies.append(line)
+            return
+        self.n_events += 1; self.n_bip += rec[0]
+        w = rec[3]
+        self.pw_sum += w
+        self.pw_min = w if self.pw_min is None else min(self.pw_min, w)
+        self.pw_max = w if self.pw_max is None else max(self.pw_max, w)
+        self.last = rec
+        self._times.append(host_t)
+        while host_t - self._times[0] > self.rate_window_s:
+            self._times.popleft()
+        self._batch.append(rec)
+        if len(self._batch) >= self.batch_max:
+            self.flush()
+
+    def flush(self):
+        if not self._batch:
+            return
+        n = len(self._batch)
+        frame = FRAME_HEADER.pack(VERSION, n, self.seq, time.time()) + b"".join(RECORD.pack(*r) for r in self._batch)
+        self.seq += n; self._batch = []; self.frames += 1
+        for s in self.subscribers:
+            s.put(frame)
+
+    async def run(self):
+        while True:
+            await asyncio.sleep(self.batch_s)
+            self.flush()
+
+    def stats(self):
+        now = time.time()
+        while self._times and now - self._times[0] > self.rate_window_s:
+            self._times.popleft()
+        span = min(self.rate_window_s, now - self.started)
+        st = {"source": self.source, "uptime_s": round(now - self.started, 3),
+              "events": self.n_events, "bip_events": self.n_bip, "other_lines": self.n_other,
+              "events_per_s": round(len(self._times) / span, 3) if span > 0 else 0.0,
+              "rate_window_s": self.rate_window_s,
+              "pw_mean_us": round(self.pw_sum / self.n_events, 2) if self.n_events else None,
+              "pw_min_us": self.pw_min, "pw_max_us": self.pw_max,
+              "last_t_ms": self.last[2] if self.last else None,
+              "next_seq": self.seq, "frames": self.frames, "replies": list(self.replies),
+              "frames_dropped": self.dropped + sum(s.dropped for s in self.subscribers),
+              "clients": [{"peer": s.peer, "connected_s": round(now - s.connected, 3), "frames_sent": s.sent,
+                           "frames_dropped": s.dropped, "queued": len(s.frames),
+                           "unsent_bytes": unsent_bytes(s.writer) if s.writer else None} for s in self.subscribers]}
+        if self.client is not None:
+            st["command_latency"] = self.client.latency.summary()
+        return st
+
+# ---- HTTP / WebSocket server ----
+
+async def handle(hub, reader, writer):
+    peer = "%s:%s" % writer.get_extra_info("peername")[:2]
+    try:
+        method, path, headers = await read_request(reader)
+    except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ValueError):
+        writer.close(); return
+    path = path.split("?", 1)[0]
+    if path == "/ws" and headers.get("upgrade", "").lower() == "websocket" and "sec-websocket-key" in headers:
+        writer.write(("HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+                      f"Sec-WebSocket-Accept: {ws_accept(headers['sec-websocket-key'])}\r\n\r\n").encode("ascii"))
+        # the per-client queue is the bound: drain() waits until the transport is empty and the
+        # kernel keeps only its minimum send buffer, so the backlog cannot hide below the queue
+        writer.transport.set_write_buffer_limits(high=0)
+        writer.get_extra_info("socket").setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, 4096)
+        await stream(hub, Subscriber(peer, hub.client_frames, writer), reader, writer)
+        return
+    if path == "/stats":
+        status, ctype, body = "200 OK", "application/json", json.dumps(hub.stats(), indent=1).encode("utf-8")
+    elif path == "/":
+        status, ctype, body = "200 OK", "text/plain", b"APPI stream: /ws (binary WebSocket), /stats (JSON)\n"
+    else:
+        status, ctype, body = "404 Not Found", "text/plain", b"not found\n"
+    writer.write(f"HTTP/1.1 {status}\r\nContent-Type: {ctype}\r\nContent-Length: {len(body)}\r\n"
+                 f"Access-Control-Allow-Origin: *\r\nConnection: close\r\n\r\n".encode("ascii") + body)
+    try:
+        await writer.drain()
+    finally:
+        writer.close()
+
+async def stream(hub, sub, reader, writer):
+    """Send the subscriber's frames; its own reader answers ping/close. Ends when either side does."""
+    async def incoming():
+        while True:
+            op, data = await ws_read(reader)
+            if op == 8:
+                return
+            if op == 9:
+                writer.write(ws_frame(data, opcode=10))
+
+    hub.subscribers.add(sub)
+    rx = asyncio.ensure_future(incoming())
+    try:
+        while not rx.done():
+            while unsent_bytes(writer) and not rx.done():  # keep the backlog in sub.frames, where it is bounded
+                await asyncio.sleep(0.005)
+            get = asyncio.ensure_future(sub.get())
+            await asyncio.wait([get, rx], return_when=asyncio.FIRST_COMPLETED)
+            if not get.done():
+                get.cancel(); break
+            writer.write(ws_frame(get.result()))
+            await writer.drain()  # only this client's coroutine waits for a slow socket
+            sub.sent += 1  # written; acked before the next one is taken
+    except (ConnectionError, asyncio.IncompleteReadError):
+        pass
+    finally:
+        hub.subscribers.discard(sub)
+        hub.dropped += sub.dropped
+        rx.cancel()
+        try:
+            writer.write(ws_frame(b"", opcode=8))
+            writer.close()
+        except Exception:
+            pass
+
+# ---- sources ----
+
+def serial_source(hub, loop, ser, stop):
+    """Reader thread: hands every line to the hub on the event loop."""
+    try:
+        while not stop.is_set():
+            line = ser.readline()
+            if line:
+                s = line.decode("utf-8", errors="replace").strip()
+                if s:
+                    loop.call_soon_threadsafe(hub.on_line, s, time.time())
+    except Exception as e:  # USB unplugged / port closed
+        if not stop.is_set():
+            print(f"Link lost: {e}", file=sys.stderr)
+            loop.call_soon_threadsafe(stop.set)
+
+async def emulate(hub, lam, pw_min, pw_max, seed=None):
+    """EV lines as firmware_timer_isr prints them, in real time."""
+    rng = random.Random(seed)
+    t0 = time.monotonic()
+    nxt = rng.expovariate(lam)
+    while True:
+        now = time.monotonic() - t0
+        while nxt <= now:
+            dt = rng.expovariate(lam)
+            hub.on_line(f"EV,t_ms={int(nxt * 1e3)},w_us={rng.randint(pw_min, pw_max)},next_dt_ms={int(dt * 1e3)}")
+            nxt += dt
+        await asyncio.sleep(min(nxt - now, 0.01))
+
+# ---- local test client ----
+
+async def subscribe(host, port, seconds=None, delay_ms=0.0):
+    """Local subscriber: per-second events, messages, seq gaps and batch age; returns the totals."""
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4096)  # a slow dashboard must not hide the backlog either
+    sock.setblocking(False)
+    await asyncio.get_running_loop().sock_connect(sock, (host, port))
+    reader, writer = await asyncio.open_connection(sock=sock, limit=4096)  # StreamReader pauses at 2 x limit
+    key = base64.b64encode(os.urandom(16)).decode("ascii")
+    writer.write((f"GET /ws HTTP/1.1\r\nHost: {host}:{port}\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+                  f"Sec-WebSocket-Key: {key}\r\nSec-WebSocket-Version: 13\r\n\r\n").encode("ascii"))
+    head = await reader.readuntil(b"\r\n\r\n")
+    if b" 101 " not in head.split(b"\r\n", 1)[0] or ws_accept(key).encode("ascii") not in head:
+        raise ConnectionError(head.split(b"\r\n", 1)[0].decode("latin-1"))
+    tot = {"events": 0, "messages": 0, "gaps": 0, "lost_events": 0}
+    expect = None
+    t_end = None if seconds is None else time.monotonic() + seconds
+    t_rep = time.monotonic() + 1.0; ev = msgs = 0; age = []
+    try:
+        while t_end is None or time.monotonic() < t_end:
+            try:
+                op, data = await asyncio.wait_for(ws_read(reader), 1.0)
+            except asyncio.TimeoutError:
+                op = None
+            if op == 8:
+                break
+            if op == 2:
+                seq, t, recs = decode_frame(data)
+                if expect is not None and seq != expect:
+                    tot["gaps"] += 1; tot["lost_events"] += seq - expect
+                expect = seq + len(recs)
+                ev += len(recs); msgs += 1; age.append(time.time() - t)
+                tot["events"] += len(recs); tot["messages"] += 1
+                if delay_ms:
+                    await asyncio.sleep(delay_ms / 1e3)
+            if time.monotonic() >= t_rep:
+                print(f"{ev} events/s  {msgs} msg/s  batch age {1e3 * (sum(age) / len(age)) if age else 0:.1f} ms  "
+                      f"gaps {tot['gaps']} ({tot['lost_events']} events)")
+                t_rep += 1.0; ev = msgs = 0; age = []
+    finally:
+        try:
+            writer.write(ws_frame(b"", opcode=8, mask=True)); writer.close()
+        except Exception:
+            pass
+    return tot
+
+# ---- main ----
+
+async def serve(args, hub):
+    loop = asyncio.get_running_loop()
+    stop = threading.Event()
+    done = asyncio.Event()
+    server = await asyncio.start_server(lambda r, w: handle(hub, r, w), args.host, args.http_port)
+    tasks = [asyncio.ensure_future(hub.run())]
+    ser = None
+    if args.emulate:
+        hub.source = f"emulator λ={args.lam} Hz PW {args.pwmin}-{args.pwmax} µs"
+        tasks.append(asyncio.ensure_future(emulate(hub, args.lam, args.pwmin, args.pwmax, args.seed_value)))
+    else:
+        import serial
+        from protocol_client import ProtocolClient
+        ser = serial.Serial(args.port, args.baud, timeout=0.2)
+        await asyncio.sleep(0.3)
+        hub.source = f"serial {args.port} @ {args.baud}"
+        hub.client = ProtocolClient(ser, timeout=args.ack_timeout)
+        threading.Thread(target=serial_source, args=(hub, loop, ser, stop), daemon=True).start()
+        sent = [hub.client.submit(c) for c in startup_commands(args)]
+        for cmd, e in await loop.run_in_executor(None, hub.client.wait_all, sent):
+            print(f"Warning: {e}", file=sys.stderr)
+    print(f"Streaming {hub.source} on ws://{args.host}:{args.http_port}/ws, stats on http://{args.host}:{args.http_port}/stats")
+
+    async def watch():
+        while not stop.is_set():
+            await asyncio.sleep(0.2)
+        done.set()
+    tasks.append(asyncio.ensure_future(watch()))
+    try:
+        await (asyncio.wait_for(done.wait(), args.duration) if args.duration else done.wait())
+    except (asyncio.TimeoutError, asyncio.CancelledError):  # --duration / Ctrl+C
+        pass
+    lost = stop.is_set()
+    hub.flush()
+    server.close()
+    for t in tasks:
+        t.cancel()
+    if ser is not None:
+        try:
+            hub.client.submit("STOP")
+            await asyncio.sleep(0.2)
+        except Exception:
+            pass
+        stop.set(); ser.close()
+    return 2 if lost else 0
+
+def startup_commands(args):
+    cmds = [f"SET,{k},{v}" for k, v in (("lambda", args.lam_set), ("pwmin", args.pwmin_set), ("pwmax", args.pwmax_set))
+            if v is not None]
+    if args.start:
+        cmds.append("START")
+    return cmds
+
+def main():
+    ap = argparse.ArgumentParser()
+    src = ap.add_mutually_exclusive_group(required=True)
+    src.add_argument("--port", dest="port", default=None)
+    src.add_argument("--emulate", dest="emulate", action="store_true", help="built-in firmware emulator instead of a port")
+    src.add_argument("--client", dest="client", action="store_true", help="run a local test subscriber")
+    ap.add_argument("--baud", dest="baud", type=int, default=115200)
+    ap.add_argument("--host", dest="host", default="127.0.0.1")
+    ap.add_argument("--http-port", dest="http_port", type=int, default=8765)
+    ap.add_argument("--batch-ms", dest="batch_ms", type=float, default=50.0, help="max. age of a batch [ms]")
+    ap.add_argument("--batch-max", dest="batch_max", type=int, default=512, help="events per message")
+    ap.add_argument("--client-frames", dest="client_frames", type=int, default=64,
+                    help="messages queued per client before its oldest are dropped")
+    ap.add_argument("--lambda", dest="lam_set", type=float, default=None)
+    ap.add_argument("--pwmin", dest="pwmin_set", type=int, default=None)
+    ap.add_argument("--pwmax", dest="pwmax_set", type=int, default=None)
+    ap.add_argument("--start", dest="start", action="store_true")
+    ap.add_argument("--seed", dest="seed_value", type=int, default=None, help="emulator RNG seed")
+    ap.add_argument("--ack-timeout", dest="ack_timeout", type=float, default=1.0)
+    ap.add_argument("--R", dest="R", type=float, default=1000.0, help="load R for the pre-flight check [ohm]")
+    ap.add_argument("--C", dest="C", type=float, default=1e-7, help="load C for the pre-flight check [F]")
+    ap.add_argument("--plan-duration", dest="plan_duration", type=float, default=3600.0)
+    ap.add_argument("--skip-preflight", dest="skip_preflight", action="store_true")
+    ap.add_argument("--duration", dest="duration", type=float, default=None, help="stop after N seconds")
+    ap.add_argument("--client-delay-ms", dest="client_delay_ms", type=float, default=0.0,
+                    help="--client: sleep per message (a slow dashboard)")
+    args = ap.parse_args()
+
+    if args.client:
+        tot = asyncio.run(subscribe(args.host, args.http_port, args.duration, args.client_delay_ms))
+        print(f"total: {tot['events']} events in {tot['messages']} messages, "
+              f"{tot['gaps']} gaps ({tot['lost_events']} events dropped for this client)")
+        return
+
+    # emulator / pre-flight fall back to the firmware defaults (preflight_safety.FIRMWARE_DEFAULTS)
+    args.lam = 2.0 if args.lam_set is None else args.lam_set
+    args.pwmin = 50 if args.pwmin_set is None else args.pwmin_set
+    args.pwmax = 1000 if args.pwmax_set is None else args.pwmax_set
+    if args.start and args.port and not args.skip_preflight:
+        from preflight_safety import check_params, format_report, load_targets
+        ok, rep = check_params(args.lam, args.pwmin, args.pwmax, args.plan_duration, args.R, args.C, load_targets())
+        print("Pre-flight safety check:\n" + format_report(rep))
+        if not ok:
+            print("Refusing to send START (--skip-preflight to override).", file=sys.stderr)
+            sys.exit(1)
+
+    hub = Hub(args.batch_ms, args.batch_max, args.client_frames)
+    try:
+        rc = asyncio.run(serve(args, hub))
+    except KeyboardInterrupt:
+        rc = 0
+    st = hub.stats()
+    print(f"{st['events']} events in {st['frames']} messages; {st['frames_dropped']} messages dropped for slow clients")
+    if rc:
+        print("Link lost.", file=sys.stderr)
+    sys.exit(rc)
+
+if __name__ == "__main__":
+    main()